@@ -1,5 +1,8 @@
 import sys
 import os
+import hashlib
+import functools
+import collections
 import numpy as np
 import pkg_resources
 from PIL import Image
@@ -25,6 +28,11 @@ except ImportError:
 num_to_syms = {1: 'H', 6: 'C', 7: 'N', 8: 'O', 16: 'S'}
 syms_to_num = {'H': 1, 'C': 6, 'N': 7, 'O': 8, 'S': 16}
 
+# number of conversions kept in the caches of the inchi and smiles generators
+cache_size = 4096
+# inchis of the structures, keyed by chemid and geometry hash
+inchi_cache = collections.OrderedDict()
+
 
 def get_molecular_formula(smi):
     """
@@ -38,6 +46,20 @@ def get_molecular_formula(smi):
     return rdMolDescriptors.CalcMolFormula(mol)
 
 
+def get_multiplicity(smi):
+    """
+    Return the multiplicity of the molecule corresponding to the smiles,
+    assuming the unpaired electrons are all parallel
+    """
+    try:
+        mol = Chem.MolFromSmiles(smi)
+    except NameError:
+        logging.error('RDKit is not installed or loaded correctly.')
+        sys.exit()
+    n = sum([atom.GetNumRadicalElectrons() for atom in mol.GetAtoms()])
+    return n + 1
+
+
 def create_rxn_depiction(react_smiles, prod_smiles, dir, name):
     """
     Create a 2D depiction of a chemical reaction,
@@ -171,27 +193,54 @@ def create_rdkit_mol(bond, atom):
     return mw, smi
 
 
-def create_inchi_from_geom(atom, geom):
-    xyz_file = 'temp.xyz'
-    f = open(xyz_file, 'w')
-    f.write(str(len(atom)) + '\n\n')
+def create_inchi_from_geom(atom, geom, chemid=None):
+    """
+    Method to create the InChI of a structure given its atoms and geometry.
+    The conversion is done in memory. The InChIs are cached by chemid
+    and geometry hash, so the reaction searches and the postprocessing
+    convert a structure only once.
+    """
+    key = (chemid, geom_hash(atom, geom))
+    if key in inchi_cache:
+        inchi_cache.move_to_end(key)
+        return inchi_cache[key]
+    inchi = create_inchi_from_xyz(make_xyz_string(atom, geom))
+    inchi_cache[key] = inchi
+    if len(inchi_cache) > cache_size:
+        inchi_cache.popitem(last=False)
+    return inchi
+
+
+def geom_hash(atom, geom):
+    """
+    Hash of the atoms and the geometry, with the coordinates
+    rounded to the precision of the xyz files.
+    """
+    s = []
     for i, at in enumerate(atom):
         x, y, z = geom[i]
-        f.write('{} {:.8f} {:.8f} {:.8f}\n'.format(at, x, y, z))
-    f.write('\n\n')
-    f.close()
-    inchi = create_inchi('', '', xyz_file=xyz_file)
-    # remove temp file
-    os.remove(xyz_file)
-    return inchi
+        s.append('{} {:.6f} {:.6f} {:.6f}'.format(at, x, y, z))
+    return hashlib.sha1('\n'.join(s).encode()).hexdigest()
 
 
-def create_inchi(job, chemid, xyz_file=''):
-    if xyz_file == '':
-        xyz_file = os.path.expanduser(job) + 'xyz/' + chemid + '.xyz'
-    obmol = list(pybel.readfile('xyz', xyz_file))[0]
+def make_xyz_string(atom, geom):
+    """
+    Write the atoms and geometry in the xyz format.
+    """
+    lines = [str(len(atom)), '']
+    for i, at in enumerate(atom):
+        x, y, z = geom[i]
+        lines.append('{} {:.8f} {:.8f} {:.8f}'.format(at, x, y, z))
+    return '\n'.join(lines) + '\n'
+
+
+def create_inchi_from_xyz(xyz):
+    """
+    Method to create the InChI of a structure given as an xyz string.
+    OpenBabel is used for this.
+    """
     try:
-        obmol = list(pybel.readfile('xyz', xyz_file))[0]
+        obmol = pybel.readstring('xyz', xyz)
     except NameError:
         logging.error('Pybel is not installed or loaded correctly.')
         sys.exit()
@@ -200,6 +249,26 @@ def create_inchi(job, chemid, xyz_file=''):
     return obmol.write("inchi").split()[0]
 
 
+def create_inchi(job, chemid, xyz_file=''):
+    """
+    Method to create the InChI of a structure from its xyz file,
+    sharing the cache of create_inchi_from_geom.
+    """
+    if xyz_file == '':
+        xyz_file = os.path.expanduser(job) + 'xyz/' + chemid + '.xyz'
+    with open(xyz_file) as f:
+        lines = f.read().split('\n')
+    natom = int(lines[0])
+    atom = []
+    geom = []
+    for line in lines[2:2 + natom]:
+        at, x, y, z = line.split()[:4]
+        atom.append(at)
+        geom.append([float(x), float(y), float(z)])
+    return create_inchi_from_geom(atom, geom, chemid)
+
+
+@functools.lru_cache(maxsize=cache_size)
 def create_inchi_from_smi(smi):
     """
     Method to create the InChI of a structure given its smiles.
@@ -214,6 +283,7 @@ def create_inchi_from_smi(smi):
     return obmol.write("inchi").split()[0]
 
 
+@functools.lru_cache(maxsize=cache_size)
 def create_smiles(inchi):
     """
     Method to create the smiles of a structure given its InChI.
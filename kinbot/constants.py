@@ -77,9 +77,11 @@ for e in epsilon:
 # submission keywords
 qsubmit = {'pbs': 'qsub'}
 qsubmit['slurm'] = 'sbatch'
+qsubmit['local'] = 'bash'
 # extensions
 qext = {'pbs': '.pbs'}
 qext['slurm'] = '.sbatch'
+qext['local'] = '.sh'
 
 def main():
     """
@@ -2,7 +2,7 @@
 import copy
 
 from kinbot import constants
-from kinbot.optimize import Optimize
+from kinbot.product_registry import ProductRegistry
 from kinbot.stationary_pt import StationaryPoint
 
 
@@ -40,15 +40,22 @@ class HomolyticScissions:
     """
     Class to find all the potential homolytic scission reactions
     """
-    def __init__(self, species, par, qc):
+    def __init__(self, species, par, qc, registry=None):
         self.species = species
         self.qc = qc
         self.par = par
         # list of homolytic scission objects
         self.hss = []
+        # products of the well, shared with the reaction generator
+        if registry is None:
+            registry = ProductRegistry(par, qc)
+        self.registry = registry
     def find_homolytic_scissions(self):
         """
-        Enumerate all unique homolytic scission reactions
+        Enumerate all unique homolytic scission reactions.
+        The optimization of the products is done by calling advance
+        for each scission, which the reaction generator does together
+        with the reaction searches.
         """
         # set of unique bonds to break
         bonds = []
@@ -74,62 +81,82 @@ class HomolyticScissions:
                             hs = HomolyticScission(self.species, self.par,
                                                    self.qc, [i, j])
                             hs.create_geometries()
+                            hs.products = [self.registry.add(prod) for prod in hs.products]
                             self.hss.append(hs)
 
-        # optimize the products of the hss
-        while 1:
-            for index, hs in enumerate(self.hss):
-                if hs.status == 0:
-                    # do the initial optimization
-                    for prod in hs.products:
-                        hs.qc.qc_opt(prod, prod.geom)
-                    hs.status = 1
-                if hs.status == 1:
-                    # wait for the optimization to finish
-                    err = 0
-                    for prod in hs.products:
-                        e, prod.geom = hs.qc.get_qc_geom(str(prod.chemid) + '_well', prod.natom)
-                        if e < 0:
-                            # optimizatin failed
-                            hs.status = -999
-                            err = -1
-                        elif e != 0:
-                            err = -1
-                        else:
-                            e2, prod.energy = hs.qc.get_qc_energy(str(prod.chemid) + '_well', prod.natom)
-                            e2, prod.zpe = hs.qc.get_qc_zpe(str(prod.chemid) + '_well', prod.natom)
-                    if err == 0:
-                        hs.status = 2
-                if hs.status == 2:
-                    # Do the product conf search, high level opt and HIR
-                    for prod in hs.products:
-                        prod_opt = Optimize(prod, self.par, self.qc)
-                        prod_opt.do_optimization()
-                        hs.prod_opt.append(prod_opt)
-                    hs.status = 3
-                if hs.status == 3:
-                    # check up on the optimization
-                    opts_done = 1
-                    fails = 0
-                    for pr_opt in hs.prod_opt:
-                        if not pr_opt.shir == 1:
-                            opts_done = 0
-                            pr_opt.do_optimization()
-                        if pr_opt.shigh == -999:
-                            fails = 1
-                    if fails:
-                        hs.status = -999
-                    elif opts_done:
-                        # check if the energy is higher
-                        # than the barrier threshold
-                        species_energy = self.species.energy
-                        prod_energy = 0.
-                        for pr_opt in hs.prod_opt:
-                            prod_energy += pr_opt.species.energy
-                        barrier = (prod_energy - species_energy)*constants.AUtoKCAL
-                        if barrier > self.par.par['barrier_threshold']:
-                            hs.status = -999
-                        else:
-                            hs.status = -1
-            if all([hs.status < 0 for hs in self.hss]):
-                break
+    def advance(self, index):
+        """
+        Carry out the next step of the product optimizations of
+        homolytic scission index, without waiting for the jobs.
+        The status of the scission is
+        0: start the optimization of the products
+        1: wait for the optimizations
+        2: start the conformer search, high level optimization and hir
+        3: follow up on these
+        -1: done
+        -999: failed or barrier above the threshold
+        """
+        hs = self.hss[index]
+        if hs.status == 0:
+            # do the initial optimization
+            for prod in hs.products:
+                hs.qc.qc_opt(prod, prod.geom)
+            hs.status = 1
+        if hs.status == 1:
+            # wait for the optimization to finish
+            err = 0
+            for prod in hs.products:
+                result = hs.qc.get_qc_result(str(prod.chemid) + '_well')
+                if result.status == 'running' or result.status == 'finalizing':
+                    err = -1
+                elif result.status != 'normal':
+                    # optimizatin failed
+                    hs.status = -999
+                    err = -1
+                else:
+                    prod.geom = result.geom
+                    prod.energy = result.energy
+                    prod.zpe = result.zpe
+            if err == 0:
+                hs.status = 2
+        if hs.status == 2:
+            # Do the product conf search, high level opt and HIR
+            for prod in hs.products:
+                hs.prod_opt.append(self.registry.optimize(prod))
+            hs.status = 3
+        if hs.status == 3:
+            # check up on the optimization
+            opts_done = 1
+            fails = 0
+            for pr_opt in hs.prod_opt:
+                if not pr_opt.shir == 1:
+                    opts_done = 0
+                    pr_opt.do_optimization()
+                if pr_opt.shigh == -999:
+                    fails = 1
+            if fails:
+                hs.status = -999
+            elif opts_done:
+                # check if the energy is higher
+                # than the barrier threshold
+                species_energy = self.species.energy
+                prod_energy = 0.
+                for pr_opt in hs.prod_opt:
+                    prod_energy += pr_opt.species.energy
+                barrier = (prod_energy - species_energy)*constants.AUtoKCAL
+                if barrier > self.par.par['barrier_threshold']:
+                    hs.status = -999
+                else:
+                    hs.status = -1
+        return 0
+
+    def state(self, index):
+        """
+        Summary of the state of homolytic scission index,
+        used to notice the steps that made progress.
+        """
+        hs = self.hss[index]
+        opts = []
+        for opt in hs.prod_opt:
+            opts.append((opt.scycconf, opt.sconf, opt.shigh, opt.shir, opt.restart))
+        return (hs.status, tuple(opts))
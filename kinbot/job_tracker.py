@@ -0,0 +1,105 @@
+import os
+
+
+class JobTracker:
+    """
+    Map from the qc jobs to the objects waiting on them.
+
+    While a waiter (e.g. the index of a reaction) is advanced, every job
+    whose status is checked is recorded as one of its dependencies,
+    together with the status it saw. The waiter only needs to be advanced
+    again if the status of one of these jobs changes, or if the step
+    itself made progress, in which case it is marked dirty right away.
+    """
+
+    def __init__(self, qc):
+        self.qc = qc
+        # key: job name, value: set of waiters
+        self.waiters = {}
+        # key: waiter, value: dictionary from job name to the signature seen
+        self.deps = {}
+        # waiter that is currently being advanced
+        self.current = None
+        # waiters that need to be advanced
+        self.dirty = set()
+
+    def signature(self, job, status):
+        """
+        Status of the job together with the id of its last database row,
+        so that a job that finishes again with the same status is noticed.
+        """
+        entry = self.qc.index.get(job, refresh=0)
+        if entry is None:
+            return (status, None)
+        return (status, entry['id'])
+
+    def observe(self, job, status):
+        """
+        Record that the current waiter saw the job with the given status.
+        """
+        if self.current is None:
+            return
+        self.deps[self.current][job] = self.signature(job, status)
+
+    def start(self, key):
+        """
+        Start recording the dependencies of waiter key,
+        forgetting the ones of its previous step.
+        """
+        self.remove(key)
+        self.deps[key] = {}
+        self.current = key
+
+    def stop(self, changed=0):
+        """
+        Stop recording the dependencies of the current waiter. The
+        waiter stays dirty if it changed or if it does not wait on any job.
+        """
+        key = self.current
+        self.current = None
+        for job in self.deps[key]:
+            self.waiters.setdefault(job, set()).add(key)
+        if changed or len(self.deps[key]) == 0:
+            self.dirty.add(key)
+
+    def remove(self, key):
+        """
+        Forget waiter key.
+        """
+        for job in self.deps.pop(key, {}):
+            self.waiters[job].discard(key)
+            if len(self.waiters[job]) == 0:
+                del self.waiters[job]
+        self.dirty.discard(key)
+
+    def files_stat(self):
+        """
+        Modification times and sizes of the database and of the directories
+        of the jobs, which change when a job writes its results or its log file.
+        Checking them is cheap compared to checking the jobs.
+        """
+        stat = []
+        db = getattr(self.qc, 'db', None)
+        for fname in [getattr(db, 'filename', None), '.', 'hir', 'conf']:
+            try:
+                st = os.stat(fname)
+            except (OSError, TypeError):
+                stat.append(None)
+                continue
+            stat.append((st.st_mtime, st.st_size))
+        return stat
+
+    def poll(self):
+        """
+        Check the status of every job that has waiters, mark the waiters
+        that saw a different status dirty, and return the dirty waiters.
+        """
+        current = self.current
+        self.current = None
+        for job in list(self.waiters):
+            sig = self.signature(job, self.qc.check_qc(job))
+            for key in self.waiters[job]:
+                if self.deps[key][job] != sig:
+                    self.dirty.add(key)
+        self.current = current
+        return set(self.dirty)
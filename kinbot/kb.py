@@ -25,6 +25,7 @@ from kinbot.parameters import Parameters
 from kinbot.mesmer import MESMER
 from kinbot.mess import MESS
 from kinbot.optimize import Optimize
+from kinbot.product_registry import ProductRegistry
 from kinbot.reaction_finder import ReactionFinder
 from kinbot.reaction_generator import ReactionGenerator
 from kinbot.stationary_pt import StationaryPoint
@@ -51,6 +52,26 @@ def main():
 
     # write the license message to the log file
     logging.info(license_message.message)
+
+    for wait in run(par):
+        time.sleep(1)
+
+
+def wait_for(qc, job):
+    """
+    Generator that yields until the job is done.
+    """
+    while qc.check_qc(job) in ['running', 'finalizing']:
+        yield
+
+
+def run(par, queue_status=None):
+    """
+    KinBot run of a well in the current directory. This is a generator
+    that yields every time it waits for calculations, so that the
+    runs of several wells can be done in one process.
+    queue_status is the QueueStatus shared by these runs.
+    """
     # time stamp of the KinBot start
     logging.info('Starting KinBot at {}'.format(datetime.datetime.now()))
 
@@ -104,23 +125,20 @@ def main():
     start_name = well0.name
 
     # initialize the qc instance
-    qc = QuantumChemistry(par)
+    qc = QuantumChemistry(par, queue_status=queue_status)
 
     #only run filecopying if PES is turned on
-    #if par.par['pes']:
-        # check if this well was calcualted before in another directory
-        # this flag indicates that this kinbot run
-        # should wait for the information from another
-        # kinbot run to become available and copy the necessary information
-    #    wait_for_well = 1
-    #    while wait_for_well:
-    #        wait_for_well = filecopying.copy_from_database_folder(well0.chemid, well0.chemid, qc)
-    #        if wait_for_well:
-    #            time.sleep(1)
+    if par.par['pes']:
+        # check if this well was calculated before in another directory,
+        # if another kinbot run is calculating it, wait for the information
+        # to become available, the calculations are then taken from the store
+        while filecopying.copy_from_database_folder(well0.chemid, well0.chemid, qc):
+            yield
 
     # start the initial optimization of the reactant
     logging.info('Starting optimization of intial well')
     qc.qc_opt(well0, well0.geom)
+    yield from wait_for(qc, str(well0.chemid) + '_well')
     err, well0.geom = qc.get_qc_geom(str(well0.chemid) + '_well',
                                      well0.natom, wait=1)
     err, well0.freq = qc.get_qc_freq(str(well0.chemid) + '_well',
@@ -143,6 +161,7 @@ def main():
     # to compare Beta scission barrier heigths to
     logging.info('Starting MP2 optimization of intial well')
     qc.qc_opt(well0, well0.geom, mp2=1)
+    yield from wait_for(qc, str(well0.chemid) + '_well_mp2')
     err, geom = qc.get_qc_geom(str(well0.chemid) + '_well_mp2', well0.natom, 1)
 
     # characterize again and look for differences
@@ -153,8 +172,12 @@ def main():
     err, well0.energy = qc.get_qc_energy(str(well0.chemid) + '_well', 1)
     err, well0.zpe = qc.get_qc_zpe(str(well0.chemid) + '_well', 1)
 
-    well_opt = Optimize(well0, par, qc, wait=1)
-    well_opt.do_optimization()
+    well_opt = Optimize(well0, par, qc)
+    while 1:
+        well_opt.do_optimization()
+        if well_opt.shir == 1 or well_opt.shigh == -999:
+            break
+        yield
     if well_opt.shigh == -999:
         logging.error('Error with high level optimization of initial structure.')
         return
@@ -164,18 +187,32 @@ def main():
         # check if the information on this well has to be copied to a database
         filecopying.copy_to_database_folder(well0.chemid, well0.chemid, qc)
 
+    # products of the reactions and homolytic scissions of the well
+    registry = ProductRegistry(par, qc)
+
     # do the reaction search using heuristics
     if par.par['reaction_search'] == 1:
         logging.info('Starting reaction searches of intial well')
         rf = ReactionFinder(well0, par, qc)
         rf.find_reactions()
-        rg = ReactionGenerator(well0, par, qc)
-        rg.generate()
     # do the homolytic scission products search
+    scissions = None
     if par.par['homolytic_scissions'] == 1:
         logging.info('Starting the search for homolytic scission products')
-        well0.homolytic_scissions = HomolyticScissions(well0, par, qc)
-        well0.homolytic_scissions.find_homolytic_scissions()
+        scissions = HomolyticScissions(well0, par, qc, registry)
+        scissions.find_homolytic_scissions()
+        well0.homolytic_scissions = scissions
+    # run the reaction searches and the homolytic scission product optimizations
+    if par.par['reaction_search'] == 1 or scissions is not None:
+        rg = ReactionGenerator(well0, par, qc, registry, scissions)
+        if par.par['async_generate'] and queue_status is not None:
+            # the event loop would block the other wells of the process
+            logging.warning('async_generate is not used when the run is part of a pes process')
+            yield from rg.generate_steps()
+        elif par.par['async_generate']:
+            rg.generate()
+        else:
+            yield from rg.generate_steps()
   
     # initialize the master equation instance
     mess = MESS(par, well0)
@@ -185,7 +222,7 @@ def main():
     if par.par['me'] == 1:
         logging.info('Starting Master Equation calculations')
         if par.par['me_code'] == 'mess':
-            mess.run()
+            yield from mess.run_steps(qc.queue_status)
         elif par.par['me_code'] == '#mesmer':
             mesmer.run()
         else:
@@ -0,0 +1,177 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+
+
+def default_owner():
+    """
+    Name of this pes worker, unique on the cluster.
+    """
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+class LeaseTable:
+    """
+    Table of the wells of a pes search shared by several pes workers,
+    possibly on different hosts, in an sqlite database on a shared disk.
+
+    A worker claims a well by taking its lease, which has to be renewed
+    by heartbeats while the well is running. A well whose lease expired,
+    e.g. because its worker died, is claimed again by another worker.
+    The claims are done in a single write transaction, so a well is
+    never given to two workers at the same time.
+
+    The main pes process starts a search by writing a new run id,
+    which it renews like a lease while it runs. The workers wait
+    for a live run, so that they do not pick up the wells left
+    in the table by a previous search.
+    """
+
+    def __init__(self, fname, owner=None, lease_time=600.):
+        self.fname = fname
+        if owner is None:
+            owner = default_owner()
+        self.owner = owner
+        self.lease_time = lease_time
+        # key: chemid, value: time of the last renewal of the leases of this worker
+        self.renewed = {}
+        # id of the search started by this process and the time of its last renewal
+        self.run_id = None
+        self.run_renewed = 0.
+        self.conn = sqlite3.connect(fname, timeout=60, isolation_level=None)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS leases '
+                          '(n INTEGER PRIMARY KEY AUTOINCREMENT, chemid TEXT UNIQUE, '
+                          'owner TEXT, expires REAL, done INTEGER)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS run '
+                          '(id INTEGER PRIMARY KEY CHECK (id = 0), run_id TEXT, expires REAL)')
+
+    def close(self):
+        self.conn.close()
+
+    def start_run(self):
+        """
+        Start a new pes search, done by the main pes process after
+        writing the chemids. The wells of the previous search are
+        forgotten and the new run id is written in one transaction.
+        Returns the run id.
+        """
+        run_id = uuid.uuid4().hex
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.execute('DELETE FROM leases')
+            self.conn.execute('INSERT OR REPLACE INTO run VALUES (0, ?, ?)',
+                              (run_id, now + self.lease_time))
+        finally:
+            self.conn.execute('COMMIT')
+        self.run_id = run_id
+        self.run_renewed = now
+        return run_id
+
+    def run_heartbeat(self, force=0):
+        """
+        Renew the run started by this process, at the same rate as the leases.
+        """
+        now = time.time()
+        if self.run_id is None or (not force and now - self.run_renewed < self.lease_time / 3.):
+            return 0
+        self.conn.execute('UPDATE run SET expires = ? WHERE run_id = ?',
+                          (now + self.lease_time, self.run_id))
+        self.run_renewed = now
+        return 1
+
+    def current_run(self):
+        """
+        Return the id of the search whose main process is running, or None.
+        """
+        row = self.conn.execute('SELECT run_id FROM run WHERE expires >= ?', (time.time(),)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def add(self, chemids):
+        """
+        Add the wells that are new to the table.
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany('INSERT OR IGNORE INTO leases (chemid, owner, expires, done) '
+                                  'VALUES (?, NULL, 0, 0)', [(chemid,) for chemid in chemids])
+        finally:
+            self.conn.execute('COMMIT')
+
+    def claim(self):
+        """
+        Take the lease of the first well that is not done and not leased,
+        or whose lease expired. Returns its chemid, or None if there is none.
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute('SELECT chemid FROM leases WHERE done = 0 AND '
+                                    '(owner IS NULL OR expires < ?) ORDER BY n LIMIT 1',
+                                    (now,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('UPDATE leases SET owner = ?, expires = ? WHERE chemid = ?',
+                              (self.owner, now + self.lease_time, row[0]))
+        finally:
+            self.conn.execute('COMMIT')
+        self.renewed[row[0]] = now
+        return row[0]
+
+    def heartbeat(self, chemids, force=0):
+        """
+        Renew the leases of the wells this worker is running. A lease is
+        only written when a third of its time has passed since the last
+        renewal. Returns the wells whose lease was taken by another worker.
+        """
+        now = time.time()
+        lost = []
+        for chemid in chemids:
+            if not force and now - self.renewed.get(chemid, 0.) < self.lease_time / 3.:
+                continue
+            cur = self.conn.execute('UPDATE leases SET expires = ? WHERE chemid = ? '
+                                    'AND owner = ? AND done = 0',
+                                    (now + self.lease_time, chemid, self.owner))
+            if cur.rowcount == 0:
+                lost.append(chemid)
+                self.renewed.pop(chemid, None)
+            else:
+                self.renewed[chemid] = now
+        return lost
+
+    def finish(self, chemid):
+        """
+        Mark the well done if this worker holds its lease.
+        Returns 0 if the lease was taken by another worker.
+        """
+        cur = self.conn.execute('UPDATE leases SET done = 1, expires = 0 WHERE chemid = ? '
+                                'AND owner = ?', (chemid, self.owner))
+        self.renewed.pop(chemid, None)
+        return int(cur.rowcount > 0)
+
+    def done(self):
+        """
+        Return the chemids of the wells that are done, in the order they were added.
+        """
+        return [row[0] for row in self.conn.execute('SELECT chemid FROM leases WHERE done = 1 ORDER BY n')]
+
+    def all_done(self, get_chemids=None):
+        """
+        True if all the wells in the table are done.
+        get_chemids returns the current wells of the search, they are read
+        and added in the same transaction as the check, so that the wells
+        added by a run that just finished are not missed.
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_chemids is not None:
+                self.conn.executemany('INSERT OR IGNORE INTO leases (chemid, owner, expires, done) '
+                                      'VALUES (?, NULL, 0, 0)', [(chemid,) for chemid in get_chemids()])
+            row = self.conn.execute('SELECT COUNT(*) FROM leases WHERE done = 0').fetchone()
+        finally:
+            self.conn.execute('COMMIT')
+        return row[0] == 0
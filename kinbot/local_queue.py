@@ -0,0 +1,74 @@
+import os
+import logging
+import subprocess
+
+
+class LocalQueue:
+    """
+    Run the job scripts on the local machine with a bounded pool of processes.
+
+    At most local_cores / ppn jobs run at the same time, the others wait
+    in the order of submission. The jobs are followed through their
+    process handles, every job gets a synthetic job id that is used
+    the same way as the ids of the batch schedulers.
+    """
+
+    def __init__(self, par):
+        cores = par.par['local_cores']
+        if cores <= 0:
+            cores = os.cpu_count() or 1
+        self.max_jobs = max(1, cores // max(1, par.par['ppn']))
+        # key: job id, value: (Popen object, open output files)
+        self.running = {}
+        # jobs waiting for a free slot, list of (job id, command, cwd, stdout, stderr)
+        self.waiting = []
+        self.n_submitted = 0
+
+    def submit(self, script, stdout=os.devnull, stderr=os.devnull):
+        """
+        Add a shell script to the pool and return its job id.
+        The script is run from the current working directory.
+        """
+        self.n_submitted += 1
+        pid = 'local{}'.format(self.n_submitted)
+        self.waiting.append((pid, ['bash', script], os.getcwd(), stdout, stderr))
+        self.poll()
+        return pid
+
+    def poll(self):
+        """
+        Collect the finished processes and start waiting jobs on the free slots.
+        Returns a dictionary from job id to state,
+        R for running and PD for waiting jobs.
+        """
+        for pid in list(self.running):
+            process, files = self.running[pid]
+            if process.poll() is not None:
+                for f in files:
+                    f.close()
+                if process.returncode != 0:
+                    logging.debug('Local job {} exited with code {}'.format(pid, process.returncode))
+                del self.running[pid]
+
+        while len(self.waiting) > 0 and len(self.running) < self.max_jobs:
+            pid, command, cwd, stdout, stderr = self.waiting.pop(0)
+            files = [open(os.path.join(cwd, stdout), 'w'), open(os.path.join(cwd, stderr), 'w')]
+            process = subprocess.Popen(command, cwd=cwd, shell=False,
+                                       stdin=subprocess.DEVNULL, stdout=files[0], stderr=files[1])
+            self.running[pid] = (process, files)
+
+        jobs = {}
+        for pid in self.running:
+            jobs[pid] = 'R'
+        for job in self.waiting:
+            jobs[job[0]] = 'PD'
+        return jobs
+
+    def wait(self):
+        """
+        Wait for all the jobs to finish.
+        """
+        while len(self.running) > 0 or len(self.waiting) > 0:
+            for pid in list(self.running):
+                self.running[pid][0].wait()
+            self.poll()
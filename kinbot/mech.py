@@ -0,0 +1,127 @@
+"""
+Batch exploration of the species of a chemical mechanism.
+
+The species of the reactions of a Chemkin mechanism, read with
+read_mech, are the seeds of a pes search: each unique chemid in the
+carbon range of the input gets its own kinbot run. The runs are done
+by the pes driver, under the same limits of simultaneous runs and
+queued jobs, and the wells found by one run are not explored again
+by the others. The most expensive species are started first, so that
+they do not end up running alone at the end.
+
+The multiplicity of a species can be given in a third column of the
+smiles file, otherwise it is derived from the smiles.
+"""
+from __future__ import print_function
+import sys
+import os
+import logging
+import datetime
+
+from kinbot import cheminfo
+from kinbot import license_message
+from kinbot import pes
+from kinbot.lease_table import LeaseTable
+from kinbot.parameters import Parameters
+from kinbot.read_mech import read_mech, read_multiplicities
+from kinbot.stationary_pt import StationaryPoint
+
+# species whose usual smiles has no unpaired electrons,
+# but whose ground state is a triplet
+triplets = ['O=O']
+
+
+def main():
+    try:
+        input_file, mech_file, smi_file = sys.argv[1:4]
+    except ValueError:
+        print('To use the mech script, supply the input file, the mechanism file '
+              'and the file with the smiles of the species!')
+        sys.exit(-1)
+
+    # print the license message to the console
+    print(license_message.message)
+
+    # initialize the parameters
+    par = Parameters(input_file)
+
+    # set up the logging environment
+    logging.basicConfig(filename='mech.log', level=logging.INFO)
+
+    logging.info(license_message.message)
+    logging.info('Starting the mechanism exploration at {}'.format(datetime.datetime.now()))
+
+    rxns = read_mech(mech_file, smi_file)
+    seeds = get_seeds(rxns, par, read_multiplicities(smi_file))
+    logging.info('Exploring {} species'.format(len(seeds)))
+
+    # the wells are shared with other pes workers through a lease table
+    lease = None
+    if par.par['pes_distributed']:
+        lease = LeaseTable(pes.lease_file, lease_time=par.par['pes_lease_time'])
+
+    with open('chemids', 'w') as f:
+        for st_pt in seeds:
+            pes.write_input(par, st_pt, par.par['barrier_threshold'], os.getcwd())
+            f.write(str(st_pt.chemid) + '\n')
+    if lease is not None:
+        # the workers start once the chemids are written
+        lease.start_run()
+
+    # the species are on different pess, which are not postprocessed together
+    pes.search(par, lease, write_pes=0)
+
+
+def get_multiplicity(smi, mults):
+    """
+    Multiplicity of the species, taken from the multiplicities given
+    in the smiles file, the known triplets or the smiles.
+    """
+    if smi in mults:
+        return mults[smi]
+    if smi in triplets:
+        return 3
+    return cheminfo.get_multiplicity(smi)
+
+
+def get_seeds(rxns, par, mults=None):
+    """
+    Return the unique species of the reactions with a number of carbon
+    atoms in the range of the parameters, ordered by decreasing cost.
+    mults: multiplicities given in the smiles file, key: smiles
+    """
+    if mults is None:
+        mults = {}
+    smiles = []
+    for rxn in rxns:
+        for smi in rxn[0] + rxn[1]:
+            if smi not in smiles:
+                smiles.append(smi)
+    seeds = {}
+    for smi in smiles:
+        st_pt = StationaryPoint('well0',
+                                par.par['charge'],
+                                get_multiplicity(smi, mults),
+                                smiles=smi)
+        n_carbon = list(st_pt.atom).count('C')
+        if n_carbon < par.par['mech_min_carbon'] or n_carbon > par.par['mech_max_carbon']:
+            continue
+        st_pt.characterize()
+        if st_pt.chemid in seeds:
+            logging.info('{} is the same species as {}'.format(smi, seeds[st_pt.chemid].smiles))
+            continue
+        seeds[st_pt.chemid] = st_pt
+    return sorted(seeds.values(), key=cost, reverse=True)
+
+
+def cost(st_pt):
+    """
+    Estimated cost of the exploration of a species, first by the
+    number of heavy atoms, then by the number of rotors.
+    """
+    heavy = len([at for at in st_pt.atom if at != 'H'])
+    return heavy, len(st_pt.dihed)
+
+
+if __name__ == "__main__":
+    main()
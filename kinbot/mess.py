@@ -632,6 +632,31 @@ class MESS:
         submit the pbs/slurm file to the queue
         wait for the mess run to finish
         """
+        for wait in self.run_steps():
+            time.sleep(1)
+        return 0
+
+    def run_steps(self, queue_status=None):
+        """
+        Same as run, as a generator that yields while the mess job is in the
+        queue, so that the kinbot run of a well can be advanced in turns.
+        If the QueueStatus of the run is given, the job is looked up in its
+        snapshots of the queue instead of asking the scheduler in every step.
+        """
+        pid = self.submit()
+        if queue_status is None:
+            while self.is_running(pid):
+                yield
+        else:
+            queue_status.add(pid)
+            while queue_status.is_running(pid):
+                yield
+
+    def submit(self):
+        """
+        write a pbs or slurm file for the me/all.inp mess input file,
+        submit it to the queue and return the job id
+        """
         # open the the header and the specific templates
         if self.par.par['queue_template'] == '':
             q_file = pkg_resources.resource_filename('tpl', self.par.par['queuing'] + '.tpl')
@@ -663,18 +688,20 @@ class MESS:
             pid = out.split('\n')[0].split('.')[0]
         elif self.par.par['queuing'] == 'slurm':
             pid = out.split('\n')[0].split()[-1]
+        return pid
 
-        while 1:  
-            devnull = open(os.devnull, 'w')
-            if self.par.par['queuing'] == 'pbs':
-                command = 'qstat -f | grep ' + '"Job Id: ' + pid + '"' + ' > /dev/null'
-            elif self.par.par['queuing'] == 'slurm':
-                command = 'scontrol show job ' + pid + ' | grep "JobId=' + pid + '"' + ' > /dev/null'
-            if int(subprocess.call(command, shell=True, stdout=devnull, stderr=devnull)) == 0:
-                time.sleep(1)
-            else:
-                break
-        return 0
+    def is_running(self, pid):
+        """
+        True if the mess job is still in the queue.
+        """
+        devnull = open(os.devnull, 'w')
+        if self.par.par['queuing'] == 'pbs':
+            command = 'qstat -f | grep ' + '"Job Id: ' + pid + '"' + ' > /dev/null'
+        elif self.par.par['queuing'] == 'slurm':
+            command = 'scontrol show job ' + pid + ' | grep "JobId=' + pid + '"' + ' > /dev/null'
+        running = int(subprocess.call(command, shell=True, stdout=devnull, stderr=devnull)) == 0
+        devnull.close()
+        return running
 
 
 
@@ -1,9 +1,131 @@
 import os
+import json
 import pkg_resources
 import numpy as np
 
 from kinbot import constants
 
+# sidecar file in the directory of the outputs with the energies read from them,
+# each line is a json record with the name, mtime and size of the output,
+# the key and the energy, only the energies that were found are written
+energy_index_file = 'energies.jsonl'
+
+# energies read in this process
+# key: absolute path of the directory,
+# value: dictionary from output name to [mtime, size, {key: energy}]
+energy_index = {}
+
+# size of the blocks in which the outputs are read from the end
+block_size = 8192
+
+
+def read_energy(fname, key):
+    """
+    Read the last energy set for key in the molpro output fname.
+    The file is read backwards in blocks, so usually only its end is read.
+    Returns None if the energy is not there.
+    """
+    target = ('SETTING ' + key).encode()
+    with open(fname, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        rest = b''
+        while pos > 0:
+            n = min(block_size, pos)
+            pos -= n
+            f.seek(pos)
+            lines = (f.read(n) + rest).split(b'\n')
+            if pos > 0:
+                # the first line can continue in the previous block
+                rest = lines.pop(0)
+            for line in reversed(lines):
+                if target in line:
+                    return float(line.split()[3])
+    return None
+
+
+def load_energy_index(directory):
+    """
+    Return the energies read from the outputs in the directory,
+    the sidecar file is only read the first time. If it has records
+    of outputs that changed since, it is rewritten without them.
+    """
+    directory = os.path.abspath(directory)
+    if directory not in energy_index:
+        index = {}
+        fname = os.path.join(directory, energy_index_file)
+        nlines = 0
+        if os.path.exists(fname):
+            with open(fname) as f:
+                for line in f:
+                    nlines += 1
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        # line that is still being written
+                        continue
+                    entry = index.get(rec['name'])
+                    if entry is None or entry[:2] != [rec['mtime'], rec['size']]:
+                        entry = [rec['mtime'], rec['size'], {}]
+                        index[rec['name']] = entry
+                    entry[2][rec['key']] = rec['energy']
+        if nlines > sum(len(entry[2]) for entry in index.values()):
+            write_energy_index(directory, index)
+        energy_index[directory] = index
+    return energy_index[directory]
+
+
+def energy_records(name, entry):
+    """
+    Lines of the sidecar file of an output.
+    """
+    return [json.dumps({'name': name, 'mtime': entry[0], 'size': entry[1],
+                        'key': key, 'energy': entry[2][key]}) + '\n' for key in entry[2]]
+
+
+def write_energy_index(directory, index):
+    """
+    Write the sidecar file with one record per output and key.
+    The file is written under a temporary name and then moved in place.
+    """
+    fname = os.path.join(directory, energy_index_file)
+    tmp_file = '{}.{}.tmp'.format(fname, os.getpid())
+    with open(tmp_file, 'w') as f:
+        for name, entry in index.items():
+            f.writelines(energy_records(name, entry))
+    os.replace(tmp_file, fname)
+
+
+def get_output_energy(fname, key):
+    """
+    Return the last energy set for key in the molpro output fname,
+    or None if the output or the energy is not there.
+    The energies are cached in the sidecar file of the directory of
+    the output, and an output is only read again if its modification
+    time or size changed.
+    """
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    directory, name = os.path.split(fname)
+    index = load_energy_index(directory)
+    entry = index.get(name)
+    if entry is None or entry[:2] != [st.st_mtime, st.st_size]:
+        entry = [st.st_mtime, st.st_size, {}]
+        index[name] = entry
+    if key in entry[2]:
+        return entry[2][key]
+    energy = read_energy(fname, key)
+    if energy is not None:
+        # an output that does not have the energy yet is read again
+        # at the next call, a finished one is only written once
+        entry[2][key] = energy
+        # appending keeps the writes small, the last record of an output wins
+        with open(os.path.join(os.path.abspath(directory), energy_index_file), 'a') as f:
+            f.writelines(energy_records(name, [st.st_mtime, st.st_size, {key: energy}]))
+    return energy
+
 
 class Molpro:
     """
@@ -64,16 +186,10 @@ class Molpro:
         if self.species.wellorts:
             fname = self.species.name
 
-        status = os.path.exists('molpro/' + fname + '.out')
-        if status:
-            with open('molpro/' + fname + '.out') as f:
-                lines = f.readlines()
-
-            for index, line in enumerate(reversed(lines)):
-                if ('SETTING ' + key) in line:
-                    return 1, float(line.split()[3])
-        else:
+        energy = get_output_energy('molpro/' + fname + '.out', key)
+        if energy is None:
             return 0, -1
+        return 1, energy
 
     def create_molpro_submit(self):
         """
@@ -63,6 +63,34 @@ class Optimize:
         # maximum restart count
         self.max_restart = par.par['rotation_restart']
 
+    def status(self):
+        """
+        Status of the parts of the optimization, as saved in the checkpoint.
+        """
+        return [self.scycconf, self.sconf, self.shigh, self.shir, self.restart]
+
+    def restore(self, status):
+        """
+        Restore the status saved by status() after a restart.
+        A failed optimization stays failed, and a finished one is
+        followed through again, which only reads the finished jobs,
+        to rebuild the conformers, the rotors and the frequencies.
+        The bookkeeping of the conformers and the rotors of an
+        optimization that was still running is not saved, these
+        continue from the start, picking up the jobs already done.
+        """
+        scycconf, sconf, shigh, shir, restart = status
+        if shigh == -999:
+            self.scycconf, self.sconf, self.shigh, self.shir, self.restart = status
+        elif shir == 1:
+            wait = self.wait
+            self.wait = 1
+            try:
+                self.do_optimization()
+            finally:
+                self.wait = wait
+        return 0
+
     def do_optimization(self):
         while 1:
             # do the conformational search
@@ -145,14 +173,15 @@ class Optimize:
                         if self.shigh == 0:
                             # high level calculation is running
                             # check if it is finished
-                            status = self.qc.check_qc(self.job_high)
+                            result = self.qc.get_qc_result(self.job_high)
+                            status = result.status
                             if status == 'error':
                                 # found an error
                                 logging.info('\tHigh level optimization failed for {}'.format(self.species.name))
                                 self.shigh = -999
                             if status == 'normal':
                                 # finished successfully
-                                err, new_geom = self.qc.get_qc_geom(self.job_high, self.species.natom, wait=self.wait)
+                                new_geom = result.geom
                                 
                                 if self.species.wellorts: # for TS we need reasonable geometry agreement and normal mode correlation
                                     if self.par.par['conformer_search'] == 0:
@@ -174,10 +203,10 @@ class Optimize:
                        
                                 if same_geom:
                                     # geometry is as expected and normal modes are the same for TS
-                                    err, self.species.geom = self.qc.get_qc_geom(self.job_high, self.species.natom)
-                                    err, self.species.energy = self.qc.get_qc_energy(self.job_high)
-                                    err, self.species.freq = self.qc.get_qc_freq(self.job_high, self.species.natom)
-                                    err, self.species.zpe = self.qc.get_qc_zpe(self.job_high)
+                                    self.species.geom = result.geom
+                                    self.species.energy = result.energy
+                                    self.species.freq = result.freq
+                                    self.species.zpe = result.zpe
                                     self.shigh = 1
                                 else:
                                     # geometry diverged to other structure
@@ -224,14 +253,10 @@ class Optimize:
 
                                                 err, self.species.geom = self.qc.get_qc_geom(job, self.species.natom)
                                                 # delete the high_level log file and the hir log files
-                                                if os.path.exists(self.job_high + '.log'):
-                                                    # logging.info("\t\t\tRemoving file " + self.job_high + '.log')
-                                                    os.remove(self.job_high + '.log')
+                                                self.qc.remove_log(self.job_high)
                                                 for rotor in range(len(self.species.dihed)):
                                                     for ai in range(self.species.hir.nrotation):
-                                                        if os.path.exists(self.job_hir + str(rotor) + '_' + str(ai).zfill(2) + '.log'):
-                                                            # logging.info("\t\t\tRemoving file " + self.job_hir + str(rotor) + '_' + str(ai).zfill(2) + '.log')
-                                                            os.remove(self.job_hir + str(rotor) + '_' + str(ai).zfill(2) + '.log')
+                                                        self.qc.remove_log(self.job_hir + str(rotor) + '_' + str(ai).zfill(2))
                                                 # set the status of high and hir back to not started
                                                 self.shigh = -1
                                                 self.shir = -1
@@ -67,8 +67,40 @@ class Parameters:
             'barrier_threshold': 100.,
             # Number of 0.1 Angstrom steps in bond scans
             'scan_step': 30,
+            # Run all the constrained steps of a ts search before the
+            # saddle point search in a single job
+            'ts_step_chain': 0,
+            # Follow the reactions as asyncio coroutines, woken up when
+            # one of the jobs they wait on changes its status,
+            # not used by the kinbot runs of a pes search with pes_in_process
+            'async_generate': 0,
+            # Time in seconds between two checks for new results in async_generate mode,
+            # only the database and the job directories are checked, the jobs themselves
+            # when these changed, or every queue_poll_interval seconds
+            'async_poll_interval': 0.1,
+            # Save the state of the reaction searches in kinbot_checkpoint.json
+            # and continue from it when KinBot is restarted
+            'checkpoint': 0,
             # Do a full PES scan instead of one well
             'pes': 0,
+            # Update the PESViewer and MESS inputs of a pes search every time a kinbot run finishes,
+            # with the L2 energies, the L3 files are only written at the end
+            'pes_update': 0,
+            # Number of the lowest pathways shown by the allpaths task of a pes search
+            'pes_paths': 10,
+            # Run the kinbot runs of a pes search in the pes process instead of
+            # separate processes, sharing the queue polling and the queue_job_limit
+            'pes_in_process': 0,
+            # Share the wells of a pes search with pes workers on other hosts,
+            # started with 'pes input.json worker' in the same directory
+            'pes_distributed': 0,
+            # Time in seconds after which the well of a pes worker
+            # that stopped sending heartbeats is given to another worker
+            'pes_lease_time': 600.,
+            # Range of the number of carbon atoms of the species
+            # of a mechanism explored by the mech script
+            'mech_min_carbon': 1,
+            'mech_max_carbon': 100,
             # Maximum number of simultaneous kinbot runs in a pes search
             'simultaneous_kinbot': 5,
             # Perform high level optimization and freq calculation (L2)
@@ -151,7 +183,7 @@ class Parameters:
 
             # COMPUTATIONAL ENVIRONEMNT
             # Which queuing system to use
-            'queuing': 'pbs',  # or slurm
+            'queuing': 'pbs',  # or slurm, or local to run the jobs on this machine
             # Template for queue:
             'queue_template': '',
             # Name of the queue
@@ -160,6 +192,8 @@ class Parameters:
             'slurm_feature': '',
             # Number of cores to run the L0-L2 qc jobs on
             'ppn': 1,
+            # Number of cores used by the local queuing, if 0, all the cores of the machine
+            'local_cores': 0,
             # Number of cores to run the L3 qc jobs on
             'single_point_ppn': 1,
             # This many spaces can be used for numbering files, e.g., in ga
@@ -168,10 +202,24 @@ class Parameters:
             'delete_intermediate_files' : 0,
             # Scratch directory
             'scratch': '/scratch/jzador',
-            # User name
-            'username': 'jzador',
+            # User name whose jobs count for the queue_job_limit,
+            # the user running KinBot if empty
+            'username': '',
+            # Directory of the cache of qc calculations shared between wells and runs,
+            # no cache is used if empty
+            'qc_cache': '',
             # Max. number of job from user in queue, if negative, ignored
             'queue_job_limit' : -1,
+            # Order in which the jobs are submitted when queue_job_limit is reached,
+            # lower numbers go first. Kinds: ts_end (final ts search and ts optimization),
+            # irc, well (optimization and frequencies of wells and products),
+            # ts_search (constrained ts search steps), hir and conf
+            'queue_priority': {'ts_end': 0, 'irc': 0, 'well': 1, 'ts_search': 2, 'hir': 3, 'conf': 4},
+            # Minimum time in seconds between two queries of the queuing system
+            'queue_poll_interval': 10,
+            # Time in seconds a job found in the database is reported as finalizing
+            # while its log file is not visible, after that it is considered missing
+            'finalize_wait': 10,
 
             # MASTER EQUATION
             # Which ME code to use:
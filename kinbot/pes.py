@@ -7,13 +7,15 @@ from __future__ import absolute_import
 import sys
 import os
 import stat
+import glob
 import shutil
 import logging
 import datetime
 import time
 import subprocess
 import json
-from distutils.dir_util import copy_tree
+import heapq
+import collections
 import pkg_resources
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -24,10 +26,32 @@ from ase.db import connect
 
 from kinbot import constants
 from kinbot import license_message
+from kinbot import molpro
+from kinbot.lease_table import LeaseTable
 from kinbot.parameters import Parameters
+from kinbot.result_index import mtime_resolution
 from kinbot.stationary_pt import StationaryPoint
 from kinbot.mess import MESS
 
+# lease table of the wells of a distributed pes search
+lease_file = 'pes_leases.db'
+
+# parsed summary files, see read_summary
+# key: file name, value: ((mtime, size) of the file, list of split lines)
+summary_cache = {}
+
+# energies and zpes of the jobs of the wells, see load_energies
+# key: directory, value: ((mtime, size) of the database, {job name: (energy, zpe)}, time of the read)
+energy_cache = {}
+
+
+class MissingJobError(Exception):
+    """
+    A job of a well is not in the database of the well, e.g. because
+    the well is still running or its kinbot run failed.
+    """
+    pass
+
 
 def main():
     try:
@@ -40,11 +64,15 @@ def main():
     # change this to nice argument parsers with
     # dashes etc.
     no_kinbot = 0
+    # worker of a distributed pes search, started next to the main pes run
+    worker = 0
     task = 'all'
     names = []
     if len(sys.argv) > 2:
         if sys.argv[2] == 'no-kinbot':
             no_kinbot = 1
+        elif sys.argv[2] == 'worker':
+            worker = 1
     if len(sys.argv) > 3:
         # possible tasks are:
         # 1. all: This is the default showing all pathways
@@ -64,7 +92,10 @@ def main():
     par = Parameters(input_file)
 
     # set up the logging environment
-    logging.basicConfig(filename='pes.log', level=logging.INFO)
+    if worker:
+        logging.basicConfig(filename='pes_worker_{}.log'.format(os.getpid()), level=logging.INFO)
+    else:
+        logging.basicConfig(filename='pes.log', level=logging.INFO)
 
     logging.info(license_message.message)
     msg = 'Starting the PES search at {}'.format(datetime.datetime.now())
@@ -74,18 +105,54 @@ def main():
         logging.error('Specific reaction cannot be searched in PES mode.')
         return
 
-    well0 = StationaryPoint('well0',
-                            par.par['charge'],
-                            par.par['mult'],
-                            smiles=par.par['smiles'],
-                            structure=par.par['structure'])
-    well0.characterize(dimer=par.par['dimer'])
-    write_input(par, well0, par.par['barrier_threshold'], os.getcwd()) 
+    # the wells are shared with other pes workers through a lease table
+    lease = None
+    if (par.par['pes_distributed'] or worker) and not no_kinbot:
+        lease = LeaseTable(lease_file, lease_time=par.par['pes_lease_time'])
+
+    if worker:
+        # the main pes run starts the search, wait until it runs,
+        # the chemids and wells of a previous search are not used
+        if lease is None:
+            while not os.path.exists('chemids'):
+                time.sleep(1)
+        else:
+            while lease.current_run() is None:
+                time.sleep(1)
+            logging.info('Joined the pes search {}'.format(lease.current_run()))
+    else:
+        well0 = StationaryPoint('well0',
+                                par.par['charge'],
+                                par.par['mult'],
+                                smiles=par.par['smiles'],
+                                structure=par.par['structure'])
+        well0.characterize(dimer=par.par['dimer'])
+        write_input(par, well0, par.par['barrier_threshold'], os.getcwd()) 
+
+        # add the initial well to the chemids
+        with open('chemids', 'w') as f:
+            f.write(str(well0.chemid) + '\n')
+        if lease is not None:
+            # the workers start once the chemids are written
+            lease.start_run()
 
-    # add the initial well to the chemids
-    with open('chemids', 'w') as f:
-        f.write(str(well0.chemid) + '\n')
+    search(par, lease, no_kinbot, worker, task, names)
 
+
+def search(par, lease=None, no_kinbot=0, worker=0, task='all', names=None, write_pes=1):
+    """
+    Run kinbot for all the wells in the chemids file, including the ones
+    added by the kinbot runs, and postprocess the pes.
+    par: parameters of the search
+    lease: LeaseTable if the wells are shared with other pes workers
+    no_kinbot: only postprocess the kinbot runs that were done before
+    worker: this is a worker of a distributed search, no postprocessing is done
+    task, names: filter of the pes, see filter
+    write_pes: write the PESViewer and MESS inputs of the wells,
+    only makes sense if all the wells are on the same pes
+    """
+    if names is None:
+        names = []
     # create a directory for the L3 single point calculations 
     # directory has the name of the code, e.g., molpro
     try:
@@ -103,8 +170,13 @@ def main():
     finished = []
     # list of all jobs
     jobs = []
-    # dict of the pid's for all jobs
-    pids = {}
+    # dict of the Popen objects of all jobs, or of the WellRun
+    # objects if the kinbot runs are done in this process
+    processes = {}
+    scheduler = None
+    if par.par['pes_in_process'] and not no_kinbot:
+        from kinbot.well_scheduler import WellScheduler
+        scheduler = WellScheduler(par)
     a = 0
     b = 0
     c = 0
@@ -113,12 +185,12 @@ def main():
         if j != a:
             logging.info('{0} {1} {2}'.format("len(jobs): ", j, "\n"))
         a=j
-        with open('chemids', 'r') as f:
-            jobs = f.read().split('\n')
-            jobs = [ji for ji in jobs if ji != '']
+        jobs = read_chemids()
 
         if len(jobs) > j:
             logging.info('\tPicked up new jobs: ' + ' '.join(jobs[j:]))
+            if lease is not None:
+                lease.add(jobs[j:])
 
         k = len(running)
         l = len(finished)
@@ -129,15 +201,26 @@ def main():
             logging.info('{0} {1} {2}'.format("len(finished): ", len(finished), "\n"))
         c = l
         
-        if len(finished) == len(jobs):
+        if lease is not None:
+            # the other workers can still add wells while finishing theirs,
+            # the wells are read again together with the check
+            if len(running) == 0 and lease.all_done(read_chemids):
+                break
+        elif len(finished) == len(jobs):
             time.sleep(2)
             if len(finished) == len(jobs):    
                  break
 
-        while (len(running) < max_running and
-               len(running) + len(finished) < len(jobs)):
+        while len(running) < max_running:
             # start a new job
-            job = jobs[len(running) + len(finished)]
+            if lease is not None:
+                job = lease.claim()
+                if job is None:
+                    break
+            elif len(running) + len(finished) < len(jobs):
+                job = jobs[len(running) + len(finished)]
+            else:
+                break
             kb = 1
             logging.info('Job: {}'.format(job))
             if 'none' in skipChemids:
@@ -147,28 +230,47 @@ def main():
                     kb = 0
             logging.info('kb: {}'.format(kb))
             if kb == 1:
-                pid = 0
-                if not no_kinbot:
-                    pid = submit_job(job, par)  # kinbot is submitted here
+                process = 0
+                if scheduler is not None:
+                    prepare_job(job, par)
+                    process = scheduler.submit(job)
+                elif not no_kinbot:
+                    process = submit_job(job, par)  # kinbot is submitted here
                 else:
                     get_wells(job)
-                pids[job] = pid
+                processes[job] = process
                 t = datetime.datetime.now()
                 logging.info('\tStarted job {} at {}'.format(job, t))
                 running.append(job)
             elif kb == 0:
                 logging.info('Skipping Kinbot for {}'.format(job))
                 finished.append(job)
+                if lease is not None:
+                    lease.finish(job)
             else:
                 logging.info('kb value not 0 or 1')
 
+        if scheduler is not None:
+            scheduler.step()
+
+        if lease is not None:
+            if not worker:
+                lease.run_heartbeat()
+            for job in lease.heartbeat(running):
+                # the lease expired and another worker took the well
+                logging.warning('Lost the lease of {}, stopping it'.format(job))
+                processes[job].terminate()
+                running.remove(job)
+
         # check if a thread is done
         for job in running:
-            if not check_status(job, pids[job]):
+            if not check_status(job, processes[job]):
                 t = datetime.datetime.now()
                 logging.info('\tFinished job {} at {}'.format(job, t))
                 finished.append(job)
-                if not no_kinbot:
+                if lease is not None and not lease.finish(job):
+                    logging.warning('The lease of {} was taken by another worker'.format(job))
+                if not no_kinbot and not worker and write_pes:
                     # write a temporary pes file
                     # remove old xval and im_extent files
                     try:
@@ -179,11 +281,18 @@ def main():
                         os.remove('{}_im_extent.txt'.format(par.par['title']))
                     except OSError:
                         pass
+                    if par.par['pes_update']:
+                        # the first job is the base of the energies, even if it is still running
+                        done = finished
+                        if lease is not None:
+                            done = lease.done()
+                        done = [ji for ji in done if ji != jobs[0] and ji not in skipChemids]
+                        update_postprocess(par, [jobs[0]] + done, task, names)
         # remove the finished threads
         for job in finished:
             if job in running:
                 running.remove(job)
-        if not no_kinbot:
+        if not no_kinbot and not worker:
             # write a summary of what is running and finished
             summary_lines = []
             summary_lines.append('Total\t\t{}'.format(len(jobs)))
@@ -199,8 +308,16 @@ def main():
                 summary_lines.append('\t{}'.format(job))
             with open('pes_summary.txt', 'w') as f:
                 f.write('\n'.join(summary_lines))
+        if not no_kinbot:
             time.sleep(1)
 
+    if worker:
+        logging.info('PES worker done!')
+        return
+    if not write_pes:
+        logging.info('PES search done!')
+        return
+
     # delete skipped jobs from the jobs before sending to postprocess
     for skip in skipChemids:
         try:
@@ -208,7 +325,12 @@ def main():
         except ValueError:
             pass
 
-    postprocess(par, jobs, task, names)
+    try:
+        postprocess(par, jobs, task, names)
+    except MissingJobError as e:
+        logging.error(e)
+        logging.error('Exiting...')
+        sys.exit(-1)
     # make molpro inputs for all keys above
     # place submission script in the directory for offline submission
     # read in the molpro energies for the keys in the above three dicts
@@ -223,6 +345,29 @@ def main():
     print('PES search done!')
 
 
+def update_postprocess(par, jobs, task, names):
+    """
+    Write the PESViewer and MESS inputs of the part of the PES
+    that is done. The summaries, energies and copied files are
+    cached, so only the new wells cost time.
+    """
+    try:
+        postprocess(par, jobs, task, names, update=1)
+    except (MissingJobError, IOError) as e:
+        # some species of the finished wells can still be missing,
+        # this is not fatal while the search is running
+        logging.warning('Could not update the PES inputs: {}'.format(e))
+
+
+def read_chemids():
+    """
+    Read the chemids of the wells of the search.
+    """
+    with open('chemids', 'r') as f:
+        jobs = f.read().split('\n')
+    return [ji for ji in jobs if ji != '']
+
+
 def get_wells(job):
     """
     Read the summary file and add the wells to the chemid list
@@ -231,9 +376,7 @@ def get_wells(job):
         summary = open(job + '/summary_' + job + '.out', 'r').readlines()
     except:
         return 0
-    with open('chemids', 'r') as f:
-        jobs = f.read().split('\n')
-    jobs = [ji for ji in jobs if ji != '']
+    jobs = read_chemids()
 
     new_wells = []
     for line in summary:
@@ -249,20 +392,26 @@ def get_wells(job):
             f.write('\n'.join(new_wells) + '\n')
 
 
-def postprocess(par, jobs, task, names):
+def postprocess(par, jobs, task, names, update=0):
     """
     postprocess a pes search
     par: parameters of the search
     jobs: all of the jobs that were run
-    temp: this is a temporary output file writing
+    update: only write the PESViewer and MESS inputs with the L2 energies,
+    used while the search is running, the L3 files are not touched
     """
     
     l3done = 1  # flag for L3 calculations to be complete
 
+    def l3energy_of(job):
+        if update:
+            return 0, -1
+        return get_l3energy(job, par)
+
     # base of the energy is the first well, these are L2 energies
     base_energy = get_energy(jobs[0], jobs[0], 0, par.par['high_level'])
     # L3 energies
-    status, base_l3energy = get_l3energy(jobs[0], par)
+    status, base_l3energy = l3energy_of(jobs[0])
     if not status:
         l3done = 0
     # L2 ZPE
@@ -273,7 +422,8 @@ def postprocess(par, jobs, task, names):
     # 1. reaction name
     # 2. products chemid list
     # 3. reaction barrier height
-    reactions = []
+    # the key is the reactant chemid and the sorted tuple of the product chemids
+    reactions = {}
     #Reactions is empty at this point
 
     # list of the parents for each calculation
@@ -283,21 +433,20 @@ def postprocess(par, jobs, task, names):
     # this calculation
     parent = {}
 
-    wells = []
+    # the wells and products are kept in insertion ordered dictionaries
+    wells = {}
     failedwells = []
-    products = []
+    products = {}
 
     # read all the jobs
     for ji in jobs:
-        try:
-            summary = open(ji + '/summary_' + ji + '.out', 'r').readlines()
-        except:
+        summary = read_summary(ji)
+        if summary is None:
             failedwells.append(ji)
             continue
         # read the summary file
-        for line in summary:
-            if (line.startswith('SUCCESS') or line.startswith('HOMOLYTIC_SCISSION')):
-                pieces = line.split()
+        for pieces in summary:
+            if pieces[0] == 'SUCCESS':
                 reactant = ji
                 ts = pieces[2]  # this is the long specific name of the reaction
                 prod = pieces[3:]  # this is the chemid of the product
@@ -323,86 +472,40 @@ def postprocess(par, jobs, task, names):
                 barrier += ts_energy + ts_zpe
                 barrier *= constants.AUtoKCAL
 
-                if reactant not in wells:
-                    wells.append(reactant)
-                    parent[reactant] = reactant
-                if len(prod) == 1:
-                    if prod[0] not in wells:
-                        if prod[0] not in parent:
-                            parent[prod[0]] = reactant
-                        wells.append(prod[0])
-                else:
-                    prod_name = '_'.join(sorted(prod))
-                    if prod_name not in products:
-                        if prod_name not in parent:
-                            parent[prod_name] = reactant
-                        products.append('_'.join(sorted(prod)))
-                new = 1
-                temp = None
-
-                for i, rxn in enumerate(reactions):
-                    rxn_prod_name = '_'.join(sorted(rxn[2]))
-                    if (reactant == rxn[0] and
-                            '_'.join(sorted(prod)) == rxn_prod_name):
-                        new = 0
-                        temp = i
-                    if reactant == ''.join(rxn[2]) and ''.join(prod) == rxn[0]:
-                        new = 0
-                        temp = i
-                if new:
-                    reactions.append([reactant, ts, prod, barrier])
+                add_species(reactant, prod, wells, products, parent)
+                key = find_reaction(reactions, reactant, prod)
+                if key is None:
+                    reactions[reaction_key(reactant, prod)] = [reactant, ts, prod, barrier]
                 else:
                     #check if the previous reaction has a lower energy or not
-                    if reactions[temp][3] > barrier:
-                        reactions.pop(temp)
-                        reactions.append([reactant, ts, prod, barrier])
+                    if reactions[key][3] > barrier:
+                        del reactions[key]
+                        reactions[reaction_key(reactant, prod)] = [reactant, ts, prod, barrier]
 
-            elif line.startswith('HOMOLYTIC_SCISSION'):
-                pieces = line.split()
+            elif pieces[0] == 'HOMOLYTIC_SCISSION':
                 reactant = ji
                 energy = pieces[1] # energy from summary
                 prod = pieces[2:]  # this is the chemid of the product
 
-                if reactant not in wells:
-                    wells.append(reactant)
-                    parent[reactant] = reactant
-
-                if len(prod) == 1:
-                    if prod[0] not in wells:
-                        if prod[0] not in parent:
-                            parent[prod[0]] = reactant
-                        wells.append(prod[0])
-                else:
-                    prod_name = '_'.join(sorted(prod))
-                    if prod_name not in products:
-                        if prod_name not in parent:
-                            parent[prod_name] = reactant
-                        products.append('_'.join(sorted(prod)))
-                new = 1
-                temp = None
-                for i, rxn in enumerate(reactions):
-                    rxn_prod_name = '_'.join(sorted(rxn[2]))
-                    if (reactant == rxn[0] and
-                            '_'.join(sorted(prod)) == rxn_prod_name):
-                        new = 0
-                        temp = i
-                    if reactant == ''.join(rxn[2]) and ''.join(prod) == rxn[0]:
-                        new = 0
-                        temp = i
-                if new:
+                add_species(reactant, prod, wells, products, parent)
+                if find_reaction(reactions, reactant, prod) is None:
                     ts = 'barrierless'
-                    barrier = energy
-                    reactions.append([reactant, ts, prod, barrier])
+                    barrier = float(energy)
+                    reactions[reaction_key(reactant, prod)] = [reactant, ts, prod, barrier]
 
         # copy the xyz files
         copy_from_kinbot(ji, 'xyz')
-        # copy the L3 calculations here, whatever was in those directories, inp, out, pbs, etc.
-        copy_from_kinbot(ji, par.par['single_point_qc'])
+        if not update:
+            # copy the L3 calculations here, whatever was in those directories, inp, out, pbs, etc.
+            copy_from_kinbot(ji, par.par['single_point_qc'])
+    wells = list(wells)
+    products = list(products)
+    reactions = list(reactions.values())
     # create a connectivity matrix for all wells and products
     conn, bars = get_connectivity(wells, products, reactions)
     # create a batch submission for all L3 jobs
     # TODO slurm
-    if par.par['queuing'] == 'pbs':
+    if par.par['queuing'] == 'pbs' and not update:
         batch = 'batch_L3_pbs.sub'
         with open(batch, 'w') as f:
             for well in wells:
@@ -421,7 +524,7 @@ def postprocess(par, jobs, task, names):
         energy = get_energy(parent[well], well, 0, par.par['high_level'])  # from the db
         zpe = get_zpe(parent[well], well, 0, par.par['high_level'])
         well_energies[well] = ((energy + zpe) - (base_energy + base_zpe)) * constants.AUtoKCAL
-        status, l3energy = get_l3energy(well, par)
+        status, l3energy = l3energy_of(well)
         if not status:
             l3done = 0  # not all L3 calculations are done
         else:
@@ -436,7 +539,7 @@ def postprocess(par, jobs, task, names):
             energy += get_energy(parent[prods], pr, 0, par.par['high_level'])
             zpe = get_zpe(parent[prods], pr, 0, par.par['high_level'])
             energy += zpe
-            status, l3e = get_l3energy(pr, par)
+            status, l3e = l3energy_of(pr)
             if not status:
                 l3done = 0  # not all L3 calculations are done
             else:
@@ -448,7 +551,7 @@ def postprocess(par, jobs, task, names):
     for reac in reactions:
         if reac[1] != 'barrierless':
             zpe = get_zpe(reac[0], reac[1], 1, par.par['high_level'])
-            status, l3energy = get_l3energy(reac[1], par)
+            status, l3energy = l3energy_of(reac[1])
             if not status:
                 l3done = 0
             else:
@@ -458,18 +561,20 @@ def postprocess(par, jobs, task, names):
     logging.info('Energies in kcal/mol, incl. ZPE')
     
     for well in wells:
-        logging.info('{1}   {2.2f}'.format(well, well_l3energies[well]))
+        if well in well_l3energies:
+            logging.info('{}   {:.2f}'.format(well, well_l3energies[well]))
     for prod in products:
-        logging.info('{1}   {2.2f}'.format(prod, prod_l3energies[prod]))
+        logging.info('{}   {:.2f}'.format(prod, prod_l3energies[prod]))
     for ts in ts_l3energies:
-        logging.info('{1}   {2.2f}'.format(ts, ts_l3energies[ts]))
+        logging.info('{}   {:.2f}'.format(ts, ts_l3energies[ts]))
 
 
     if l3done == 1 and len(reactions) > 1:
         well_energies = well_l3energies
         prod_energies = prod_l3energies
         for reac in reactions:  # swap out the barrier
-            reac[3] = ts_l3energies[reac[1]]
+            if reac[1] in ts_l3energies:
+                reac[3] = ts_l3energies[reac[1]]
         logging.info('Energies are updated to L3 in ME and PESViewer.')
     
     # if L3 was done, everything below is done with that
@@ -481,7 +586,8 @@ def postprocess(par, jobs, task, names):
                                                    bars,
                                                    well_energies,
                                                    task,
-                                                   names)
+                                                   names,
+                                                   n_paths=par.par['pes_paths'])
 
     # draw a graph of the network
 #    create_graph(wells,
@@ -519,10 +625,54 @@ def postprocess(par, jobs, task, names):
                       parent)
 
     
-def filter(wells, products, reactions, conn, bars, well_energies, task, names):
+def reaction_key(reactant, prod):
+    """
+    Key of a reaction in the reactions dictionary of postprocess.
+    """
+    return (reactant, tuple(sorted(prod)))
+
+
+def find_reaction(reactions, reactant, prod):
+    """
+    Return the key of the reaction between the reactant and the products,
+    in either direction, or None if there is no such reaction yet.
+    """
+    key = reaction_key(reactant, prod)
+    if key in reactions:
+        return key
+    if len(prod) == 1:
+        # the reverse of a reaction of another well
+        key = (prod[0], (reactant,))
+        if key in reactions:
+            return key
+    return None
+
+
+def add_species(reactant, prod, wells, products, parent):
+    """
+    Add the reactant and the products of a reaction to the wells
+    and products, and record the parent of the new ones.
+    """
+    if reactant not in wells:
+        wells[reactant] = 1
+        parent[reactant] = reactant
+    if len(prod) == 1:
+        if prod[0] not in wells:
+            if prod[0] not in parent:
+                parent[prod[0]] = reactant
+            wells[prod[0]] = 1
+    else:
+        prod_name = '_'.join(sorted(prod))
+        if prod_name not in products:
+            if prod_name not in parent:
+                parent[prod_name] = reactant
+            products[prod_name] = 1
+
+
+def filter(wells, products, reactions, conn, bars, well_energies, task, names, n_paths=10):
     """
     Filter the wells, products and reactions according to the task
-    and the names
+    and the names, n_paths is the number of pathways kept in allpaths
     """
     # list of reactions to highlight
     highlight = []
@@ -534,7 +684,8 @@ def filter(wells, products, reactions, conn, bars, well_energies, task, names):
     # corresponding to the names
     # 4. wells: show all reactions of one wells
     # corresponding to the names
-    # 5. temperature
+    # 5. temperature: show the reactions with a branching fraction
+    # above 1% at any of the temperatures in the names
     # 6. threshold_reapply: apply the barrier threshold 
     # cutoff at the highest level that was done
 
@@ -543,45 +694,24 @@ def filter(wells, products, reactions, conn, bars, well_energies, task, names):
         filtered_reactions = reactions
         pass
     elif task == 'lowestpath':
-        all_rxns = get_all_pathways(wells, products, reactions, names, conn)
-        # this is the maximum energy along the minimun energy pathway
-        min_energy = None
-        min_rxn = None
-        for rxn_list in all_rxns:
-            barriers = [ri[3] for ri in rxn_list]
-            if min_energy is None:
-                min_energy = max(barriers)
-                min_rxn = rxn_list
-            else:
-                if max(barriers) < min_energy:
-                    min_energy = max(barriers)
-                    min_rxn = rxn_list
-        filtered_reactions = min_rxn
+        # the pathway on which the maximum energy is the lowest
+        all_rxns = get_all_pathways(wells, products, reactions, names, 1)
+        filtered_reactions = []
+        if len(all_rxns) > 0:
+            filtered_reactions = all_rxns[0]
     elif task == 'allpaths':
-        all_rxns = get_all_pathways(wells, products, reactions, names, conn)
+        all_rxns = get_all_pathways(wells, products, reactions, names, n_paths)
         filtered_reactions = []
-        for list in all_rxns:
-            for rxn in list:
-                new = 1
-                for r in filtered_reactions:
-                    if r[1] == rxn[1]:
-                        new = 0
-                if new:
-                    filtered_reactions.append(rxn)
-        # this is the maximum energy along the minimun energy pathway
-        min_energy = None
-        min_rxn = None
+        filtered_names = set()
         for rxn_list in all_rxns:
-            barriers = [ri[3] for ri in rxn_list]
-            if min_energy is None:
-                min_energy = max(barriers)
-                min_rxn = rxn_list
-            else:
-                if max(barriers) < min_energy:
-                    min_energy = max(barriers)
-                    min_rxn = rxn_list
-        for rxn in min_rxn:
-            highlight.append(rxn[1])
+            for rxn in rxn_list:
+                if rxn[1] not in filtered_names:
+                    filtered_names.add(rxn[1])
+                    filtered_reactions.append(rxn)
+        # highlight the lowest pathway
+        if len(all_rxns) > 0:
+            for rxn in all_rxns[0]:
+                highlight.append(rxn[1])
     elif task == 'well':
         if len(names) == 1:
             filtered_reactions = []
@@ -594,25 +724,22 @@ def filter(wells, products, reactions, conn, bars, well_energies, task, names):
             logging.error('Received: ' + ' '.join(names))
             sys.exit(-1)
     elif task == 'temperature':
-        if len(names) == 1:
+        if len(names) > 0:
             try:
-                # read the temperature
-                temperature = float(names[0])
+                # read the temperatures
+                temperatures = [float(name) for name in names]
             except ValueError:
-                logging.error('A float is needed for a temperature filter')
+                logging.error('Floats are needed for a temperature filter')
                 logging.error('Received: ' + ' '.join(names))
                 sys.exit(-1)
-            filtered_reactions = []
-            # iterate the wells
-            wells, filtered_reactions = filter_boltzmann(wells[0],
-                                                         [wells[0]],
-                                                         reactions,
-                                                         filtered_reactions,
-                                                         well_energies,
-                                                         temperature)
+            # keep the reactions that are important at any of the temperatures
+            networks = filter_boltzmann(wells[0], reactions, temperatures)
+            kept = set()
+            for temp_wells, temp_reactions in networks:
+                kept.update([id(rxn) for rxn in temp_reactions])
+            filtered_reactions = [rxn for rxn in reactions if id(rxn) in kept]
         else:
-            logging.error('Only one argument should be given for a temperature filter')
-            logging.error('Received: ' + ' '.join(names))
+            logging.error('At least one temperature should be given for a temperature filter')
             sys.exit(-1)
     elif task == 'l2threshold':
         filtered_reactions = []
@@ -623,143 +750,266 @@ def filter(wells, products, reactions, conn, bars, well_energies, task, names):
         logging.error('Could not recognize task ' + task)
         sys.exit(-1)
 
+    # names of the species in the filtered reactions
+    reactant_names = set()
+    prod_names = set()
+    for rxn in filtered_reactions:
+        reactant_names.add(rxn[0])
+        prod_names.add('_'.join(sorted(rxn[2])))
+
     # filter the wells
-    filtered_wells = []
-    for well in wells:
-        for rxn in filtered_reactions:
-            prod_name = '_'.join(sorted(rxn[2]))
-            if well == rxn[0] or well == prod_name:
-                if well not in filtered_wells:
-                    filtered_wells.append(well)
+    filtered_wells = [well for well in wells if well in reactant_names or well in prod_names]
 
     # filter the products
-    filtered_products = []
-    for prod in products:
-        for rxn in filtered_reactions:
-            prod_name = '_'.join(sorted(rxn[2]))
-            if prod == prod_name:
-                if prod not in filtered_products:
-                    filtered_products.append(prod)
+    filtered_products = [prod for prod in products if prod in prod_names]
 
     return filtered_wells, filtered_products, filtered_reactions, highlight
 
 
-def filter_boltzmann(well, wells, reactions, filtered_reactions,
-                     well_energies, temperature):
+def filter_boltzmann(well, reactions, temperatures):
     """
-    Filter the reactions based on branching fractions at a given temperature
+    Filter the reactions based on branching fractions at the given
+    temperatures, starting from the well. A reaction is kept if its
+    branching fraction from one of the wells reached is above 1%.
+    The wells are visited breadth first, and the branching fractions
+    of a well are calculated once for all the temperatures.
+    Returns a list of wells and a list of reactions for each temperature.
     """
-    well_energy = well_energies[well]
-    # all the reactions that include this well
-    one_well_rxns = []
-    # iterate all reactions
-    for rxn in reactions:
-        # check if this reactions belongs to the current well
-        if rxn[0] == well or rxn[2][0] == well:
-            one_well_rxns.append(rxn)
-    # list containing the branching fractions for this well
-    branching = []
-    for rxn in one_well_rxns:
-        # calculate the boltzmann factor
-        value = np.exp(-(rxn[3] - well_energy) * 1000 / 1.9872036 / temperature)
-        branching.append(value)
-    # calculate the actual branching fractions
-    br_sum = sum(branching)
-    branching = np.array(branching) / br_sum
-    for i, rxn in enumerate(one_well_rxns):
-        # only add a reaction if the branching fraction is below 1%
-        if branching[i] > 0.01:
-            new = 1
-            for r in filtered_reactions:
-                if r[1] == rxn[1]:
-                    new = 0
-            if new:
-                filtered_reactions.append(rxn)
-                if not rxn[0] in wells:
-                    wells.append(rxn[0])
-                    wells, filtered_reactions = filter_boltzmann(rxn[0],
-                                                                 wells,
-                                                                 reactions,
-                                                                 filtered_reactions,
-                                                                 well_energies,
-                                                                 temperature)
-                if len(rxn[2]) == 1:
-                    if not rxn[2][0] in wells:
-                        wells.append(rxn[2][0])
-                        wells, filtered_reactions = filter_boltzmann(rxn[2][0],
-                                                                     wells,
-                                                                     reactions,
-                                                                     filtered_reactions,
-                                                                     well_energies,
-                                                                     temperature)
-    return wells, filtered_reactions
+    temperatures = np.array(temperatures, dtype=float)
+    # indices of the reactions of each well
+    adj = {}
+    for k, rxn in enumerate(reactions):
+        adj.setdefault(rxn[0], []).append(k)
+        if len(rxn[2]) == 1 and rxn[2][0] != rxn[0]:
+            adj.setdefault(rxn[2][0], []).append(k)
+    # temperatures at which each well is reached and each reaction kept
+    reached = {well: np.ones(len(temperatures), dtype=bool)}
+    kept = np.zeros((len(reactions), len(temperatures)), dtype=bool)
+    order = [well]
+    queue = collections.deque([(well, reached[well].copy())])
+    while len(queue) > 0:
+        w, mask = queue.popleft()
+        rxns = adj.get(w, [])
+        if len(rxns) == 0:
+            continue
+        barriers = np.array([reactions[k][3] for k in rxns])
+        # the lowest barrier is the reference to avoid overflows,
+        # this cancels in the branching fractions
+        factors = np.exp(-np.outer(barriers - np.min(barriers),
+                                   1000. / 1.9872036 / temperatures))
+        branching = factors / np.sum(factors, axis=0)
+        for k, br in zip(rxns, branching):
+            keep = (br > 0.01) & mask
+            kept[k] |= keep
+            rxn = reactions[k]
+            for other in [rxn[0]] + (rxn[2] if len(rxn[2]) == 1 else []):
+                if other not in reached:
+                    reached[other] = np.zeros(len(temperatures), dtype=bool)
+                    order.append(other)
+                new = keep & ~reached[other]
+                if new.any():
+                    reached[other] |= new
+                    queue.append((other, new))
+    networks = []
+    for t in range(len(temperatures)):
+        wells = [w for w in order if reached[w][t]]
+        filtered_reactions = [rxn for k, rxn in enumerate(reactions) if kept[k, t]]
+        networks.append((wells, filtered_reactions))
+    return networks
 
 
 def get_connectivity(wells, products, reactions):
     """
-    Create two matrices:
-    conn: connectivity (1 or 0) between each pair of stationary points
-    bars: barrier height between each pair of stationary points
-          0 if not connected
+    Create the sparse connectivity of the stationary points,
+    which are indexed as in get_indices:
+    conn: for each stationary point the set of connected ones
+    bars: barrier height for each connected pair (i, j), in both orders
     """
-    conn = np.zeros((len(wells) + len(products), len(wells) + len(products)), dtype=int)
-    bars = np.zeros((len(wells) + len(products), len(wells) + len(products)))
+    indices = get_indices(wells, products)
+    conn = {}
+    bars = {}
     for rxn in reactions:
         reac_name = rxn[0]
         prod_name = '_'.join(sorted(rxn[2]))
-        i = get_index(wells, products, reac_name)
-        j = get_index(wells, products, prod_name)
-        conn[i][j] = 1
-        conn[j][i] = 1
+        i = get_index(indices, reac_name)
+        j = get_index(indices, prod_name)
+        conn.setdefault(i, set()).add(j)
+        conn.setdefault(j, set()).add(i)
         barrier = rxn[3]
-        bars[i][j] = barrier
-        bars[j][i] = barrier
+        bars[(i, j)] = barrier
+        bars[(j, i)] = barrier
     return conn, bars
 
 
-def get_all_pathways(wells, products, reactions, names, conn):
+def get_pathway_graph(wells, products, reactions):
     """
-    Get all the pathways in which all intermediate species
-    are wells and not bimolecular products
+    Create a graph of the stationary points, indexed as in get_indices.
+    The edges are the lowest reactions between each pair of stationary
+    points, weighted by their barrier height, and the reaction itself
+    is stored as the rxn attribute of the edge.
+    """
+    indices = get_indices(wells, products)
+    G = nx.Graph()
+    G.add_nodes_from(range(len(wells) + len(products)))
+    for rxn in reactions:
+        i = get_index(indices, rxn[0])
+        j = get_index(indices, '_'.join(sorted(rxn[2])))
+        if i == j:
+            continue
+        if not G.has_edge(i, j) or rxn[3] < G[i][j]['weight']:
+            G.add_edge(i, j, weight=rxn[3], rxn=rxn)
+    return G
+
+
+def get_lowest_path(G, start, end, n_wells, removed_nodes=(), removed_edges=()):
+    """
+    Bottleneck (minimax) Dijkstra: return the highest barrier along the
+    path from start to end on which this highest barrier is the lowest,
+    and the path itself, or (None, None) if there is no path.
+    Only wells (index below n_wells) can be intermediates of a path.
+    Of the paths with the same highest barrier, the one with the
+    fewest steps is returned.
+    removed_nodes and removed_edges are not used in the path.
+    """
+    best = {start: float('-inf')}
+    done = set()
+    heap = [(float('-inf'), start)]
+    while len(heap) > 0:
+        barrier, i = heapq.heappop(heap)
+        if i in done:
+            continue
+        if i == end:
+            path = get_shortest_path(G, start, end, n_wells, barrier, removed_nodes, removed_edges)
+            return barrier, path
+        done.add(i)
+        for j in get_next_steps(G, i, start, n_wells, removed_nodes, removed_edges):
+            if j in done:
+                continue
+            new = max(barrier, G[i][j]['weight'])
+            if j not in best or new < best[j]:
+                best[j] = new
+                heapq.heappush(heap, (new, j))
+    return None, None
+
+
+def get_shortest_path(G, start, end, n_wells, max_barrier, removed_nodes=(), removed_edges=()):
+    """
+    Breadth first search of the path from start to end with the fewest
+    steps, using only the reactions with a barrier up to max_barrier.
+    """
+    prev = {start: None}
+    queue = collections.deque([start])
+    while len(queue) > 0:
+        i = queue.popleft()
+        if i == end:
+            path = [end]
+            while path[-1] != start:
+                path.append(prev[path[-1]])
+            return path[::-1]
+        for j in get_next_steps(G, i, start, n_wells, removed_nodes, removed_edges):
+            if j not in prev and G[i][j]['weight'] <= max_barrier:
+                prev[j] = i
+                queue.append(j)
+    return None
+
+
+def get_next_steps(G, i, start, n_wells, removed_nodes=(), removed_edges=()):
+    """
+    Return the species that can follow species i on a path from start.
+    """
+    if i != start and i >= n_wells:
+        # bimolecular products are only the end of a path
+        return []
+    steps = []
+    for j in G.adj[i]:
+        if j in removed_nodes:
+            continue
+        if (i, j) in removed_edges or (j, i) in removed_edges:
+            continue
+        steps.append(j)
+    return steps
+
+
+def get_best_paths(G, start, end, n_wells, n_paths):
+    """
+    Return the n_paths paths from start to end with the lowest highest
+    barrier as a list of (highest barrier, path), from the lowest up.
+    This is Yen's algorithm with the bottleneck Dijkstra for the deviations.
+    """
+    barrier, path = get_lowest_path(G, start, end, n_wells)
+    if path is None:
+        return []
+    paths = [(barrier, path)]
+    seen = {tuple(path)}
+    candidates = []
+    while len(paths) < n_paths:
+        last = paths[-1][1]
+        for n in range(len(last) - 1):
+            root = last[:n + 1]
+            # do not take the same next step as the paths found with this root
+            removed_edges = set()
+            for b, p in paths:
+                if p[:n + 1] == root:
+                    removed_edges.add((p[n], p[n + 1]))
+            spur_barrier, spur = get_lowest_path(G, root[-1], end, n_wells,
+                                                 set(root[:-1]), removed_edges)
+            if spur is None:
+                continue
+            new = root[:-1] + spur
+            if tuple(new) in seen:
+                continue
+            seen.add(tuple(new))
+            for k in range(n):
+                spur_barrier = max(spur_barrier, G[root[k]][root[k + 1]]['weight'])
+            heapq.heappush(candidates, (spur_barrier, len(new), new))
+        if len(candidates) == 0:
+            break
+        barrier, steps, path = heapq.heappop(candidates)
+        paths.append((barrier, path))
+    return paths
+
+
+def get_all_pathways(wells, products, reactions, names, n_paths):
+    """
+    Get the n_paths pathways with the lowest highest barrier between the
+    two species in names, in which all intermediate species are wells and
+    not bimolecular products. Each pathway is a list of reactions,
+    the lowest pathway comes first.
     """
     if len(names) == 2:
-        # the maximum length between two stationary points
-        # is the number of wells+2
-        max_length = 5
-        n_mol = len(wells) + len(products)
-        start = get_index(wells, products, names[0])
-        end = get_index(wells, products, names[1])
-        # make a graph out of the connectivity
-        # nodes of the graph
-        nodes = [i for i in range(n_mol)]
-        G = nx.Graph()
-        G.add_nodes_from(nodes)
-        # add the edges of the graph
-        for i, ci in enumerate(conn):
-            for j, cij in enumerate(ci):
-                if cij > 0:
-                    G.add_edge(i, j)
-        # list of reaction lists for each pathway
-        paths = nx.all_simple_paths(G, start, end, cutoff=max_length)
+        indices = get_indices(wells, products)
+        start = get_index(indices, names[0])
+        end = get_index(indices, names[1])
+        G = get_pathway_graph(wells, products, reactions)
         rxns = []
-        for path in paths:
-            if is_pathway(wells, products, path, names):
-                rxns.append(get_pathway(wells, products, reactions, path, names))
+        for barrier, path in get_best_paths(G, start, end, len(wells), n_paths):
+            rxns.append([G[i][j]['rxn'] for i, j in zip(path[:-1], path[1:])])
+        if len(rxns) == 0:
+            logging.warning('No pathway found between {} and {}'.format(names[0], names[1]))
         return rxns
     else:
         logging.error('Cannot find a lowest path if the number of species is not 2')
         logging.error('Found species: ' + ' '.join(names))
+        sys.exit(-1)
+
+
+def get_indices(wells, products):
+    """
+    Return a dictionary from the name of each well and product to its index,
+    the wells come first, followed by the products.
+    """
+    indices = {}
+    for i, name in enumerate(wells + products):
+        indices.setdefault(name, i)
+    return indices
 
 
-def get_index(wells, products, name):
+def get_index(indices, name):
     try:
-        i = wells.index(name)
-    except ValueError:
-        try:
-            i = products.index(name) + len(wells)
-        except ValueError:
-            logging.error('Could not find reactant ' + name)
-            sys.exit(-1)
+        i = indices[name]
+    except KeyError:
+        logging.error('Could not find reactant ' + name)
+        sys.exit(-1)
     return i
 
 
@@ -771,58 +1021,54 @@ def get_name(wells, products, i):
     return name
 
 
-def get_pathway(wells, products, reactions, ins, names):
-    """
-    Return the list of reactions between the species in
-    the names, according to the instance ins
-    """
-    # list of reactions
-    rxns = []
-    for index, i in enumerate(ins[:-1]):
-        j = ins[index + 1]
-        rxns.append(get_reaction(wells, products, reactions, i, j))
-    return rxns
-
-
-def get_reaction(wells, products, reactions, i, j):
+def read_summary(job):
     """
-    method to get a reaction in the reactions list
-    according to the indices i and j which correspond
-    to the index in wells or products
+    Return the SUCCESS and HOMOLYTIC_SCISSION lines of the summary file
+    of the job, split into words, or None if there is no summary.
+    The parsed files are cached and only read again if they changed.
     """
-    name_1 = get_name(wells, products, i)
-    name_2 = get_name(wells, products, j)
-    for rxn in reactions:
-        reac_name = rxn[0]
-        prod_name = '_'.join(sorted(rxn[2]))
-        if ((name_1 == reac_name and name_2 == prod_name) or
-                (name_2 == reac_name and name_1 == prod_name)):
-            return rxn
-    return None
+    fname = job + '/summary_' + job + '.out'
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    mtime_size = (st.st_mtime, st.st_size)
+    if fname in summary_cache and summary_cache[fname][0] == mtime_size:
+        return summary_cache[fname][1]
+    summary = []
+    with open(fname, 'r') as f:
+        for line in f:
+            if line.startswith('SUCCESS') or line.startswith('HOMOLYTIC_SCISSION'):
+                summary.append(line.split())
+    summary_cache[fname] = (mtime_size, summary)
+    return summary
 
 
-def is_pathway(wells, products, ins, names):
+def copy_from_kinbot(well, dirname):
     """
-    Method to check if the instance ins
-    corresponds to a pathway between the species
-    in the names list
+    Copy the files of the directory of the well to the directory with the
+    same name here. Only the files that are new or changed are copied.
     """
-    # check of all intermediate species are wells
-    if all([insi < len(wells) for insi in ins[1:-1]]):
-        name_1 = get_name(wells, products, ins[0])
-        name_2 = get_name(wells, products, ins[-1])
-        # check if the names correspond
-        if ((name_1 == names[0] and name_2 == names[1]) or
-                (name_2 == names[0] and name_1 == names[1])):
-            return 1
-    return 0
-
-
-def copy_from_kinbot(well, dirname):
-    dirname = dirname + '/'
+    source = well + '/' + dirname
     if not os.path.exists(dirname):
         os.mkdir(dirname)
-    copy_tree(well + '/' + dirname, dirname)
+    for root, dirs, files in os.walk(source):
+        target = os.path.join(dirname, os.path.relpath(root, source))
+        if not os.path.exists(target):
+            os.makedirs(target)
+        for fname in files:
+            if fname == molpro.energy_index_file:
+                # the energies read here are cached separately
+                continue
+            st = os.stat(os.path.join(root, fname))
+            try:
+                st_target = os.stat(os.path.join(target, fname))
+                if st_target.st_size == st.st_size and st_target.st_mtime == st.st_mtime:
+                    continue
+            except OSError:
+                pass
+            # copy2 keeps the modification time for the next comparison
+            shutil.copy2(os.path.join(root, fname), os.path.join(target, fname))
 
 
 def get_rxn(prods, rxns):
@@ -1168,11 +1414,10 @@ def create_graph(wells, products, reactions,
     offset = max_size - minimum * slope
 
     # add the edges
-    for i, ci in enumerate(conn):
-        for j, cij in enumerate(ci):
-            if cij > 0:
-                weight = slope * bars[i][j] + offset
-                G.add_edge(i, j, weight=weight)
+    for i in conn:
+        for j in conn[i]:
+            weight = slope * bars[(i, j)] + offset
+            G.add_edge(i, j, weight=weight)
     edges = G.edges()
     weights = [G[u][v]['weight'] for u, v in edges]
 
@@ -1192,8 +1437,41 @@ def create_graph(wells, products, reactions,
     plt.savefig('graph.png')
 
 
-def get_energy(dir, job, ts, high_level, mp2=0):
-    db = connect(dir + '/kinbot.db')
+def load_energies(dir):
+    """
+    Return the energies and zpes of all the jobs in the database of the
+    directory, as a dictionary from job name to (energy, zpe), where
+    the values are taken from the last row of the job.
+    The database is read with a single query, and read again
+    only if it changed since the previous call.
+    """
+    db_file = dir + '/kinbot.db'
+    now = time.time()
+    try:
+        st = os.stat(db_file)
+        stat = (st.st_mtime, st.st_size)
+    except OSError:
+        stat = None
+    if dir in energy_cache and energy_cache[dir][0] == stat:
+        # the modification time has a coarse resolution on some file
+        # systems, a write in the same tick as the last read does not
+        # change it, so it is only trusted if the last read was later
+        if stat is None or energy_cache[dir][2] - stat[0] > mtime_resolution:
+            return energy_cache[dir][1]
+    values = {}
+    if stat is not None:
+        for row in connect(db_file).select(sort='id'):
+            data = row.get('data')
+            if data is not None and row.get('name') is not None:
+                values[row.name] = (data.get('energy'), data.get('zpe'))
+    energy_cache[dir] = (stat, values, now)
+    return values
+
+
+def get_job_values(dir, job, ts, high_level, mp2=0):
+    """
+    Return the energy and zpe of the job in the directory.
+    """
     if ts:
         j = job
     else:
@@ -1202,19 +1480,17 @@ def get_energy(dir, job, ts, high_level, mp2=0):
         j += '_mp2'
     if high_level:
         j += '_high'
-    rows = db.select(name=j)
-    for row in rows:
-        if hasattr(row, 'data'):
-            energy = row.data.get('energy')
-    try:
-        # ase energies are always in ev, convert to hartree
-        energy *= constants.EVtoHARTREE
-    except UnboundLocalError:
+    values = load_energies(dir)
+    if j not in values:
         # this happens when the job is not found in the database
-        logging.error('Could not find {} in directory {}'.format(job, dir))
-        logging.error('Exiting...')
-        sys.exit(-1)
-    return energy
+        raise MissingJobError('Could not find {} in directory {}'.format(job, dir))
+    return values[j]
+
+
+def get_energy(dir, job, ts, high_level, mp2=0):
+    energy = get_job_values(dir, job, ts, high_level, mp2)[0]
+    # ase energies are always in ev, convert to hartree
+    return energy * constants.EVtoHARTREE
 
 
 def get_l3energy(job, par):
@@ -1223,84 +1499,68 @@ def get_l3energy(job, par):
     This is not object oriented.
     """
     if par.par['single_point_qc'] == 'molpro':
-        if os.path.exists('molpro/' + job + '.out'): 
-            with open('molpro/' + job + '.out', 'r') as f: 
-                lines = f.readlines() 
-                for index, line in enumerate(reversed(lines)): 
-                    if ('SETTING ' + par.par['single_point_key']) in line:
-                        e = float(line.split()[3])
-                        logging.info('L3 electronic energy for {} is {} Hartree.'.format(job, e))
-                        return 1, e  # energy was found
-        else:
-            logging.info('L3 for {} is missing.'.format(job))
-            return 0, -1  # job not yet started to run
+        e = molpro.get_output_energy('molpro/' + job + '.out', par.par['single_point_key'])
+        if e is not None:
+            logging.info('L3 electronic energy for {} is {} Hartree.'.format(job, e))
+            return 1, e  # energy was found
+    logging.info('L3 for {} is missing.'.format(job))
+    return 0, -1  # job not yet started to run or not finished
 
     
 def get_zpe(dir, job, ts, high_level, mp2=0):
-    db = connect(dir + '/kinbot.db')
-    if ts:
-        j = job
-    else:
-        j = job + '_well'
-    if mp2:
-        j += '_mp2'
-    if high_level:
-        j += '_high'
-    rows = db.select(name=j)
-    for row in rows:
-        if hasattr(row, 'data'):
-            zpe = row.data.get('zpe')
-    return zpe
-
-
-def check_status(job, pid):
-    command = ['ps', '-u', 'root', '-N', '-o', 'pid,s,user,%cpu,%mem,etime,args']
-    process = subprocess.Popen(command,
-                               shell=False,
-                               stdout=subprocess.PIPE,
-                               stdin=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
-    out, err = process.communicate()
-    out = out.decode()
-    lines = out.split('\n')
-    for line in lines:
-        if len(line) > 0:
-            if str(pid) == line.split()[0]:
-                return 1
+    return get_job_values(dir, job, ts, high_level, mp2)[1]
+
+
+def check_status(job, process):
+    """
+    Return 1 if the kinbot run of the job is still running, 0 otherwise.
+    process is the Popen object returned by submit_job, or 0 if no
+    kinbot run was started. Polling also reaps the finished process.
+    """
+    if not process:
+        return 0
+    if process.poll() is None:
+        return 1
+    if process.returncode != 0:
+        logging.warning('KinBot run of {} exited with code {}'.format(job, process.returncode))
     return 0
 
 
-def submit_job(chemid, par):
+def prepare_job(chemid, par):
     """
-    Submit a kinbot run using subprocess and return the pid
+    Prepare the directory of a kinbot run
     """
-    command = ["kinbot", chemid + ".json", "&"]
     # purge previous summary and monitor files, so that pes doesn't think
     # everything is done
     # relevant if jobs are killed
-    try:
-        os.system('rm -f {dir}/summary_*.out'.format(dir=chemid))
-    except OSError:
-        pass
-    try:
-        os.system('rm -f {dir}/kinbot_monitor.out'.format(dir=chemid))
-    except OSError:
-        pass
+    old_files = glob.glob('{dir}/summary_*.out'.format(dir=chemid))
+    old_files.append('{dir}/kinbot_monitor.out'.format(dir=chemid))
+    for old_file in old_files:
+        try:
+            os.remove(old_file)
+        except OSError:
+            pass
  
     if par.par['queue_template'] != '':
         shutil.copyfile('{}'.format(par.par['queue_template']), '{}/{}'.format(chemid, par.par['queue_template']))
     if par.par['single_point_template'] != '':
         shutil.copyfile('{}'.format(par.par['single_point_template']), '{}/{}'.format(chemid, par.par['single_point_template']))
-    outfile = open('{dir}/kinbot.out'.format(dir=chemid), 'w')
-    errfile = open('{dir}/kinbot.err'.format(dir=chemid), 'w')
-    process = subprocess.Popen(command,
-                               cwd=chemid,
-                               stdout=outfile,
-                               stdin=subprocess.PIPE,
-                               stderr=errfile)
-    time.sleep(1)
-    pid = process.pid
-    return pid
+
+
+def submit_job(chemid, par):
+    """
+    Submit a kinbot run using subprocess and return the Popen object
+    """
+    prepare_job(chemid, par)
+    command = ["kinbot", chemid + ".json"]
+    with open('{dir}/kinbot.out'.format(dir=chemid), 'w') as outfile, \
+            open('{dir}/kinbot.err'.format(dir=chemid), 'w') as errfile:
+        process = subprocess.Popen(command,
+                                   cwd=chemid,
+                                   stdout=outfile,
+                                   stdin=subprocess.DEVNULL,
+                                   stderr=errfile)
+    return process
 
 def write_input(par, species, threshold, root):
     # directory for this particular species
@@ -1321,6 +1581,9 @@ def write_input(par, species, threshold, root):
     par2.par['structure'] = structure
     # delete the par smiles
     par2.par['smiles'] = ''
+    # the species can be a seed of a mechanism with a different multiplicity
+    par2.par['charge'] = species.charge
+    par2.par['mult'] = species.mult
     # overwrite the barrier treshold
     par2.par['barrier_threshold'] = threshold
     # set the pes option to 1
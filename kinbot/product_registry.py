@@ -0,0 +1,63 @@
+from kinbot.optimize import Optimize
+
+
+class ProductRegistry:
+    """
+    Products found on the PES of a well, keyed by chemid and multiplicity.
+
+    Every product is represented by a single StationaryPoint object,
+    and is optimized by a single Optimize object, which are shared by
+    all the reactions and homolytic scissions leading to the product.
+    This way the conformational search, the high level optimization and
+    the hindered rotor scans of a product are done only once.
+    """
+
+    def __init__(self, par, qc):
+        self.par = par
+        self.qc = qc
+        # key: (chemid, mult), value: StationaryPoint
+        self.species = {}
+        # key: (chemid, mult), value: Optimize
+        self.opts = {}
+
+    def key(self, st_pt):
+        return (st_pt.chemid, st_pt.mult)
+
+    def get(self, st_pt):
+        """
+        Return the registered product with the same chemid and
+        multiplicity as st_pt, or None if there is no such product.
+        """
+        return self.species.get(self.key(st_pt))
+
+    def add(self, st_pt):
+        """
+        Register st_pt if it is new, and return the registered product.
+        """
+        return self.species.setdefault(self.key(st_pt), st_pt)
+
+    def optimize(self, st_pt):
+        """
+        Return the Optimize object of the product, the optimization
+        is started the first time a product is asked for.
+        """
+        key = self.key(st_pt)
+        if key not in self.opts:
+            self.species.setdefault(key, st_pt)
+            opt = Optimize(st_pt, self.par, self.qc)
+            opt.do_optimization()
+            self.opts[key] = opt
+        return self.opts[key]
+
+    def restore(self, st_pt, status):
+        """
+        Return the Optimize object of the product after a restart,
+        with the status saved in the checkpoint.
+        """
+        key = self.key(st_pt)
+        if key not in self.opts:
+            self.species.setdefault(key, st_pt)
+            opt = Optimize(self.species[key], self.par, self.qc)
+            opt.restore(status)
+            self.opts[key] = opt
+        return self.opts[key]
@@ -5,14 +5,28 @@ import numpy as np
 import re
 import time
 import copy
+import heapq
 import pkg_resources
 
 from ase.db import connect
 
 from kinbot import constants
 from kinbot import geometry
+from kinbot import qc_cache
+from kinbot.queue_status import QueueStatus
+from kinbot.result_index import ResultIndex
 
 from shutil import copyfile
+from collections import namedtuple
+
+# Results of a qc job as read from the database:
+# status: status of the job as given by check_qc
+# geom: last geometry, None if the job is not in the database
+# energy: last energy in Hartree, 0. if not available
+# freq: last list of frequencies, empty if not available
+# zpe: zero point energy of the last entry, None if not available
+QCResult = namedtuple('QCResult', ['status', 'geom', 'energy', 'freq', 'zpe'])
+
 
 class QuantumChemistry:
     """
@@ -21,7 +35,7 @@ class QuantumChemistry:
     the jobs for success or failure
     """
     
-    def __init__(self, par):
+    def __init__(self, par, queue_status=None):
         self.par = par
         self.qc = par.par['qc']
         self.method = par.par['method']
@@ -36,6 +50,13 @@ class QuantumChemistry:
         self.slurm_feature = par.par['slurm_feature']
         self.zf = par.par['zf']
         self.db = connect('kinbot.db')
+        # latest results per job name, read incrementally from the database
+        self.index = ResultIndex(self.db)
+        # cached directory listings, key: directory, value: (time, set of file names)
+        self.listings = {}
+        # jobs in the database without a visible log file,
+        # key: job name, value: (row id, time when first seen)
+        self.finalizing = {}
         self.job_ids = {}
         self.irc_maxpoints = par.par['irc_maxpoints']
         self.irc_stepsize = par.par['irc_stepsize']
@@ -46,8 +67,25 @@ class QuantumChemistry:
         else:
             self.slurm_feature = '#SBATCH -C ' + par.par['slurm_feature']
         self.queue_job_limit = par.par['queue_job_limit']
+        # jobs waiting for a free slot if the number of jobs is limited,
+        # heap of (priority, submission number, job name)
+        self.pending = []
+        self.pending_jobs = set()
+        self.n_pending = 0
         self.username = par.par['username']
-       
+        # snapshot of the queue, can be shared between several instances
+        if queue_status is None:
+            queue_status = QueueStatus(par)
+        self.queue_status = queue_status
+        # cache of calculations shared between wells and runs
+        self.cache = None
+        if par.par['qc_cache'] != '':
+            self.cache = qc_cache.QCCache(par.par['qc_cache'])
+        # cache keys of the submitted jobs, key: job name, value: CacheKey
+        self.cache_keys = {}
+        # tracker of the jobs the reactions are waiting on, see JobTracker
+        self.tracker = None
+
 
     def get_qc_arguments(self, job, mult, charge, ts=0, step=0, max_step=0, irc=None, scan=0,
                          high_level=0, hir=0, start_form_geom=0):
@@ -221,7 +259,7 @@ class QuantumChemistry:
         f_out.write(template)
         f_out.close()
         
-        self.submit_qc(job)
+        self.submit_qc(job, key=self.cache_key(template_file, kwargs, atom, geom, species.charge, species.mult))
 
         return 0
 
@@ -328,7 +366,7 @@ class QuantumChemistry:
         f_out.write(template)
         f_out.close()
         
-        self.submit_qc(job)
+        self.submit_qc(job, key=self.cache_key(template_file, kwargs, atom, geom, species.charge, species.mult))
 
         return 0
 
@@ -399,7 +437,7 @@ class QuantumChemistry:
         f_out.write(template)
         f_out.close()
 
-        self.submit_qc(job)
+        self.submit_qc(job, key=self.cache_key(template_file, kwargs, atom, geom, species.charge, species.mult))
         return 0
 
     def qc_freq(self, species, geom, high_level = 0):
@@ -445,7 +483,7 @@ class QuantumChemistry:
         f_out.write(template)
         f_out.close()
         
-        self.submit_qc(job)
+        self.submit_qc(job, key=self.cache_key(template_file, kwargs, atom, geom, species.charge, species.mult))
         
         return 0
 
@@ -474,11 +512,11 @@ class QuantumChemistry:
         f_out.write(template)
         f_out.close()
         
-        self.submit_qc(job)
+        self.submit_qc(job, key=self.cache_key(template_file, kwargs, species.atom, geom, species.charge, species.mult), kind='ts_end')
 
         return 0
 
-    def submit_qc(self, job, singlejob=1):
+    def submit_qc(self, job, singlejob=1, key=None, kind=None):
         """
         Submit a job to the queue, unless the job:
             * has finished with Normal termination
@@ -488,19 +526,41 @@ class QuantumChemistry:
         the job is run only if it has finished earlier with normal termination.
         This is for continuations, when the continuing jobs overwrite each other.
         If the number of jobs in the queue is larger than the user-set limit,
-        KinBot will park here until resources are freed up.
+        the job is put in the pending queue, and it is submitted when
+        resources are freed up, in the order of the priority of its kind.
+        If kind is not given, it is guessed from the name of the job.
+        If a cache key is given and the calculation is in the qc cache,
+        the results are copied from the cache instead of running the job.
         """
 
-        if self.queue_job_limit > 0:
-            self.limit_jobs()
-
         check = self.check_qc(job)
         if singlejob == 1:
             if check != 0: return 0
         else:
-            if check == 'running': return 0
+            if check == 'running' or check == 'finalizing': return 0
         
+        if key is not None:
+            if self.cache.materialize(key, job, self.db, self.output_files(job)):
+                self.listings.pop(os.path.dirname(job) or '.', None)
+                return 1
+            self.cache_keys[job] = key
 
+        if self.queue_job_limit > 0:
+            if kind is None:
+                kind = self.job_kind(job)
+            priority = self.par.par['queue_priority'].get(kind, max(self.par.par['queue_priority'].values()))
+            self.n_pending += 1
+            heapq.heappush(self.pending, (priority, self.n_pending, job))
+            self.pending_jobs.add(job)
+            self.drain()
+            return 1  # the job is counted as submitted
+        
+        return self.submit_job(job)
+
+    def submit_job(self, job):
+        """
+        Write the queue file of the job and submit it.
+        """
         try: 
             if self.par.par['queue_template'] == '':
                 template_head_file = pkg_resources.resource_filename('tpl', self.queuing + '.tpl')
@@ -525,6 +585,8 @@ class QuantumChemistry:
         elif self.queuing == 'slurm':
             python_template = python_template.format(   name=job, ppn=self.ppn, queue_name=self.queue_name, dir='perm', 
                                                         slurm_feature=self.slurm_feature, python_file=python_file, arguments='' )
+        elif self.queuing == 'local':
+            python_template = python_template.format(   name=job, ppn=self.ppn, dir='perm', python_file=python_file, arguments='' )
         else:
             logging.error('KinBot does not recognize queuing system {}.'.format(self.queuing))
             logging.error('Exiting')
@@ -534,6 +596,11 @@ class QuantumChemistry:
         with open(qu_file, 'w') as f_out_qu:
             f_out_qu.write(python_template)
 
+        if self.queuing == 'local':
+            pid = self.queue_status.local.submit(qu_file, stdout='perm/{}.stdout'.format(job), stderr='perm/{}.err'.format(job))
+            self.job_ids[job] = pid
+            return 1
+
         command = [constants.qsubmit[self.queuing], job + constants.qext[self.queuing]]
         process = subprocess.Popen(command, shell=False, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
         out,err = process.communicate()
@@ -551,10 +618,38 @@ class QuantumChemistry:
             logging.error(msg)
             sys.exit()
         self.job_ids[job] = pid
+        self.queue_status.add(pid)
         
         return 1  # important to keep it 1, this is the natural counter of jobs submitted
 
 
+    def get_qc_result(self, job, wait=0):
+        """
+        Read all the results of a job at once, with a single status check
+        and a single lookup in the database index.
+        If wait = 1, wait for the job to finish.
+        Returns a QCResult, with the status as given by check_qc.
+        """
+        while 1:
+            status = self.check_qc(job)
+            if (status == 'running' or status == 'finalizing') and wait == 1:
+                time.sleep(1)
+            else:
+                break
+
+        entry = self.index.get(job)
+        if entry is None:
+            return QCResult(status, None, 0., [], None)
+
+        energy = 0.
+        if entry['energy'] is not None:
+            #ase energies are always in ev, convert to hartree
+            energy = entry['energy'] * constants.EVtoHARTREE
+        freq = []
+        if entry['frequencies'] is not None:
+            freq = list(entry['frequencies'])
+        return QCResult(status, entry['geom'], energy, freq, entry['zpe'])
+
     def get_qc_geom(self,job, natom, wait=0, allow_error = 0):
         """
         Get the geometry from the ase database file.
@@ -569,37 +664,13 @@ class QuantumChemistry:
         """ 
         geom = np.zeros((natom,3))    
         
-        check = self.check_qc(job)
-        if check == 'error' and not allow_error: return -1, geom
-        status = 0
-        while 1:
-            check = self.check_qc(job)
-            if check == 'running': 
-                if wait == 1:
-                    time.sleep(1)
-                elif wait == 2:
-                    status = 2
-                    break
-                else: 
-                    return 1, geom 
-            else:
-                break
-        if check != 'normal':
-            if not allow_error:
-                if wait != 2: return -1, geom
-
-        #open the database
-        rows = self.db.select(name = job)
-        
-        found_entry = 0
-        #take the last entry
-        for row in rows:
-            mol = row.toatoms()
-            geom = mol.positions
-            found_entry = 1
-        
-        if found_entry:
+        result = self.get_qc_result(job, wait=int(wait == 1))
+        status = self.geom_status(result.status, wait, allow_error)
+        if status < 0 or status == 1:
             return status, geom
+
+        if result.geom is not None:
+            return status, result.geom
         else:
             return -1, geom
 
@@ -615,44 +686,35 @@ class QuantumChemistry:
         if allow_error = 1, read the geometry even though there is an error in the output file
             This option is to read the final IRC geometry when it did not converge
         """ 
-        
-       
         geom = np.zeros((natom,3))    
         
-        check = self.check_qc(job)
-        if check == 'error' and not allow_error: return -1, geom
+        result = self.get_qc_result(job, wait=int(wait == 1))
+        status = self.geom_status(result.status, wait, allow_error)
+        if status < 0 or status == 1:
+            return status, geom
+
+        entry = self.index.get(job, refresh=0)
+        if entry is not None and entry['prev_geom'] is not None:
+            return status, entry['prev_geom']
+        else:
+            return -1, geom
+
+    def geom_status(self, check, wait, allow_error):
+        """
+        Translate the status of a job into the error code of the geometry readers.
+        """
+        if check == 'error' and not allow_error:
+            return -1
         status = 0
-        while 1:
-            check = self.check_qc(job)
-            if check == 'running': 
-                if wait == 1:
-                    time.sleep(1)
-                elif wait == 2:
-                    status = 2
-                    break
-                else: 
-                    return 1, geom 
+        if check == 'running' or check == 'finalizing':
+            if wait == 2:
+                status = 2
             else:
-                break
+                return 1
         if check != 'normal':
             if not allow_error:
-                if wait != 2: return -1, geom
-
-        #open the database
-        rows = self.db.select(name = job)
-        
-        found_entry = 0
-        geoms = []
-        #take the last entry
-        for row in rows:
-            mol = row.toatoms()
-            geoms.append(mol.positions)
-            found_entry = 1
-        
-        if found_entry:
-            return status, geoms[-2]
-        else:
-            return -1, geom
+                if wait != 2: return -1
+        return status
 
     def get_qc_freq(self,job, natom, wait=0, allow_error = 0):
         """
@@ -660,31 +722,12 @@ class QuantumChemistry:
         If wait is set to 1, it will wait for the job to finish.
         """ 
         
-        check = self.check_qc(job)
-        if check == 'error': return -1, [0]
-        while 1:
-            check = self.check_qc(job)
-            if check == 'running':
-                if wait == 1:
-                    time.sleep(1)
-                else:
-                    return 1, []
-            else:
-                break
-        
-        if check != 'normal': return -1, [0]
+        result = self.get_qc_result(job, wait=wait)
+        if result.status == 'error': return -1, [0]
+        if result.status == 'running' or result.status == 'finalizing': return 1, []
+        if result.status != 'normal': return -1, [0]
 
-        freq = []
-        
-        #open the database
-        rows = self.db.select(name = job)
-        
-        #take the last entry
-        for row in rows:
-            if hasattr(row, 'data'):
-                if not row.data.get('frequencies') is None:
-                    freq = list(row.data.get('frequencies'))
-        
+        freq = result.freq
         if len(freq) == 0 and natom > 1:
             return -1,freq
 
@@ -704,33 +747,11 @@ class QuantumChemistry:
          1: running
         """
 
-        check = self.check_qc(job)
-        if check == 'error': return -1, 0.
-        while 1:
-            check = self.check_qc(job)
-            if check == 'running': 
-                if wait == 1:
-                    time.sleep(1)
-                else:
-                    return 1, 0.
-            else:
-                break
-
-        #open the database
-        rows = self.db.select(name = job)
-        energy=0
-        #take the last entry
-        for row in rows:
-            if hasattr(row, 'data'):
-                if not row.data.get('energy') is None:
-                    energy = row.data.get('energy')
-        
-        #ase energies are always in ev, convert to hartree
-        energy *= constants.EVtoHARTREE
+        result = self.get_qc_result(job, wait=wait)
+        if result.status == 'error': return -1, 0.
+        if result.status == 'running' or result.status == 'finalizing': return 1, 0.
         
-        return 0, energy
-
-
+        return 0, result.energy
 
     def get_qc_zpe(self,job, wait=1):
         """
@@ -738,27 +759,11 @@ class QuantumChemistry:
         If wait is set to 1 (default), it will wait for the job to finish.
         """
         
-        check = self.check_qc(job)
-        if check == 'error': return -1, 0.
-        while 1:
-            check = self.check_qc(job)
-            if check == 'running': 
-                if wait == 1:
-                    time.sleep(1)
-                else:
-                    return 0, 0.
-            else:
-                break
-
-        #open the database
-        rows = self.db.select(name = job)
-
-        #take the last entry
-        for row in rows:
-            if hasattr(row, 'data'):
-                zpe = row.data.get('zpe')
+        result = self.get_qc_result(job, wait=wait)
+        if result.status == 'error': return -1, 0.
+        if result.status == 'running' or result.status == 'finalizing': return 0, 0.
         
-        return 0, zpe
+        return 0, result.zpe
 
     def read_qc_hess(self, job, natom):
         """
@@ -805,16 +810,7 @@ class QuantumChemistry:
         """
         Checks if the current job is in the database:
         """
-        #open the database
-        rows = self.db.select(name=job)
-        
-        mol = None
-        
-        #take the last entry
-        for row in rows:
-            mol = row.toatoms()
-        
-        if mol is None:
+        if self.index.get(job) is None:
             return 0
         
         return 1
@@ -822,91 +818,155 @@ class QuantumChemistry:
     def check_qc(self,job):
         """
         Checks the status of the qc job.
+        If a job tracker is attached, the status is reported to it.
+        """
+        status = self.job_status(job)
+        if self.tracker is not None:
+            self.tracker.observe(job, status)
+        return status
+
+    def job_status(self, job):
+        """
+        Status of the qc job: 'running', 'finalizing', 'normal',
+        'error' or 0 if the job is not found.
         """
         logging.debug('Checking job {}'.format(job))
         
-        devnull = open(os.devnull, 'w')
-        if self.queuing == 'pbs':
-            command = 'qstat -f | grep ' + '"Job Id: ' + self.job_ids.get(job,'-1') + '"' + ' > /dev/null'
-            if int(subprocess.call(command, shell = True, stdout=devnull, stderr=devnull)) == 0: 
-                logging.debug('Job is running')
-                return 'running'
-        elif self.queuing == 'slurm':
-            #command = 'scontrol show job ' + self.job_ids.get(job,'-1') + ' | grep "JobId=' + self.job_ids.get(job,'-1') + '"' + ' > /dev/null'
-            command = 'squeue'
-            process = subprocess.Popen(command,
-                                       shell=True,
-                                       stdout=subprocess.PIPE,
-                                       stdin=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            out,err = process.communicate()
-            out = out.decode()
-            for line in out.split('\n'):
-                if len(line) > 0:
-                    while line.startswith(' '):
-                        line = line[1:]
-                    pid = line.split()[0]
-                    if pid == self.job_ids.get(job,'-1'):
-                        logging.debug('Job is running')
-                        return 'running'
-        else:
+        if len(self.pending) > 0:
+            self.drain()
+        if job in self.pending_jobs:
+            logging.debug('Job is waiting to be submitted')
+            return 'running'
+
+        if self.queuing not in ['pbs', 'slurm', 'local']:
             logging.error('KinBot does not recognize queuing system {}.'.format(self.queuing))
             logging.error('Exiting')
             sys.exit()
-        #if int(subprocess.call(command, shell = True, stdout=devnull, stderr=devnull)) == 0: 
-        #    return 'running' 
-        
-        if self.is_in_database(job):
-            for i in range(10):
-                
-                if self.qc == 'gauss':
-                    log_file = job + '.log'
-                elif self.qc == 'nwchem':
-                    log_file = job + '.out'
-                log_file_exists = os.path.exists(log_file)
-                if log_file_exists:
-                    logging.debug('Log file is present after {} iterations'.format(i))
-                    #by deleting a log file, you allow restarting a job
-                    #open the database
-                    rows = self.db.select(name = job)
-                    data = None
-                    #take the last entry
-                    for row in rows:
-                        if hasattr(row,'data'):
-                            data = row.data
-                    if data is None:
-                        logging.debug('Data is not in database...')
-                        return 0
-                    else:
-                        logging.debug('Returning status {}'.format(data['status']))
-                        return data['status']
+        if self.queue_status.is_running(self.job_ids.get(job)):
+            logging.debug('Job is running')
+            return 'running'
+
+        entry = self.index.get(job)
+        if entry is not None:
+            log_file = self.log_file(job)
+            if self.file_exists(log_file):
+                self.finalizing.pop(job, None)
+                #by deleting a log file, you allow restarting a job
+                if entry['status'] is None:
+                    logging.debug('Data is not in database...')
+                    return 0
                 else:
-                    logging.debug('Checking againg for log file')
-                    log_file_exists = os.path.exists(log_file)
-                    time.sleep(1)
-                
+                    logging.debug('Returning status {}'.format(entry['status']))
+                    if entry['status'] == 'normal' and job in self.cache_keys:
+                        key = self.cache_keys.pop(job)
+                        self.cache.store(key, self.db.get(id=entry['id']), self.output_files(job))
+                    return entry['status']
+            # the job is in the database, but the log file is not visible yet,
+            # check again at the next call until finalize_wait is over
+            row_id, first_seen = self.finalizing.get(job, (None, None))
+            if row_id != entry['id']:
+                first_seen = time.time()
+                self.finalizing[job] = (entry['id'], first_seen)
+            if time.time() - first_seen < self.par.par['finalize_wait']:
+                logging.debug('Job {} is finalizing'.format(job))
+                return 'finalizing'
             logging.debug('log file {} does not exist'.format(log_file))
             return 0
         else:
             logging.debug('job {} is not in database'.format(job))
             return 0
-            
 
-    def limit_jobs(self):
+    def cache_key(self, template_file, kwargs, atom, geom, charge, mult):
         """
-        Check how many jobs are in the queue from the user, and if larger than the limit, 
-        then wait for resources to free up.
+        Key of a calculation in the qc cache, None if the cache is not used.
         """
+        if self.cache is None:
+            return None
+        kind = os.path.basename(template_file)
+        return qc_cache.make_key(self.qc, kind, kwargs, atom, geom, charge, mult)
 
-        while 1:
-            if self.queuing == 'slurm':
-                command = ['squeue', '-h', '-u', '{}'.format(self.username)]
-            elif self.queuing == 'pbs':
-                command = ['qselect', '-u', '{}'.format(self.username)]
-            jobs = subprocess.check_output(command)
+    def output_files(self, job):
+        """
+        Output files of a job that are kept in the qc cache,
+        key: extension, value: file name.
+        """
+        if self.qc == 'gauss':
+            return {'.log': job + '.log', '.chk': job + '.chk', '.fchk': job + '.fchk'}
+        elif self.qc == 'nwchem':
+            return {'.out': job + '.out'}
 
-            if len(jobs.split(b'\n')) < self.queue_job_limit:
-                return 0
-            time.sleep(30)
+    def log_file(self, job):
+        """
+        Name of the output file of the job.
+        """
+        if self.qc == 'gauss':
+            return job + '.log'
+        elif self.qc == 'nwchem':
+            return job + '.out'
 
+    def file_exists(self, path):
+        """
+        Check if a file exists. The directories are listed at most once
+        per second, and all the checks in that directory are answered
+        from the listing.
+        """
+        dir_name, name = os.path.split(path)
+        if dir_name == '':
+            dir_name = '.'
+        now = time.time()
+        listing = self.listings.get(dir_name)
+        if listing is None or now - listing[0] > 1.:
+            try:
+                listing = (now, set(os.listdir(dir_name)))
+            except OSError:
+                listing = (now, set())
+            self.listings[dir_name] = listing
+        return name in listing[1]
+
+    def remove_log(self, job):
+        """
+        Delete the output file of a job to allow restarting it.
+        The job will not be considered finalizing, so that it
+        can be resubmitted right away.
+        """
+        log_file = self.log_file(job)
+        if os.path.exists(log_file):
+            os.remove(log_file)
+        dir_name = os.path.dirname(log_file)
+        if dir_name == '':
+            dir_name = '.'
+        self.listings.pop(dir_name, None)
+        entry = self.index.get(job)
+        if entry is not None:
+            self.finalizing[job] = (entry['id'], -float('inf'))
+
+    def drain(self):
+        """
+        Submit the pending jobs in the order of their priority, as long as 
+        the number of jobs in the queue is below the user-set limit.
+        """
+        while len(self.pending) > 0:
+            if self.queue_status.n_jobs() >= self.queue_job_limit:
+                return 0
+            priority, n, job = heapq.heappop(self.pending)
+            self.pending_jobs.discard(job)
+            self.submit_job(job)
+        return 0
 
+    def job_kind(self, job):
+        """
+        Guess the kind of the job from its name, the kinds are
+        the keys of the queue_priority parameter.
+        """
+        if '_IRC_' in job:
+            return 'irc'
+        if job.startswith('hir/'):
+            return 'hir'
+        if job.startswith('conf/'):
+            return 'conf'
+        if '_well' in job or '_fr' in job:
+            return 'well'
+        if job.endswith('_high'):
+            # reoptimization of a ts found by the search, a finishing stage
+            return 'ts_end'
+        return 'ts_search'
@@ -0,0 +1,128 @@
+"""
+Content-addressed cache of qc calculations shared between wells and runs.
+
+A calculation is identified by a hash of the code, the job template,
+the charge, the multiplicity, the elements, the input geometry and the
+keyword arguments that change the result. The geometry is
+translated to its centroid, rotated to its principal axes and
+rounded before hashing, so identical structures in a different
+orientation also match.
+
+The results are kept in an ase database in the cache directory, and the
+output files of the job are stored next to it, named after the hash.
+The geometry is kept in the frame of the job that was run, the same
+frame as the Hessian and the other results in the output files, so a
+cache hit gives the result in that frame and not in the frame of the
+new input.
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+from collections import namedtuple
+
+import numpy as np
+from ase import Atoms
+from ase.db import connect
+
+
+# keyword arguments that do not change the outcome of a calculation
+ignored_kwargs = ['label', 'chk', 'nprocshared', 'mem', 'memory', 'scratch_dir', 'permanent_dir']
+
+# number of decimals of the aligned geometry in Angstrom
+geom_decimals = 2
+
+# hash: hash of the calculation
+CacheKey = namedtuple('CacheKey', ['hash'])
+
+
+def align(geom):
+    """
+    Return the centroid and the principal axes of the geometry.
+    The direction of each axis is chosen to make the third moment
+    of the coordinates positive, and the axes are right-handed.
+    """
+    geom = np.array(geom, dtype=float)
+    center = np.mean(geom, axis=0)
+    x = geom - center
+    w, axes = np.linalg.eigh(np.dot(x.T, x))
+    y = np.dot(x, axes)
+    for k in range(3):
+        if np.sum(y[:, k]**3) < -1e-8:
+            axes[:, k] *= -1
+    if np.linalg.det(axes) < 0:
+        axes[:, 2] *= -1
+    return center, axes
+
+
+def make_key(code, kind, kwargs, atom, geom, charge, mult):
+    """
+    Create the cache key of a calculation.
+    """
+    center, axes = align(geom)
+    aligned = np.round(np.dot(np.array(geom, dtype=float) - center, axes), geom_decimals) + 0.
+    kw = {}
+    for key in kwargs:
+        if key not in ignored_kwargs:
+            kw[key] = kwargs[key]
+    content = json.dumps([code, kind, charge, mult, [str(at) for at in atom],
+                          aligned.tolist(), kw], sort_keys=True, default=str)
+    return CacheKey(hashlib.sha1(content.encode()).hexdigest())
+
+
+class QCCache:
+    """
+    Cache of the qc calculations in a directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db = connect(os.path.join(directory, 'qc_cache.db'))
+
+    def get(self, key):
+        """
+        Return the database row of the calculation, None if not in the cache.
+        """
+        for row in self.db.select(cache_key=key.hash, limit=1):
+            return row
+        return None
+
+    def store(self, key, row, files):
+        """
+        Store the result of a calculation, row is the database row of the
+        job and files is a dictionary of extension to output file.
+        """
+        if self.get(key) is not None:
+            return 0
+        for ext in files:
+            if os.path.exists(files[ext]):
+                blob = os.path.join(self.directory, key.hash + ext)
+                shutil.copyfile(files[ext], blob + '.tmp')
+                os.replace(blob + '.tmp', blob)
+        mol = Atoms(symbols=row.symbols, positions=row.positions)
+        self.db.write(mol, cache_key=key.hash, data=row.data)
+        logging.debug('Stored {} in the qc cache as {}'.format(row.name, key.hash))
+        return 1
+
+    def materialize(self, key, job, db, files):
+        """
+        Write the cached result of a calculation to the database as job,
+        and copy the output files, given as a dictionary from extension to
+        file name. Returns 1 on a cache hit and 0 otherwise.
+        """
+        row = self.get(key)
+        if row is None:
+            return 0
+        for ext in files:
+            blob = os.path.join(self.directory, key.hash + ext)
+            if os.path.exists(blob):
+                shutil.copyfile(blob, files[ext])
+        # the geometry stays in the frame of the output files,
+        # rotating it would not match e.g. the Hessian in the fchk file
+        mol = Atoms(symbols=row.symbols, positions=row.positions)
+        db.write(mol, name=job, data=row.data)
+        logging.debug('Took {} from the qc cache {}'.format(job, key.hash))
+        return 1
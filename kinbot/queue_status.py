@@ -0,0 +1,236 @@
+import sys
+import time
+import getpass
+import logging
+import subprocess
+
+from kinbot.local_queue import LocalQueue
+
+# error messages of the schedulers for job ids that are not in the queue any more,
+# PBS Pro keeps finished jobs in its history and reports them as finished
+unknown_job_messages = ['invalid job id', 'unknown job id', 'job has finished']
+
+
+class QueueStatus:
+    """
+    Snapshot of the queuing system shared by all status checks.
+
+    The scheduler is queried at most once every queue_poll_interval
+    seconds, filtered by the set of job ids submitted by KinBot.
+    The answer is stored in a map from job id to state, and all the
+    status requests are served from this map.
+    The number of jobs used for the queue_job_limit is counted
+    separately over all the jobs of the user, also at most once
+    every queue_poll_interval seconds.
+
+    For the local queuing the jobs are run by a LocalQueue, which
+    is polled at every request, as it does not need any subprocess.
+    """
+
+    def __init__(self, par):
+        self.queuing = par.par['queuing']
+        self.username = par.par['username']
+        if self.username == '':
+            self.username = getpass.getuser()
+        self.interval = par.par['queue_poll_interval']
+        # key: job id, value: state as reported by the scheduler
+        self.jobs = {}
+        # jobs submitted after the start of the last query,
+        # key: job id, value: submission time
+        self.submitted = {}
+        # all job ids submitted by this process
+        self.job_ids = set()
+        # time when the last successful query started
+        self.last_query = None
+        # ids of all the jobs of the user in the queue
+        self.user_jobs = set()
+        # time when the last successful count of the jobs of the user started
+        self.last_user_query = None
+        # process pool for the local queuing
+        self.local = None
+        if self.queuing == 'local':
+            self.local = LocalQueue(par)
+
+    def add(self, pid):
+        """
+        Register a freshly submitted job. The job counts as
+        being in the queue until a snapshot taken after the
+        submission says otherwise.
+        """
+        self.submitted[pid] = time.time()
+        self.job_ids.add(pid)
+
+    def refresh(self, force=0):
+        """
+        Query the scheduler if the snapshot is older than the poll interval.
+        """
+        if self.local is not None:
+            self.jobs = self.local.poll()
+            self.submitted = {}
+            self.job_ids = set(self.jobs)
+            self.last_query = time.time()
+            return 1
+
+        if not force and self.last_query is not None:
+            if time.time() - self.last_query < self.interval:
+                return 0
+
+        start = time.time()
+        jobs = self.query()
+        if jobs is None:
+            # keep the old snapshot and try again at the next interval
+            self.last_query = start
+            return 0
+
+        self.jobs = jobs
+        self.last_query = start
+        for pid in list(self.submitted):
+            if self.submitted[pid] < start:
+                del self.submitted[pid]
+        # forget the jobs that left the queue
+        self.job_ids = set(pid for pid in self.job_ids if pid in self.jobs or pid in self.submitted)
+        return 1
+
+    def is_running(self, pid):
+        """
+        Return True if the job with the given id is in the queue.
+        """
+        if pid is None:
+            return False
+        self.refresh()
+        return pid in self.jobs or pid in self.submitted
+
+    def state(self, pid):
+        """
+        Return the state of the job as reported by the scheduler,
+        'submitted' if it is not yet in the snapshot, or None if it
+        is not in the queue.
+        """
+        self.refresh()
+        if pid in self.jobs:
+            return self.jobs[pid]
+        if pid in self.submitted:
+            return 'submitted'
+        return None
+
+    def n_jobs(self):
+        """
+        Number of jobs of the user in the queue, including the ones
+        of other processes, as queue_job_limit is a limit per user.
+        The jobs of this process that are newer than the count are added.
+        """
+        self.refresh()
+        if self.local is not None:
+            return len(self.jobs)
+        if self.last_user_query is None or time.time() - self.last_user_query >= self.interval:
+            start = time.time()
+            jobs = self.query_user()
+            if jobs is not None:
+                self.user_jobs = set(jobs)
+            self.last_user_query = start
+        return len(self.user_jobs | set(self.jobs) | set(self.submitted))
+
+    def query_user(self):
+        """
+        Ask the scheduler about all the jobs of the user and return their ids,
+        or None if the scheduler could not be reached.
+        """
+        if self.queuing == 'slurm':
+            command = ['squeue', '-h', '-u', self.username, '-o', '%i %t']
+        else:
+            command = ['qselect', '-u', self.username]
+        try:
+            out = subprocess.check_output(command, stderr=subprocess.PIPE)
+        except (OSError, subprocess.CalledProcessError):
+            logging.warning('Could not run {}'.format(' '.join(command)))
+            return None
+        if self.queuing == 'slurm':
+            return list(parse_squeue(out.decode()))
+        return parse_qselect(out.decode())
+
+    def query(self):
+        """
+        Ask the scheduler about the jobs submitted by this process and return
+        a dictionary from job id to state, or None if the scheduler could not
+        be reached. The jobs are always selected by their ids, so that the
+        jobs of other runs of the same user are not mixed in.
+        """
+        if len(self.job_ids) == 0:
+            return {}
+        if self.queuing == 'slurm':
+            command = ['squeue', '-h', '-j', ','.join(sorted(self.job_ids)), '-o', '%i %t']
+        elif self.queuing == 'pbs':
+            command = ['qstat'] + sorted(self.job_ids)
+        else:
+            logging.error('KinBot does not recognize queuing system {}.'.format(self.queuing))
+            logging.error('Exiting')
+            sys.exit()
+
+        try:
+            process = subprocess.Popen(command,
+                                       shell=False,
+                                       stdout=subprocess.PIPE,
+                                       stdin=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            out, err = process.communicate()
+        except OSError:
+            logging.warning('Could not run {}'.format(' '.join(command)))
+            return None
+        return parse_query(self.queuing, process.returncode, out.decode(), err.decode())
+
+
+def parse_query(queuing, returncode, out, err):
+    """
+    Parse the answer of squeue or qstat to a query by job ids.
+    Both exit with an error if some of the ids are not known any more,
+    these jobs left the queue, which is not a failure of the query.
+    """
+    if returncode != 0 and len(out.strip()) == 0:
+        if not any(msg in err.lower() for msg in unknown_job_messages):
+            logging.warning('Queue query failed: {}'.format(err.strip()))
+            return None
+    if queuing == 'slurm':
+        return parse_squeue(out)
+    return parse_qstat(out)
+
+
+def parse_squeue(out):
+    """
+    Parse the output of squeue -h -o "%i %t".
+    """
+    jobs = {}
+    for line in out.split('\n'):
+        words = line.split()
+        if len(words) == 0:
+            continue
+        if len(words) > 1:
+            jobs[words[0]] = words[1]
+        else:
+            jobs[words[0]] = ''
+    return jobs
+
+
+def parse_qselect(out):
+    """
+    Parse the output of qselect, one job id per line.
+    """
+    return [line.strip().split('.')[0] for line in out.split('\n') if line.strip() != '']
+
+
+def parse_qstat(out):
+    """
+    Parse the default output of qstat, skipping the header lines.
+    """
+    jobs = {}
+    for line in out.split('\n'):
+        words = line.split()
+        if len(words) == 0:
+            continue
+        pid = words[0].split('.')[0]
+        if not pid.isdigit():
+            continue
+        if len(words) > 4:
+            jobs[pid] = words[4]
+        else:
+            jobs[pid] = ''
+    return jobs
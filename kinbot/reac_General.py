@@ -24,6 +24,8 @@ class GeneralReac:
         
         self.instance = instance
         self.instance_name = instance_name
+        # first step done in a chain job, -1 if no chain job is running
+        self.chain_start = -1
 
         if self.scan:
             max_step = self.par.par['scan_step']
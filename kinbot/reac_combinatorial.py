@@ -30,6 +30,7 @@ class Combinatorial:
         self.par = par
         
         #indices of the reactive atoms
+        self.instance = instance
         self.reac = instance[0]
         self.prod = instance[1]
         self.ts_bond = instance[2]
@@ -49,6 +50,8 @@ class Combinatorial:
         self.scan = 0
         #skip the first 12 steps in case the instance has a length of 3?
         self.skip = 0
+        #first step done in a chain job, -1 if no chain job is running
+        self.chain_start = -1
         
         self.get_expected_products()
 
@@ -157,6 +160,6 @@ class Combinatorial:
         inchis = []
         for opt in self.prod_opt:
             species = opt.species
-            inchi = cheminfo.create_inchi('', '', 'xyz/{}.xyz'.format(species.chemid))
+            inchi = cheminfo.create_inchi_from_geom(species.atom, species.geom, str(species.chemid))
             inchis.append(inchi)
         return inchis
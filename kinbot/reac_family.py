@@ -3,6 +3,7 @@ import os
 import numpy as np
 import copy
 import time
+import pickle
 import pkg_resources
 from kinbot import modify_geom
 
@@ -11,14 +12,13 @@ def carry_out_reaction(rxn, step, command):
     Verify what has been done and what needs to be done
     skip: boolean which tells to skip the first 12 steps in case of an instance shorter than 4
     scan: boolean which tells if this is part of an energy scan along a bond length coordinate
+    If ts_step_chain is set, all the steps before the final saddle point search are
+    done in a single job, see ts_chain.py
     """
     if step > 0:
         status = rxn.qc.check_qc(rxn.instance_name)
         if status != 'normal' and status != 'error': return step
 
-    kwargs = rxn.qc.get_qc_arguments(   rxn.instance_name, rxn.species.mult, rxn.species.charge, ts=1,
-                                        step = step, max_step=rxn.max_step, scan = rxn.scan)
-
     if step == 0:
         if rxn.qc.is_in_database(rxn.instance_name):
             if rxn.qc.check_qc(rxn.instance_name) == 'normal': 
@@ -30,14 +30,44 @@ def carry_out_reaction(rxn, step, command):
         if rxn.skip and len(rxn.instance) < 4: 
             step = 12
         geom = rxn.species.geom
+        if rxn.par.par['ts_step_chain'] == 1 and not rxn.scan:
+            return start_chain(rxn, step, command)
     else:
         err, geom = rxn.qc.get_qc_geom(rxn.instance_name, rxn.species.natom, allow_error = 1)
 
-    step, fix, change, release = rxn.get_constraints(step, geom)
+    if rxn.chain_start > -1:
+        # the steps before the saddle point search were done by a chain job
+        step, fix, change, release = chain_constraints(rxn, rxn.chain_start, geom)
+        rxn.chain_start = -1
+    else:
+        step, fix, change, release = rxn.get_constraints(step, geom)
 
     if step > rxn.max_step:
         return step
     
+    template = step_template(rxn, step, geom, fix, change, release, command)
+
+    f_out = open('{}.py'.format(rxn.instance_name),'w')
+    f_out.write(template)
+    f_out.close()
+    
+    if step < rxn.max_step:
+        kind = 'ts_search'
+    else:
+        kind = 'ts_end'
+    step += rxn.qc.submit_qc(rxn.instance_name, 0, kind=kind)
+
+    return step
+
+
+def step_template(rxn, step, geom, fix, change, release, command):
+    """
+    Apply the geometry changes of a step and return the 
+    python script of the step's qc job.
+    """
+    kwargs = rxn.qc.get_qc_arguments(   rxn.instance_name, rxn.species.mult, rxn.species.charge, ts=1,
+                                        step = step, max_step=rxn.max_step, scan = rxn.scan)
+
     #apply the geometry changes here and fix the coordinates that changed
     change_starting_zero = []
     for c in change:
@@ -68,11 +98,95 @@ def carry_out_reaction(rxn, step, command):
                                ppn=rxn.qc.ppn,
                                qc_command=command,
                                working_dir=os.getcwd())
+    return template
 
-    f_out = open('{}.py'.format(rxn.instance_name),'w')
-    f_out.write(template)
-    f_out.close()
-    
-    step += rxn.qc.submit_qc(rxn.instance_name, 0)
 
+def chain_constraints(rxn, step, geom):
+    """
+    Go through the constraints of the steps starting at step
+    up to the first step which is not done in a chain job,
+    and return the constraints of that step.
+    Each step is replayed with the geometry the chain job used for it,
+    geom is only used for the steps the chain job did not record.
+    """
+    geoms = read_chain_geoms(rxn.instance_name)
+    i = 0
+    while 1:
+        if i < len(geoms):
+            step_geom = geoms[i]
+        else:
+            step_geom = geom
+        step, fix, change, release = rxn.get_constraints(step, step_geom)
+        if step >= rxn.max_step:
+            return step, fix, change, release
+        step += 1
+        i += 1
+
+
+def chain_geoms_file(name):
+    """
+    File with the geometries the constraints of the chain steps were taken from.
+    """
+    return '{}_chain_geoms.pkl'.format(name)
+
+
+def write_chain_geoms(name, geoms):
+    with open(chain_geoms_file(name), 'wb') as f:
+        pickle.dump(geoms, f)
+
+
+def read_chain_geoms(name):
+    """
+    Geometries of the steps of the chain job,
+    an empty list if the job did not write them.
+    """
+    try:
+        with open(chain_geoms_file(name), 'rb') as f:
+            return pickle.load(f)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError):
+        return []
+
+
+def start_chain(rxn, step, command):
+    """
+    Submit a job that carries out all the steps of the ts search before the
+    final saddle point search, starting at step.
+    Returns the step at which the search continues.
+    """
+    spec = {
+        'module': rxn.__class__.__module__,
+        'class': rxn.__class__.__name__,
+        'instance': copy.deepcopy(rxn.instance),
+        'instance_name': rxn.instance_name,
+        'step': step,
+        'command': command,
+        'par': rxn.par.par,
+        'species': {
+            'name': rxn.species.name,
+            'charge': rxn.species.charge,
+            'mult': rxn.species.mult,
+            'chemid': rxn.species.chemid,
+            'natom': rxn.species.natom,
+            'atom': list(rxn.species.atom),
+            'geom': np.array(rxn.species.geom),
+            'bond': np.array(rxn.species.bond),
+            'cycle_chain': copy.deepcopy(rxn.species.cycle_chain),
+            },
+        }
+    spec_file = '{}_chain.pkl'.format(rxn.instance_name)
+    # the geometries of an earlier chain of the reaction are not valid any more
+    if os.path.exists(chain_geoms_file(rxn.instance_name)):
+        os.remove(chain_geoms_file(rxn.instance_name))
+    with open(spec_file, 'wb') as f:
+        pickle.dump(spec, f)
+
+    template_file = pkg_resources.resource_filename('tpl', 'ts_chain.tpl.py')
+    template = open(template_file, 'r').read()
+    template = template.format(spec_file=spec_file)
+    with open('{}.py'.format(rxn.instance_name), 'w') as f_out:
+        f_out.write(template)
+
+    if rxn.qc.submit_qc(rxn.instance_name, 0, kind='ts_search'):
+        rxn.chain_start = step
+        return rxn.max_step
     return step
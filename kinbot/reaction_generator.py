@@ -3,6 +3,8 @@ import sys
 import os
 import copy
 import time
+import json
+import asyncio
 import logging
 
 from kinbot import constants
@@ -13,10 +15,16 @@ from kinbot import postprocess
 from kinbot import reac_family
 from kinbot import cheminfo
 from kinbot.irc import IRC
+from kinbot.job_tracker import JobTracker
 from kinbot.optimize import Optimize
+from kinbot.product_registry import ProductRegistry
 from kinbot.stationary_pt import StationaryPoint
 
 
+# file with the state of the reactions, to restart the search
+checkpoint_file = 'kinbot_checkpoint.json'
+
+
 class ReactionGenerator:
     """
     This class generates the reactions using the qc codes
@@ -24,10 +32,17 @@ class ReactionGenerator:
     and does IRC calculations 
     """
     
-    def __init__(self,species,par,qc):
+    def __init__(self,species,par,qc,registry=None,scissions=None):
         self.species = species
         self.par = par
         self.qc = qc
+        # HomolyticScissions object whose products are optimized
+        # together with the reaction searches
+        self.scissions = scissions
+        # products of the well, shared with the homolytic scissions
+        if registry is None:
+            registry = ProductRegistry(par, qc)
+        self.registry = registry
     
     def generate(self):
         """ 
@@ -50,430 +65,52 @@ class ReactionGenerator:
         
         If at any times the calculation fails, reac_ts_done is set to -999.
         If all steps are successful, reac_ts_done is set to -1.
+
+        The products of the homolytic scissions, if given, are optimized in the same loop.
         """
-        deleted = []
-        if len(self.species.reac_inst) > 0:
-            alldone = 1
-        else: 
-            alldone = 0
-        
+        if self.par.par['async_generate']:
+            self.start()
+            try:
+                asyncio.run(self.run_async())
+            finally:
+                self.qc.tracker = None
+            self.write_summary()
+        else:
+            for wait in self.generate_steps():
+                time.sleep(1)
+
+    def generate_steps(self):
+        """
+        Same as generate without the async option, as a generator
+        that yields every time all the reactions wait for their jobs.
+        This allows running the reaction searches of several wells
+        in one process.
+        """
+        self.start()
+        try:
+            yield from self.run_steps()
+        finally:
+            self.qc.tracker = None
+        self.write_summary()
+
+    def start(self):
+        """
+        Initialize the state of the reaction searches and the job tracker.
+        """
+        self.deleted = []
         # status to see of kinbot needs to wait for the product optimizations
         # from another kinbot run, to avoid duplication of calculations
-        products_waiting_status = [[] for i in self.species.reac_inst]
-        count=0
-        for i in self.species.reac_inst:
-             count=count+1
-        all_unique_prod=[]
-        frag_unique=[]
-        nameUnique=[]
-        stpt_inchis = []
-        
-        while alldone:
-            for index, instance in enumerate(self.species.reac_inst):
-                obj = self.species.reac_obj[index]
-                instance_name = obj.instance_name
-                # START REACTION SEARCH
-                if self.species.reac_ts_done[index] == 0 and self.species.reac_step[index] == 0:
-                    #verify after restart if search has failed in previous kinbot run
-                    status = self.qc.check_qc(instance_name)
-                    if status == 'error' or status == 'killed':
-                        logging.info('\tRxn search failed (error or killed) for {}'.format(instance_name))
-                        self.species.reac_ts_done[index] = -999
-                
-                if self.species.reac_ts_done[index] == 0: # ts search is ongoing
-                    if obj.scan == 0: #don't do a scan of a bond
-                        if self.species.reac_step[index] == obj.max_step + 1:
-                            status = self.qc.get_qc_freq(instance_name, self.species.natom)[0]
-                            if status == 0:
-                                self.species.reac_ts_done[index] = 1
-                            elif status == -1:
-                                logging.info('\tRxn search failed for {}'.format(instance_name))
-                                self.species.reac_ts_done[index] = -999
-                        else:
-                            self.species.reac_step[index] = reac_family.carry_out_reaction(obj, self.species.reac_step[index], self.par.par['qc_command'])
-                    
-                    else: # do a bond scan
-                        if self.species.reac_step[index] == self.par.par['scan_step'] + 1:
-                            status = self.qc.get_qc_freq(instance_name, self.species.natom)[0]
-                            if status == 0:
-                                self.species.reac_ts_done[index] = 1
-                            elif status == -1:
-                                logging.info('\tRxn search failed for {}'.format(instance_name))
-                                self.species.reac_ts_done[index] = -999
-                        else:
-                            if self.species.reac_step[index] == 0:
-                                self.species.reac_step[index] = reac_family.carry_out_reaction(obj, self.species.reac_step[index], self.par.par['qc_command'])
-                            elif self.species.reac_step[index] > 0:
-                                status = self.qc.check_qc(instance_name)
-                                if status == 'error' or status == 'killed':
-                                    logging.info('\tRxn search failed for {}'.format(instance_name))
-                                    self.species.reac_ts_done[index] = -999
-                                else:
-                                    err, energy = self.qc.get_qc_energy(instance_name)
-                                    if err == 0:
-                                        self.species.reac_scan_energy[index].append(energy)
-                                        if len(self.species.reac_scan_energy[index]) > 1:
-                                            if self.species.reac_scan_energy[index][-1] < self.species.reac_scan_energy[index][-2]:
-                                                self.species.reac_step[index] = self.par.par['scan_step']
-                                        #ts search restarted w/ next line? 
-                                        self.species.reac_step[index] = reac_family.carry_out_reaction(obj, self.species.reac_step[index], self.par.par['qc_command'])
-
-                elif self.species.reac_ts_done[index] == 1:
-                    status = self.qc.check_qc(instance_name)
-                    if status == 'running': continue
-                    elif status == 'error': 
-                        logging.info('\tRxn search failed (gaussian error) for {}'.format(instance_name))
-                        self.species.reac_ts_done[index] = -999
-                    else: 
-                        #check the barrier height:
-                        if self.species.reac_type[index] == 'R_Addition_MultipleBond':
-                            sp_energy = self.qc.get_qc_energy(str(self.species.chemid) + '_well_mp2')[1]
-                            barrier = (self.qc.get_qc_energy(instance_name)[1] - sp_energy) * constants.AUtoKCAL
-                        else:
-                            sp_energy = self.qc.get_qc_energy(str(self.species.chemid) + '_well')[1]
-                            barrier = (self.qc.get_qc_energy(instance_name)[1] - sp_energy) * constants.AUtoKCAL
-                        if barrier > self.par.par['barrier_threshold']:
-                            logging.info('\tRxn barrier too high ({0:.2f} kcal/mol) for {1}'.format(barrier, instance_name))
-                            self.species.reac_ts_done[index] = -999
-                        else:
-                            obj.irc = IRC(obj, self.par) #TODO: this doesn't seem like a good design
-                            irc_status = obj.irc.check_irc()
-                            if 0 in irc_status:
-                                # No IRC started yet, start the IRC now
-                                logging.info('\tStarting IRC calculations for {}'.format(instance_name))
-                                obj.irc.do_irc_calculations()
-                            elif irc_status[0] == 'running' or irc_status[1] == 'running':
-                                continue
-                            else: 
-                                #IRC's have successfully finished, have an error or were killed, in any case
-                                #read the geometries and try to make products out of them
-                                #verify which of the ircs leads back to the reactant, if any
-                                prod = obj.irc.irc2stationary_pt()
-                                if prod == 0:
-                                    logging.info('\t\tNo product found for {}'.format(instance_name))
-                                    self.species.reac_ts_done[index] = -999
-                                else:
-                                    obj.products = prod
-                                    obj.product_bonds = prod.bond
-                                    self.species.reac_ts_done[index] = 2
-
-                elif self.species.reac_ts_done[index] == 2:
-                    if len(products_waiting_status[index]) == 0:
-                        #identify bimolecular products and wells
-                        fragments, maps = obj.products.start_multi_molecular()
-                        obj.products = []
-
-                        a=[]
-                        for frag in fragments:
-                            a.append(frag)
-                            if len(frag_unique) == 0:
-                                frag_unique.append(frag)
-                            elif len(frag_unique) > 0:
-                                new=1
-                                for fragb in frag_unique:
-                                    if frag.chemid == fragb.chemid:
-                                        e, geom2 = self.qc.get_qc_geom(str(fragb.chemid) + '_well', fragb.natom)
-                                        if e == 0:
-                                            a.pop()
-                                            frag=fragb
-                                            a.append(frag)
-                                            new=0
-                                            break
-                                if new:
-                                    frag_unique.append(frag)
-                        obj.products_final=[]
-                        for frag in a:
-                            self.qc.qc_opt(frag, frag.geom)
-                            e, geom2 = self.qc.get_qc_geom(str(frag.chemid) + '_well', frag.natom)
-                            obj.products_final.append(frag)
- 
-                        #check products make sure they are the same
-                        for i, st_pt_i in enumerate(obj.products_final):
-                            for j, st_pt_j in enumerate(obj.products_final):
-                                if st_pt_i.chemid == st_pt_j.chemid and i < j:
-                                    obj.products_final[j] = obj.products_final[i]
-
-
-                    #print products generated by IRC
-                    products=[]
-                    for i, st_pt in enumerate(obj.products_final):
-                        products.append(st_pt.chemid)
-                        
-                    products.extend([' ', ' ', ' ']) 
-                    barrier = (self.qc.get_qc_energy(instance_name)[1] - sp_energy) * constants.AUtoKCAL
-                    logging.info('\tReaction {0} has a barrier of {1:.2f} kcal/mol and leads to products {2} {3} {4}'.format(instance_name, barrier, products[0], products[1], products[2]))
-                     
-                    for i, st_pt in enumerate(obj.products_final):
-                        chemid = st_pt.chemid
-                        e, st_pt.geom = self.qc.get_qc_geom(str(st_pt.chemid) + '_well', st_pt.natom)
-                        if e < 0:
-                            logging.info('\tProduct optimization failed for {}, product {}'.format(instance_name, st_pt.chemid))
-                            self.species.reac_ts_done[index] = -999
-                            err = -1
-                        elif e != 0:
-                            err = -1
-                        else:
-                            e2, st_pt.energy = self.qc.get_qc_energy(str(st_pt.chemid) + '_well')
-                            e2, st_pt.zpe = self.qc.get_qc_zpe(str(st_pt.chemid) + '_well')
-                            st_pt.characterize(dimer=0)  # not allowed to use the dimer option here
-                            if chemid != st_pt.chemid:
-                                obj.products_final.pop(i)
-                                newfrags, newmaps = st_pt.start_multi_molecular()  # newfrags is list of stpt obj 
-                                products_waiting_status[index] = [0 for frag in newfrags]
-                                fragChemid=[]
-                                for i, newfr in enumerate(newfrags):
-                                    for prod in frag_unique:
-                                        if newfr.chemid == prod.chemid:
-                                            newfrags.pop(i)
-                                            newfr = prod
-                                            j = i - 1
-                                            newfrags.insert(j, newfr)
-                                    #add new frag to frag_unique somehow?
-                                    j = i - 1
-                                    obj.products_final.insert(j, newfr)
-                                    self.qc.qc_opt(newfr, newfr.geom, 0) 
-                                    fragChemid.append(newfr.chemid)
-                                if len(fragChemid) == 1:
-                                    fragChemid.append(" ")
-                                for i, frag in enumerate(newfrags):
-                                    products_waiting_status[index][i] = 1
-                                logging.info('\ta) Product optimized to other structure for {}, product {} to {} {}'.format(instance_name, chemid, fragChemid[0], fragChemid[1]))                
-                    
-                    obj.products=[]
-                    for prod in obj.products_final:
-                        obj.products.append(prod)
-                    obj.products_final=[] 
-
-                 
-                    if all([pi == 1 for pi in products_waiting_status[index]]):
-                        self.species.reac_ts_done[index] = 3
- 
-                elif self.species.reac_ts_done[index] == 3:
-                    # wait for the optimization to finish 
-                    # if two st_pt are the same in the products, we make them exactly identical otherwise
-                    # the different ordering of the atoms causes the chemid of the second to be seemingly wrong
-                    for i, st_pt_i in enumerate(obj.products):
-                        for j, st_pt_j in enumerate(obj.products):
-                            if st_pt_i.chemid == st_pt_j.chemid and i < j:
-                                obj.products[j] = obj.products[i]
-                    '''
-                    # generate and compare inchis
-                    if len(stpt_inchis) == 0:
-                        well0_inchi = cheminfo.create_inchi_from_geom(self.species.atom,self.species.geom)                        
-                        well0_chemicalFormula = well0_inchi.split('S/')[1].split('/')[0]
-                        well0_stereochem = ''
-                        if "/t" in str(well0_inchi):
-                            well0_stereochem = well0_inchi.split('/t')[1].split('/')[0]
-                        well0_info = [self.species.chemid, well0_chemicalFormula, well0_inchi, well0_stereochem]
-                        stpt_inchis.append(well0_info)
-
-                    for st_pt in obj.products:
-                        prod_chemid = st_pt.chemid
-                        prod_inchi = cheminfo.create_inchi_from_geom(st_pt.atom,st_pt.geom)                        
-                        prod_chemicalFormula = prod_inchi.split('S/')[1].split('/')[0]
-                        prod_stereochem = ''
-                        if "/t" in str(prod_inchi):
-                            prod_stereochem = prod_inchi.split('/t')[1].split('/')[0]
-                        prod_info = [prod_chemid, prod_chemicalFormula, prod_inchi, prod_stereochem]
-                        stpt_inchis.append(prod_info)
-
-                    inchiFile = open('inchis.log','w')
-                    well0_chemid = stpt_inchis[0][0]
-                    well0_chemicalFormula = stpt_inchis[0][1]
-                    well0_stereochem = stpt_inchis[0][3]
-                    for inchi in stpt_inchis:
-                        inchiFile.write("{}\t|{}\t|{}\t|{}\n".format(inchi[0],inchi[1],inchi[2],inchi[3]))
-                        prod_chemid = inchi[0]
-                        prod_stereochem = inchi[3]
-                        prod_chemicalFormula = inchi[1]
-                        if well0_chemicalFormula == prod_chemicalFormula:
-                            if str(well0_stereochem) != str(prod_stereochem):
-                                logging.warning("\t\t!WARNING! Stereochemistry for product {} differs from the initial well ({}) for reaction {}".format(prod_chemid, well0_chemid, instance_name))
-                    inchiFile.close()
-                    '''
-                    err = 0
-                    for st_pt in obj.products:
-                        chemid = st_pt.chemid
-                        e, st_pt.geom = self.qc.get_qc_geom(str(st_pt.chemid) + '_well', st_pt.natom)
-                        if e < 0:
-                            logging.info('\tProduct optimization failed for {}, product {}'.format(instance_name,st_pt.chemid))
-                            self.species.reac_ts_done[index] = -999
-                            err = -1
-                        elif e != 0:
-                            err = -1
-                        else:
-                            e2, st_pt.energy = self.qc.get_qc_energy(str(st_pt.chemid) + '_well')
-                            e2, st_pt.zpe = self.qc.get_qc_zpe(str(st_pt.chemid) + '_well')
-                            st_pt.characterize(dimer=0)  # not allowed to use the dimer option here
-                            if chemid != st_pt.chemid:
-                                # product was optimized to another structure, give warning but don't remove reaction
-                                logging.info('\tb) Product optimized to other structure for {}, product {} to {}'.format(instance_name, chemid, st_pt.chemid))
-                                e, st_pt.geom = self.qc.get_qc_geom(str(st_pt.chemid) + '_well', st_pt.natom)
-                                if e < 0:
-                                    err = -1
-                    if err == 0:
-                        self.species.reac_ts_done[index] = 4
-                elif self.species.reac_ts_done[index] == 4:
-                    # Do the TS and product optimization
-                    # make a stationary point object of the ts
-                    bond_mx = np.zeros((self.species.natom, self.species.natom))
-                    for i in range(self.species.natom):
-                        for j in range(self.species.natom):
-                            bond_mx[i][j] = max(self.species.bond[i][j], obj.product_bonds[i][j])
+        self.products_waiting_status = [[] for i in self.species.reac_inst]
+        if self.par.par['checkpoint']:
+            self.read_checkpoint()
 
- 
-                    err, geom = self.qc.get_qc_geom(instance_name, self.species.natom)
-                    ts = StationaryPoint(   instance_name, self.species.charge, self.species.mult,
-                                            atom=self.species.atom, geom=geom, wellorts=1)
-                    err, ts.energy = self.qc.get_qc_energy(instance_name)
-                    err, ts.zpe = self.qc.get_qc_zpe(instance_name)  #  NEW STOPS HERE 
-                    ts.bond = bond_mx
-                    ts.find_cycle()
-                    ts.find_conf_dihedral()
-                    obj.ts = ts 
-                    #do the ts optimization
-                    obj.ts_opt = Optimize(obj.ts, self.par, self.qc) 
-                    obj.ts_opt.do_optimization()
-          
-                    #do the products optimizations
-                    for st_pt in obj.products:
-                        #do the products optimizations
-                        #check for products of other reactions that are the same as this product
-                        #in the case such products are found, use the same Optimize object for both
-                        for i, inst_i in enumerate(self.species.reac_inst):
-                            new = 1
-                            if not i == index:
-                                obj_i = self.species.reac_obj[i]
-                                if self.species.reac_ts_done[i] > 3:
-                                    for j, st_pt_i in enumerate(obj_i.products):
-                                        if st_pt_i.chemid == st_pt.chemid:
-                                            if len(obj_i.prod_opt) > j:
-                                                prod_opt = obj_i.prod_opt[j]
-                                                new = 0
-                                                break
-                        if new:
-                            prod_opt = Optimize(st_pt, self.par, self.qc)
-                            prod_opt.do_optimization()
-                        obj.prod_opt.append(prod_opt)
-
-                    for st_pt in obj.products:                        
-                    #section where comparing products in same reaction occurs
-                        if len(obj.prod_opt) > 0:
-                            for j, st_pt_opt in enumerate(obj.prod_opt):
-                                if st_pt.chemid == st_pt_opt.species.chemid:
-                                    if len(obj.prod_opt) > j:
-                                        prod_opt = obj.prod_opt[j]
-                                        break
-
-                    elog = open("energy.log", 'a')
-                    for prod_opt in obj.prod_opt:
-                        elog.write("prod_opt: {} |\tenergy: {}\n".format(prod_opt.species.chemid, prod_opt.species.energy))
-                    elog.close()
- 
+        self.tracker = JobTracker(self.qc)
+        self.qc.tracker = self.tracker
 
-                    self.species.reac_ts_done[index] = 5
-                elif self.species.reac_ts_done[index] == 5:
-                    #check up on the TS and product optimizations 
-                    opts_done = 1
-                    fails = 0
-                    #check if ts is done
-                    if not obj.ts_opt.shir == 1:
-                        opts_done = 0
-                        obj.ts_opt.do_optimization()
-                    if obj.ts_opt.shigh == -999:
-                        logging.info("Reaction {} ts_opt_shigh failure".format(instance_name))
-                        fails = 1
-                    for pr_opt in obj.prod_opt:
-                        if not pr_opt.shir == 1:
-                            opts_done = 0
-                            pr_opt.do_optimization()
-                        if pr_opt.shigh == -999:
-                            logging.info("Reaction {} pr_opt_shigh failure".format(instance_name))
-                            fails = 1
-                    if fails:
-                        self.species.reac_ts_done[index] = -999
-                    elif opts_done:
-                        self.species.reac_ts_done[index] = 6
-                elif self.species.reac_ts_done[index] == 6:
-                    #Finilize the calculations
-                    
-                    #continue to PES search in case a new well was found
-                    if self.par.par['pes']:
-                        #verify if product is monomolecular, and if it is new
-                        if len(obj.products)==1:
-                            st_pt = obj.prod_opt[0].species
-                            chemid = st_pt.chemid
-                            energy = st_pt.energy
-                            well_energy = self.species.energy
-                            new_barrier_threshold = self.par.par['barrier_threshold'] - (energy-well_energy)*constants.AUtoKCAL
-                            dir = os.path.dirname(os.getcwd()) 
-                            jobs = open(dir+'/chemids','r').read().split('\n')
-                            jobs = [ji for ji in jobs]
-                            if not str(chemid) in jobs:
-                                #this well is new, add it to the jobs
-                                while 1:
-                                    try:
-                                        #try to open the file and write to it
-                                        pes.write_input(self.par,obj.products[0],new_barrier_threshold,dir)
-                                        f = open(dir+'/chemids','a')
-                                        f.write('{}\n'.format(chemid))
-                                        f.close()
-                                        break
-                                    except IOError:
-                                        #wait a second and try again
-                                        time.sleep(1)
-                                        pass
-           
-                        # copy the files of the species to an upper directory
-                        frags = obj.products
-                        for frag in frags:
-                            filecopying.copy_to_database_folder(self.species.chemid, frag.chemid, self.qc)
-
-                    #check for wrong number of negative frequencies
-                    neg_freq = 0
-                    for st_pt in obj.products:
-                        if any([fi < 0. for fi in st_pt.reduced_freqs]):
-                            neg_freq = 1
-                    if any([fi < 0. for fi in obj.ts.reduced_freqs[1:]]): 
-                        neg_freq = 1
-                    
-                    if neg_freq:
-                        logging.info('\tFound negative frequency for ' + instance_name)
-                        self.species.reac_ts_done[index] = -999
-                    else:
-                        #the reaction search is finished
-                        self.species.reac_ts_done[index] = -1 # this is the success code
-                        
-                        # write a temporary pes input file
-                        # remove old xval and im_extent files
-                        if os.path.exists('{}_xval.txt'.format(self.species.chemid)):
-                            os.remove('{}_xval.txt'.format(self.species.chemid))
-                        if os.path.exists('{}_im_extent.txt'.format(self.species.chemid)):
-                            os.remove('{}_im_extent.txt'.format(self.species.chemid))
-                        postprocess.createPESViewerInput(self.species, self.qc, self.par)
-                elif self.species.reac_ts_done[index] == -999:
-                    if self.par.par['delete_intermediate_files'] == 1:
-                        if not self.species.reac_obj[index].instance_name in deleted:
-                            self.delete_files(self.species.reac_obj[index].instance_name)
-                            deleted.append(self.species.reac_obj[index].instance_name)
-                        
-            alldone = 1
-            for index, instance in enumerate(self.species.reac_inst):
-                if any(self.species.reac_ts_done[i] >= 0 for i in range(len(self.species.reac_inst))):
-                    alldone = 1
-                    break 
-                else: 
-                    alldone = 0
-            
-            # write a small summary while running
-            wr = 1
-            if wr:
-                f_out = open('kinbot_monitor.out','w')
-                for index, instance in enumerate(self.species.reac_inst):
-                    f_out.write('{}\t{}\t{}\n'.format(self.species.reac_ts_done[index],self.species.reac_step[index],self.species.reac_obj[index].instance_name))
-                f_out.close()
-            time.sleep(1)
-        
+    def write_summary(self):
+        """
+        Write the summary of the combinatorial reactions.
+        """
         s = []
         for index, instance in enumerate(self.species.reac_inst):
             obj = self.species.reac_obj[index]
@@ -515,6 +152,656 @@ class ReactionGenerator:
         logging.info("Reaction generation done!")
 
 
+
+    def advance(self, index):
+        """
+        Carry out the next step of the search of reaction index,
+        and return without waiting for the jobs.
+        """
+        obj = self.species.reac_obj[index]
+        instance_name = obj.instance_name
+        # START REACTION SEARCH
+        if self.species.reac_ts_done[index] == 0 and self.species.reac_step[index] == 0:
+            #verify after restart if search has failed in previous kinbot run
+            status = self.qc.check_qc(instance_name)
+            if status == 'error' or status == 'killed':
+                logging.info('\tRxn search failed (error or killed) for {}'.format(instance_name))
+                self.species.reac_ts_done[index] = -999
+
+        if self.species.reac_ts_done[index] == 0: # ts search is ongoing
+            if obj.scan == 0: #don't do a scan of a bond
+                if self.species.reac_step[index] == obj.max_step + 1:
+                    status = self.qc.get_qc_freq(instance_name, self.species.natom)[0]
+                    if status == 0:
+                        self.species.reac_ts_done[index] = 1
+                    elif status == -1:
+                        logging.info('\tRxn search failed for {}'.format(instance_name))
+                        self.species.reac_ts_done[index] = -999
+                else:
+                    self.species.reac_step[index] = reac_family.carry_out_reaction(obj, self.species.reac_step[index], self.par.par['qc_command'])
+
+            else: # do a bond scan
+                if self.species.reac_step[index] == self.par.par['scan_step'] + 1:
+                    status = self.qc.get_qc_freq(instance_name, self.species.natom)[0]
+                    if status == 0:
+                        self.species.reac_ts_done[index] = 1
+                    elif status == -1:
+                        logging.info('\tRxn search failed for {}'.format(instance_name))
+                        self.species.reac_ts_done[index] = -999
+                else:
+                    if self.species.reac_step[index] == 0:
+                        self.species.reac_step[index] = reac_family.carry_out_reaction(obj, self.species.reac_step[index], self.par.par['qc_command'])
+                    elif self.species.reac_step[index] > 0:
+                        status = self.qc.check_qc(instance_name)
+                        if status == 'error' or status == 'killed':
+                            logging.info('\tRxn search failed for {}'.format(instance_name))
+                            self.species.reac_ts_done[index] = -999
+                        else:
+                            err, energy = self.qc.get_qc_energy(instance_name)
+                            if err == 0:
+                                self.species.reac_scan_energy[index].append(energy)
+                                if len(self.species.reac_scan_energy[index]) > 1:
+                                    if self.species.reac_scan_energy[index][-1] < self.species.reac_scan_energy[index][-2]:
+                                        self.species.reac_step[index] = self.par.par['scan_step']
+                                #ts search restarted w/ next line? 
+                                self.species.reac_step[index] = reac_family.carry_out_reaction(obj, self.species.reac_step[index], self.par.par['qc_command'])
+
+        elif self.species.reac_ts_done[index] == 1:
+            status = self.qc.check_qc(instance_name)
+            if status == 'running' or status == 'finalizing': return 0
+            elif status == 'error': 
+                logging.info('\tRxn search failed (gaussian error) for {}'.format(instance_name))
+                self.species.reac_ts_done[index] = -999
+            else: 
+                #check the barrier height:
+                barrier = self.get_barrier(index)
+                if barrier > self.par.par['barrier_threshold']:
+                    logging.info('\tRxn barrier too high ({0:.2f} kcal/mol) for {1}'.format(barrier, instance_name))
+                    self.species.reac_ts_done[index] = -999
+                else:
+                    obj.irc = IRC(obj, self.par) #TODO: this doesn't seem like a good design
+                    irc_status = obj.irc.check_irc()
+                    if 0 in irc_status:
+                        # No IRC started yet, start the IRC now
+                        logging.info('\tStarting IRC calculations for {}'.format(instance_name))
+                        obj.irc.do_irc_calculations()
+                    elif any([st == 'running' or st == 'finalizing' for st in irc_status]):
+                        return 0
+                    else: 
+                        #IRC's have successfully finished, have an error or were killed, in any case
+                        #read the geometries and try to make products out of them
+                        #verify which of the ircs leads back to the reactant, if any
+                        prod = obj.irc.irc2stationary_pt()
+                        if prod == 0:
+                            logging.info('\t\tNo product found for {}'.format(instance_name))
+                            self.species.reac_ts_done[index] = -999
+                        else:
+                            obj.products = prod
+                            obj.product_bonds = prod.bond
+                            self.species.reac_ts_done[index] = 2
+
+        elif self.species.reac_ts_done[index] == 2:
+            if len(self.products_waiting_status[index]) == 0:
+                #identify bimolecular products and wells
+                fragments, maps = obj.products.start_multi_molecular()
+                obj.products = []
+
+                # products already found by other reactions are shared
+                a = [self.registry.add(frag) for frag in fragments]
+                obj.products_final=[]
+                for frag in a:
+                    self.qc.qc_opt(frag, frag.geom)
+                    e, geom2 = self.qc.get_qc_geom(str(frag.chemid) + '_well', frag.natom)
+                    obj.products_final.append(frag)
+
+                #check products make sure they are the same
+                for i, st_pt_i in enumerate(obj.products_final):
+                    for j, st_pt_j in enumerate(obj.products_final):
+                        if st_pt_i.chemid == st_pt_j.chemid and i < j:
+                            obj.products_final[j] = obj.products_final[i]
+
+
+            #print products generated by IRC
+            products=[]
+            for i, st_pt in enumerate(obj.products_final):
+                products.append(st_pt.chemid)
+
+            products.extend([' ', ' ', ' ']) 
+            barrier = self.get_barrier(index)
+            logging.info('\tReaction {0} has a barrier of {1:.2f} kcal/mol and leads to products {2} {3} {4}'.format(instance_name, barrier, products[0], products[1], products[2]))
+
+            for i, st_pt in enumerate(obj.products_final):
+                chemid = st_pt.chemid
+                result = self.qc.get_qc_result(str(st_pt.chemid) + '_well')
+                if result.status == 'running' or result.status == 'finalizing':
+                    err = -1
+                elif result.status != 'normal':
+                    logging.info('\tProduct optimization failed for {}, product {}'.format(instance_name, st_pt.chemid))
+                    self.species.reac_ts_done[index] = -999
+                    err = -1
+                else:
+                    st_pt.geom = result.geom
+                    st_pt.energy = result.energy
+                    st_pt.zpe = result.zpe
+                    st_pt.characterize(dimer=0)  # not allowed to use the dimer option here
+                    if chemid != st_pt.chemid:
+                        obj.products_final.pop(i)
+                        newfrags, newmaps = st_pt.start_multi_molecular()  # newfrags is list of stpt obj 
+                        self.products_waiting_status[index] = [0 for frag in newfrags]
+                        fragChemid=[]
+                        for i, newfr in enumerate(newfrags):
+                            newfr = self.registry.add(newfr)
+                            j = i - 1
+                            obj.products_final.insert(j, newfr)
+                            self.qc.qc_opt(newfr, newfr.geom, 0) 
+                            fragChemid.append(newfr.chemid)
+                        if len(fragChemid) == 1:
+                            fragChemid.append(" ")
+                        for i, frag in enumerate(newfrags):
+                            self.products_waiting_status[index][i] = 1
+                        logging.info('\ta) Product optimized to other structure for {}, product {} to {} {}'.format(instance_name, chemid, fragChemid[0], fragChemid[1]))                
+
+            obj.products=[]
+            for prod in obj.products_final:
+                obj.products.append(prod)
+            obj.products_final=[] 
+
+
+            if all([pi == 1 for pi in self.products_waiting_status[index]]):
+                self.species.reac_ts_done[index] = 3
+
+        elif self.species.reac_ts_done[index] == 3:
+            # wait for the optimization to finish 
+            # if two st_pt are the same in the products, we make them exactly identical otherwise
+            # the different ordering of the atoms causes the chemid of the second to be seemingly wrong
+            for i, st_pt_i in enumerate(obj.products):
+                for j, st_pt_j in enumerate(obj.products):
+                    if st_pt_i.chemid == st_pt_j.chemid and i < j:
+                        obj.products[j] = obj.products[i]
+            '''
+            # generate and compare inchis
+            if len(stpt_inchis) == 0:
+                well0_inchi = cheminfo.create_inchi_from_geom(self.species.atom,self.species.geom,str(self.species.chemid))                        
+                well0_chemicalFormula = well0_inchi.split('S/')[1].split('/')[0]
+                well0_stereochem = ''
+                if "/t" in str(well0_inchi):
+                    well0_stereochem = well0_inchi.split('/t')[1].split('/')[0]
+                well0_info = [self.species.chemid, well0_chemicalFormula, well0_inchi, well0_stereochem]
+                stpt_inchis.append(well0_info)
+
+            for st_pt in obj.products:
+                prod_chemid = st_pt.chemid
+                prod_inchi = cheminfo.create_inchi_from_geom(st_pt.atom,st_pt.geom,str(st_pt.chemid))                        
+                prod_chemicalFormula = prod_inchi.split('S/')[1].split('/')[0]
+                prod_stereochem = ''
+                if "/t" in str(prod_inchi):
+                    prod_stereochem = prod_inchi.split('/t')[1].split('/')[0]
+                prod_info = [prod_chemid, prod_chemicalFormula, prod_inchi, prod_stereochem]
+                stpt_inchis.append(prod_info)
+
+            inchiFile = open('inchis.log','w')
+            well0_chemid = stpt_inchis[0][0]
+            well0_chemicalFormula = stpt_inchis[0][1]
+            well0_stereochem = stpt_inchis[0][3]
+            for inchi in stpt_inchis:
+                inchiFile.write("{}\t|{}\t|{}\t|{}\n".format(inchi[0],inchi[1],inchi[2],inchi[3]))
+                prod_chemid = inchi[0]
+                prod_stereochem = inchi[3]
+                prod_chemicalFormula = inchi[1]
+                if well0_chemicalFormula == prod_chemicalFormula:
+                    if str(well0_stereochem) != str(prod_stereochem):
+                        logging.warning("\t\t!WARNING! Stereochemistry for product {} differs from the initial well ({}) for reaction {}".format(prod_chemid, well0_chemid, instance_name))
+            inchiFile.close()
+            '''
+            err = 0
+            for st_pt in obj.products:
+                chemid = st_pt.chemid
+                result = self.qc.get_qc_result(str(st_pt.chemid) + '_well')
+                if result.status == 'running' or result.status == 'finalizing':
+                    err = -1
+                elif result.status != 'normal':
+                    logging.info('\tProduct optimization failed for {}, product {}'.format(instance_name,st_pt.chemid))
+                    self.species.reac_ts_done[index] = -999
+                    err = -1
+                else:
+                    st_pt.geom = result.geom
+                    st_pt.energy = result.energy
+                    st_pt.zpe = result.zpe
+                    st_pt.characterize(dimer=0)  # not allowed to use the dimer option here
+                    if chemid != st_pt.chemid:
+                        # product was optimized to another structure, give warning but don't remove reaction
+                        logging.info('\tb) Product optimized to other structure for {}, product {} to {}'.format(instance_name, chemid, st_pt.chemid))
+                        e, st_pt.geom = self.qc.get_qc_geom(str(st_pt.chemid) + '_well', st_pt.natom)
+                        if e < 0:
+                            err = -1
+            if err == 0:
+                self.species.reac_ts_done[index] = 4
+        elif self.species.reac_ts_done[index] == 4:
+            # Do the TS and product optimization
+            obj.ts = self.make_ts(index)
+            #do the ts optimization
+            obj.ts_opt = Optimize(obj.ts, self.par, self.qc) 
+            obj.ts_opt.do_optimization()
+
+            #do the products optimizations
+            for st_pt in obj.products:
+                #do the products optimizations
+                #products that are the same as products of other reactions
+                #or homolytic scissions share the same Optimize object
+                obj.prod_opt.append(self.registry.optimize(st_pt))
+
+            for st_pt in obj.products:                        
+            #section where comparing products in same reaction occurs
+                if len(obj.prod_opt) > 0:
+                    for j, st_pt_opt in enumerate(obj.prod_opt):
+                        if st_pt.chemid == st_pt_opt.species.chemid:
+                            if len(obj.prod_opt) > j:
+                                prod_opt = obj.prod_opt[j]
+                                break
+
+            elog = open("energy.log", 'a')
+            for prod_opt in obj.prod_opt:
+                elog.write("prod_opt: {} |\tenergy: {}\n".format(prod_opt.species.chemid, prod_opt.species.energy))
+            elog.close()
+
+
+            self.species.reac_ts_done[index] = 5
+        elif self.species.reac_ts_done[index] == 5:
+            #check up on the TS and product optimizations 
+            opts_done = 1
+            fails = 0
+            #check if ts is done
+            if not obj.ts_opt.shir == 1:
+                opts_done = 0
+                obj.ts_opt.do_optimization()
+            if obj.ts_opt.shigh == -999:
+                logging.info("Reaction {} ts_opt_shigh failure".format(instance_name))
+                fails = 1
+            for pr_opt in obj.prod_opt:
+                if not pr_opt.shir == 1:
+                    opts_done = 0
+                    pr_opt.do_optimization()
+                if pr_opt.shigh == -999:
+                    logging.info("Reaction {} pr_opt_shigh failure".format(instance_name))
+                    fails = 1
+            if fails:
+                self.species.reac_ts_done[index] = -999
+            elif opts_done:
+                self.species.reac_ts_done[index] = 6
+        elif self.species.reac_ts_done[index] == 6:
+            #Finilize the calculations
+
+            #continue to PES search in case a new well was found
+            if self.par.par['pes']:
+                #verify if product is monomolecular, and if it is new
+                if len(obj.products)==1:
+                    st_pt = obj.prod_opt[0].species
+                    chemid = st_pt.chemid
+                    energy = st_pt.energy
+                    well_energy = self.species.energy
+                    new_barrier_threshold = self.par.par['barrier_threshold'] - (energy-well_energy)*constants.AUtoKCAL
+                    dir = os.path.dirname(os.getcwd()) 
+                    jobs = open(dir+'/chemids','r').read().split('\n')
+                    jobs = [ji for ji in jobs]
+                    if not str(chemid) in jobs:
+                        #this well is new, add it to the jobs
+                        while 1:
+                            try:
+                                #try to open the file and write to it
+                                pes.write_input(self.par,obj.products[0],new_barrier_threshold,dir)
+                                f = open(dir+'/chemids','a')
+                                f.write('{}\n'.format(chemid))
+                                f.close()
+                                break
+                            except IOError:
+                                #wait a second and try again
+                                time.sleep(1)
+                                pass
+
+                # copy the files of the species to an upper directory
+                frags = obj.products
+                for frag in frags:
+                    filecopying.copy_to_database_folder(self.species.chemid, frag.chemid, self.qc)
+
+            #check for wrong number of negative frequencies
+            neg_freq = 0
+            for st_pt in obj.products:
+                if any([fi < 0. for fi in st_pt.reduced_freqs]):
+                    neg_freq = 1
+            if any([fi < 0. for fi in obj.ts.reduced_freqs[1:]]): 
+                neg_freq = 1
+
+            if neg_freq:
+                logging.info('\tFound negative frequency for ' + instance_name)
+                self.species.reac_ts_done[index] = -999
+            else:
+                #the reaction search is finished
+                self.species.reac_ts_done[index] = -1 # this is the success code
+
+                # write a temporary pes input file
+                # remove old xval and im_extent files
+                if os.path.exists('{}_xval.txt'.format(self.species.chemid)):
+                    os.remove('{}_xval.txt'.format(self.species.chemid))
+                if os.path.exists('{}_im_extent.txt'.format(self.species.chemid)):
+                    os.remove('{}_im_extent.txt'.format(self.species.chemid))
+                postprocess.createPESViewerInput(self.species, self.qc, self.par)
+        elif self.species.reac_ts_done[index] == -999:
+            if self.par.par['delete_intermediate_files'] == 1:
+                if not self.species.reac_obj[index].instance_name in self.deleted:
+                    self.delete_files(self.species.reac_obj[index].instance_name)
+                    self.deleted.append(self.species.reac_obj[index].instance_name)
+        return 0
+
+    def make_ts(self, index):
+        """
+        Make a stationary point object of the ts of reaction index.
+        """
+        obj = self.species.reac_obj[index]
+        bond_mx = np.zeros((self.species.natom, self.species.natom))
+        for i in range(self.species.natom):
+            for j in range(self.species.natom):
+                bond_mx[i][j] = max(self.species.bond[i][j], obj.product_bonds[i][j])
+
+        result = self.qc.get_qc_result(obj.instance_name)
+        ts = StationaryPoint(obj.instance_name, self.species.charge, self.species.mult,
+                             atom=self.species.atom, geom=result.geom, wellorts=1)
+        ts.energy = result.energy
+        ts.zpe = result.zpe
+        ts.bond = bond_mx
+        ts.find_cycle()
+        ts.find_conf_dihedral()
+        return ts
+
+    def get_barrier(self, index):
+        """
+        Barrier of reaction index in kcal/mol with respect to the well,
+        at the level of the ts search.
+        """
+        instance_name = self.species.reac_obj[index].instance_name
+        if self.species.reac_type[index] == 'R_Addition_MultipleBond':
+            sp_energy = self.qc.get_qc_energy(str(self.species.chemid) + '_well_mp2')[1]
+        else:
+            sp_energy = self.qc.get_qc_energy(str(self.species.chemid) + '_well')[1]
+        return (self.qc.get_qc_energy(instance_name)[1] - sp_energy) * constants.AUtoKCAL
+
+    def state(self, index):
+        """
+        Summary of the state of reaction index, including the state of
+        its optimizations, used to notice the steps that made progress.
+        """
+        obj = self.species.reac_obj[index]
+        opts = []
+        for opt in [obj.ts_opt] + obj.prod_opt:
+            if opt is not None:
+                opts.append((opt.scycconf, opt.sconf, opt.shigh, opt.shir, opt.restart))
+        return (self.species.reac_ts_done[index],
+                self.species.reac_step[index],
+                tuple(self.products_waiting_status[index]),
+                tuple(opts))
+
+    def keys(self):
+        """
+        Keys of the things to follow: the index of each reaction,
+        and ('hs', index) for each homolytic scission.
+        """
+        keys = list(range(len(self.species.reac_inst)))
+        if self.scissions is not None:
+            keys += [('hs', index) for index in range(len(self.scissions.hss))]
+        return keys
+
+    def in_progress(self, key):
+        """
+        True if the reaction or homolytic scission is not done yet.
+        """
+        if isinstance(key, tuple):
+            return self.scissions.hss[key[1]].status >= 0
+        return self.species.reac_ts_done[key] >= 0
+
+    def step(self, key):
+        """
+        Advance a reaction or homolytic scission and record the jobs it waits on.
+        Returns True if the state of the reaction changed.
+        """
+        if isinstance(key, tuple):
+            obj, index = self.scissions, key[1]
+        else:
+            obj, index = self, key
+        before = obj.state(index)
+        self.tracker.start(key)
+        try:
+            obj.advance(index)
+        finally:
+            changed = (obj.state(index) != before)
+            self.tracker.stop(changed=changed)
+        if changed and obj is self and self.par.par['checkpoint']:
+            self.write_checkpoint()
+        return changed
+
+    def write_checkpoint(self):
+        """
+        Write the state of the reactions to the checkpoint file,
+        together with the ids of the submitted jobs and the barrier threshold.
+        The file is written under a temporary name and then moved
+        in place, so that it is never left half written.
+        """
+        reactions = {}
+        for index, instance in enumerate(self.species.reac_inst):
+            obj = self.species.reac_obj[index]
+            st = {'ts_done': self.species.reac_ts_done[index],
+                  'step': self.species.reac_step[index],
+                  'scan_energy': list(self.species.reac_scan_energy[index]),
+                  'chain_start': obj.chain_start,
+                  }
+            if self.species.reac_ts_done[index] >= 3 or self.species.reac_ts_done[index] == -1:
+                # the products and the status of the optimizations
+                st['products'] = [{'name': prod.name,
+                                   'charge': prod.charge,
+                                   'mult': prod.mult,
+                                   'atom': list(prod.atom),
+                                   'geom': np.asarray(prod.geom).tolist(),
+                                   } for prod in obj.products]
+                st['product_bonds'] = np.asarray(obj.product_bonds).tolist()
+                if obj.ts_opt is not None:
+                    st['ts_opt'] = obj.ts_opt.status()
+                    st['prod_opt'] = [opt.status() for opt in obj.prod_opt]
+            reactions[obj.instance_name] = st
+        job_ids = {}
+        if self.qc is not None:
+            job_ids = self.qc.job_ids
+        state = {'reactions': reactions,
+                 'job_ids': job_ids,
+                 'barrier_threshold': self.par.par['barrier_threshold'],
+                 }
+        tmp_file = checkpoint_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, checkpoint_file)
+
+    def read_checkpoint(self):
+        """
+        Restore the state of the reactions from the checkpoint file.
+        Failed reactions stay failed, unless the barrier threshold changed,
+        then they are checked again. The ts searches continue from
+        the step they were at. The reactions whose products are known
+        continue from the same stage, with the optimizations of the
+        ts and the products restored, and the finished reactions
+        stay finished. The rest continue from the irc step.
+        The ids of the jobs still in the queue are restored, so that
+        a step that was submitted before the restart is waited for.
+        """
+        if not os.path.exists(checkpoint_file):
+            return 0
+        try:
+            with open(checkpoint_file) as f:
+                state = json.load(f)
+            reactions = state['reactions']
+        except (ValueError, KeyError, TypeError):
+            logging.warning('Could not read {}, starting from scratch'.format(checkpoint_file))
+            return 0
+        same_threshold = (state.get('barrier_threshold') == self.par.par['barrier_threshold'])
+        if self.qc is not None and self.par.par['queuing'] != 'local':
+            # the processes of the local queue did not survive the restart
+            for job, pid in state.get('job_ids', {}).items():
+                if job not in self.qc.job_ids:
+                    self.qc.job_ids[job] = pid
+                    self.qc.queue_status.add(pid)
+        n = 0
+        for index, instance in enumerate(self.species.reac_inst):
+            obj = self.species.reac_obj[index]
+            if obj.instance_name not in reactions:
+                continue
+            st = reactions[obj.instance_name]
+            if st['ts_done'] == -999:
+                if not same_threshold:
+                    # start again, the finished jobs are taken from the database
+                    continue
+                self.species.reac_ts_done[index] = -999
+            elif st['ts_done'] == 0:
+                self.species.reac_step[index] = st['step']
+                self.species.reac_scan_energy[index] = st['scan_energy']
+                obj.chain_start = st['chain_start']
+            elif 'products' in st and (st['ts_done'] in [3, 4] or 'ts_opt' in st):
+                self.species.reac_step[index] = st['step']
+                self.restore_reaction(index, st)
+                self.species.reac_ts_done[index] = st['ts_done']
+            else:
+                self.species.reac_step[index] = st['step']
+                self.species.reac_ts_done[index] = 1
+            n += 1
+        logging.info('Restored the state of {} reactions from {}'.format(n, checkpoint_file))
+        return n
+
+    def restore_reaction(self, index, st):
+        """
+        Rebuild the products of reaction index from the checkpoint,
+        and the optimizations of the ts and the products if they started.
+        """
+        obj = self.species.reac_obj[index]
+        obj.products = []
+        for prod in st['products']:
+            st_pt = StationaryPoint(prod['name'], prod['charge'], prod['mult'],
+                                    atom=prod['atom'], geom=np.array(prod['geom']))
+            st_pt.characterize(dimer=0)
+            obj.products.append(self.registry.add(st_pt))
+        obj.product_bonds = np.array(st['product_bonds'])
+        self.products_waiting_status[index] = [1 for prod in obj.products]
+        if 'ts_opt' in st:
+            obj.ts = self.make_ts(index)
+            obj.ts_opt = Optimize(obj.ts, self.par, self.qc)
+            obj.ts_opt.restore(st['ts_opt'])
+            obj.prod_opt = []
+            for st_pt, status in zip(obj.products, st['prod_opt']):
+                obj.prod_opt.append(self.registry.restore(st_pt, status))
+        return 0
+
+    def all_done(self):
+        """
+        True if none of the reactions and homolytic scissions is still in progress.
+        """
+        return not any(self.in_progress(key) for key in self.keys())
+
+    def write_monitor(self):
+        """
+        Write a small summary of the state of the reactions.
+        """
+        f_out = open('kinbot_monitor.out','w')
+        for index, instance in enumerate(self.species.reac_inst):
+            f_out.write('{}\t{}\t{}\n'.format(self.species.reac_ts_done[index],self.species.reac_step[index],self.species.reac_obj[index].instance_name))
+        f_out.close()
+
+    def run_steps(self):
+        """
+        Advance the reactions in passes until all of them are done,
+        yielding after each pass.
+        In every pass only the reactions that made progress in the
+        previous pass or whose jobs changed their status are visited.
+        """
+        self.tracker.dirty.update(self.keys())
+        while not self.all_done():
+            dirty = self.tracker.poll()
+            todo = [key for key in self.keys() if key in dirty]
+            for key in todo:
+                if self.in_progress(key):
+                    self.step(key)
+                else:
+                    self.finish(key)
+            if len(todo) > 0:
+                # write a small summary while running
+                self.write_monitor()
+            yield
+        for key in self.keys():
+            if key in self.tracker.dirty:
+                self.finish(key)
+        self.write_monitor()
+
+    def finish(self, key):
+        """
+        Final step of a reaction that is done, and stop following it.
+        """
+        self.tracker.remove(key)
+        if isinstance(key, tuple):
+            return 0
+        self.advance(key)
+        if self.par.par['checkpoint']:
+            self.write_checkpoint()
+        return 0
+
+    async def run_async(self):
+        """
+        Run every reaction as a coroutine, woken up by the watcher
+        when one of the jobs it waits on changes its status.
+        """
+        self.events = {}
+        for key in self.keys():
+            self.events[key] = asyncio.Event()
+        watcher = asyncio.ensure_future(self.watch())
+        try:
+            await asyncio.gather(*[self.run_reaction(key) for key in self.keys()])
+        finally:
+            watcher.cancel()
+        self.write_monitor()
+
+    async def run_reaction(self, key):
+        """
+        Coroutine of the state machine of a reaction or homolytic scission.
+        """
+        while self.in_progress(key):
+            if self.step(key):
+                # the step made progress, continue after the other reactions had their turn
+                await asyncio.sleep(0)
+            else:
+                # wait for the watcher, also if the reaction does not wait on any job
+                await self.events[key].wait()
+                self.events[key].clear()
+        self.finish(key)
+
+    async def watch(self):
+        """
+        Check the jobs the reactions wait on and wake up the reactions
+        whose jobs changed. The jobs are checked as soon as the database
+        or the directories of the jobs change, which is noticed within
+        async_poll_interval seconds, and at least every queue_poll_interval
+        seconds, when the queue is polled.
+        """
+        files = None
+        last_poll = 0.
+        while 1:
+            new_files = self.tracker.files_stat()
+            if new_files == files and time.time() - last_poll < self.par.par['queue_poll_interval']:
+                await asyncio.sleep(self.par.par['async_poll_interval'])
+                continue
+            files = new_files
+            last_poll = time.time()
+            woken = 0
+            for key in self.tracker.poll():
+                if not self.events[key].is_set():
+                    self.events[key].set()
+                    woken = 1
+            if woken:
+                self.write_monitor()
+            await asyncio.sleep(self.par.par['async_poll_interval'])
+
+
     def delete_files(self, name):
         # job names
         names = []
@@ -31,6 +31,19 @@ def read_mech(mech_file,smi_file):
                         rxns.append([reactants,products,kinetics])
                         break
     return rxns
+
+def read_multiplicities(smi_file):
+    """
+    Read the multiplicities given in the optional third column of the smiles file
+    and return a dictionary {smi:multiplicity}
+    """
+    mults = {}
+    smi_lines = open(smi_file,'r').read().split('\n')
+    for line in smi_lines:
+        pieces = line.split()
+        if len(pieces) > 2:
+            mults[pieces[1]] = int(pieces[2])
+    return mults
     
 def get_species(sp,smis):
     """
@@ -0,0 +1,102 @@
+import os
+import time
+import logging
+
+import numpy as np
+
+# resolution of the modification times of the file systems in seconds
+mtime_resolution = 2.
+
+
+class ResultIndex:
+    """
+    In-memory index of the results in an ase database.
+
+    The database is read incrementally: at every refresh only the rows
+    with an id larger than the last one seen are selected. For every
+    name the index keeps the last status, the last energy, frequencies
+    and zpe, and the last two geometries, which is all the getters
+    of QuantumChemistry need.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # key: job name, value: dictionary with the latest results
+        self.entries = {}
+        # id of the last row read
+        self.last_id = 0
+        # (mtime, size) of the database file at the last refresh
+        self.stat = None
+        # time of the last refresh, taken before the file was checked
+        self.stat_time = 0.
+
+    def refresh(self):
+        """
+        Read the rows added since the last refresh.
+        """
+        filename = getattr(self.db, 'filename', None)
+        if filename is not None:
+            now = time.time()
+            try:
+                st = os.stat(filename)
+            except OSError:
+                # the database is not created yet
+                return 0
+            stat = (st.st_mtime, st.st_size)
+            if stat[1] < (self.stat or (0, 0))[1]:
+                logging.warning('Database {} shrunk, reading it again'.format(filename))
+                self.entries = {}
+                self.last_id = 0
+            # the modification time has a coarse resolution on some file
+            # systems, a write in the same tick as the last refresh does not
+            # change it, so it is only trusted if the last refresh was later
+            elif stat == self.stat and self.stat_time - st.st_mtime > mtime_resolution:
+                return 0
+            self.stat = stat
+            self.stat_time = now
+
+        n = 0
+        for row in self.db.select('id>{}'.format(self.last_id), sort='id'):
+            self.add_row(row)
+            n += 1
+        return n
+
+    def add_row(self, row):
+        """
+        Update the entry of the row's name with the content of the row.
+        """
+        self.last_id = max(self.last_id, row.id)
+        name = row.get('name')
+        if name is None:
+            return
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = {'id': 0,
+                     'status': None,
+                     'energy': None,
+                     'frequencies': None,
+                     'zpe': None,
+                     'geom': None,
+                     'prev_geom': None,
+                     }
+            self.entries[name] = entry
+        entry['id'] = row.id
+        entry['prev_geom'] = entry['geom']
+        entry['geom'] = np.array(row.positions)
+        data = row.get('data', {})
+        if data is None:
+            data = {}
+        entry['status'] = data.get('status')
+        if data.get('energy') is not None:
+            entry['energy'] = data.get('energy')
+        if data.get('frequencies') is not None:
+            entry['frequencies'] = list(data.get('frequencies'))
+        entry['zpe'] = data.get('zpe')
+
+    def get(self, job, refresh=1):
+        """
+        Return the entry of the job, or None if the job is not in the database.
+        """
+        if refresh:
+            self.refresh()
+        return self.entries.get(job)
@@ -0,0 +1,171 @@
+"""
+Store of the calculations of the species of a pes search, shared by all wells.
+
+The store is a directory with a single sqlite database and the output
+files of the calculations, kept as blobs named after the sha1 of their
+content, so identical files are only stored once. The database has
+three tables:
+wells: the kinbot run that owns each chemid and if it is done
+files: the path of each file of a chemid and the hash of its blob
+rows: the last ase database row of each job of a chemid
+
+The chemids are stored as text, they do not fit in the integers of sqlite.
+
+Importing a species hardlinks its blobs into the directory of a well
+and writes its rows into the database of the well in one transaction.
+"""
+import os
+import shutil
+import sqlite3
+import hashlib
+import logging
+
+from ase import Atoms
+from ase.io.jsonio import encode, decode
+
+
+# name of the database in the store directory
+db_file = 'species_store.db'
+
+# extensions of the files that are stored
+extensions = ['.com', '.log', '.fchk']
+
+# subdirectories of a well with the files of the species
+subdirs = ['', 'hir/', 'conf/']
+
+
+def species_prefixes(chemid):
+    """
+    Beginning of the names of the jobs and files of a species.
+    """
+    return ['{}_'.format(chemid), 'hir/{}_'.format(chemid), 'conf/{}_'.format(chemid)]
+
+
+def file_hash(fname):
+    """
+    sha1 of the content of a file.
+    """
+    h = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class SpeciesStore:
+    """
+    Species store in a directory, usually the directory of the pes search.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, 'blobs')
+        if not os.path.exists(self.blob_dir):
+            os.makedirs(self.blob_dir)
+        self.conn = sqlite3.connect(os.path.join(directory, db_file), timeout=60)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS wells '
+                              '(chemid TEXT PRIMARY KEY, owner TEXT, done INTEGER)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS files '
+                              '(chemid TEXT, path TEXT, hash TEXT, PRIMARY KEY (chemid, path))')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS rows '
+                              '(chemid TEXT, name TEXT, row TEXT, PRIMARY KEY (chemid, name))')
+
+    def close(self):
+        self.conn.close()
+
+    def claim(self, chemid, owner):
+        """
+        Make owner the kinbot run that calculates the species, unless
+        another run claimed it before. Returns the owner and the done flag.
+        """
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO wells VALUES (?, ?, 0)', (str(chemid), str(owner)))
+        return self.status(chemid)
+
+    def status(self, chemid):
+        """
+        Return the owner and the done flag of the species,
+        or (None, 0) if it was not claimed.
+        """
+        cur = self.conn.execute('SELECT owner, done FROM wells WHERE chemid = ?', (str(chemid),))
+        res = cur.fetchone()
+        if res is None:
+            return None, 0
+        return res[0], res[1]
+
+    def blob(self, h):
+        return os.path.join(self.blob_dir, h[:2], h)
+
+    def add_file(self, fname):
+        """
+        Add the file to the blobs and return its hash.
+        """
+        h = file_hash(fname)
+        blob = self.blob(h)
+        if not os.path.exists(blob):
+            if not os.path.exists(os.path.dirname(blob)):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+            # the name of the temporary file is unique to the process,
+            # other kinbot runs can be adding the same blob
+            tmp = '{}.{}.tmp'.format(blob, os.getpid())
+            shutil.copyfile(fname, tmp)
+            # the blobs can be linked into the wells, they are not to be changed
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, blob)
+        return h
+
+    def store(self, chemid, qc):
+        """
+        Store the files of the species in the current directory
+        and the last database row of each of its jobs,
+        then mark the species done.
+        """
+        prefixes = species_prefixes(chemid)
+        chemid = str(chemid)
+        files = []
+        for subdir in subdirs:
+            if not os.path.isdir(subdir or '.'):
+                continue
+            for fname in os.listdir(subdir or '.'):
+                path = subdir + fname
+                if (os.path.splitext(fname)[1] in extensions and
+                        any(path.startswith(pr) for pr in prefixes)):
+                    files.append((chemid, path, self.add_file(path)))
+        rows = []
+        for name, entry in qc.index.entries.items():
+            if any(name.startswith(pr) for pr in prefixes):
+                row = qc.db.get(id=entry['id'])
+                rows.append((chemid, name, encode({'symbols': row.symbols,
+                                                   'positions': row.positions,
+                                                   'data': row.data})))
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?)', files)
+            self.conn.executemany('INSERT OR REPLACE INTO rows VALUES (?, ?, ?)', rows)
+            self.conn.execute('UPDATE wells SET done = 1 WHERE chemid = ?', (chemid,))
+        logging.info('Stored {} files and {} jobs of {}'.format(len(files), len(rows), chemid))
+
+    def load(self, chemid, qc):
+        """
+        Link the files of the species into the current directory
+        and write its jobs to the database of qc.
+        """
+        chemid = str(chemid)
+        for path, h in self.conn.execute('SELECT path, hash FROM files WHERE chemid = ?', (chemid,)):
+            if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            try:
+                os.link(self.blob(h), path + '.tmp')
+            except OSError:
+                # e.g. the store is on a different file system
+                shutil.copyfile(self.blob(h), path + '.tmp')
+            os.replace(path + '.tmp', path)
+        rows = self.conn.execute('SELECT name, row FROM rows WHERE chemid = ?', (chemid,)).fetchall()
+        with qc.db:
+            for name, row in rows:
+                row = decode(row)
+                mol = Atoms(symbols=row['symbols'], positions=row['positions'])
+                qc.db.write(mol, name=name, data=row['data'])
+        # the directory listings changed
+        qc.listings = {}
+        logging.info('Loaded {} jobs of {} from the species store'.format(len(rows), chemid))
@@ -0,0 +1,107 @@
+"""
+Worker that carries out the constrained steps of a ts search in one job.
+
+The reaction object is rebuilt from the description written by
+reac_family.start_chain, and the steps are run one after the other
+with the same ts search template as the individual jobs use.
+Every step writes its geometry to the database under the name of the
+reaction. The job stops before the final saddle point search, which
+is submitted by KinBot as a regular job.
+The geometries the constraints of the steps were taken from are
+written to <instance_name>_chain_geoms.pkl, so that KinBot can replay
+the constraints of each step with its own geometry.
+"""
+import sys
+import pickle
+import logging
+import importlib
+import subprocess
+
+import numpy as np
+from ase import Atoms
+
+from kinbot import reac_family
+from kinbot.parameters import Parameters
+from kinbot.qc import QuantumChemistry
+from kinbot.stationary_pt import StationaryPoint
+
+
+def rebuild_reaction(spec):
+    """
+    Create the reaction object from the description of the chain.
+    """
+    par = Parameters()
+    par.par.update(spec['par'])
+    qc = QuantumChemistry(par)
+
+    sp = spec['species']
+    species = StationaryPoint(sp['name'], sp['charge'], sp['mult'],
+                              natom=sp['natom'], atom=sp['atom'], geom=np.array(sp['geom']))
+    species.chemid = sp['chemid']
+    species.bond = np.array(sp['bond'])
+    species.cycle_chain = sp['cycle_chain']
+
+    module = importlib.import_module(spec['module'])
+    cls = getattr(module, spec['class'])
+    return cls(species, qc, par, spec['instance'], spec['instance_name'])
+
+
+def write_row(rxn, geom, status):
+    """
+    Write the geometry to the database under the name of the reaction,
+    the same way as the qc templates do.
+    """
+    mol = Atoms(symbols=rxn.species.atom, positions=geom)
+    rxn.qc.db.write(mol, name=rxn.instance_name, data={'status': status})
+    with open(rxn.instance_name + '.log', 'a') as f:
+        f.write('done\n')
+
+
+def run_chain(spec_file):
+    """
+    Carry out the steps of the chain described in spec_file.
+    """
+    with open(spec_file, 'rb') as f:
+        spec = pickle.load(f)
+    rxn = rebuild_reaction(spec)
+    name = rxn.instance_name
+    step_file = '{}_step.py'.format(name)
+
+    # id of the last database entry of the reaction before the chain
+    entry = rxn.qc.index.get(name)
+    last_id = entry['id'] if entry is not None else 0
+
+    step = spec['step']
+    geom = rxn.species.geom
+    # geometry passed to get_constraints in each iteration
+    geoms = []
+    nsteps = 0
+    while 1:
+        geoms.append(np.array(geom))
+        reac_family.write_chain_geoms(name, geoms)
+        step, fix, change, release = rxn.get_constraints(step, geom)
+        if step >= rxn.max_step:
+            break
+        template = reac_family.step_template(rxn, step, geom, fix, change, release, spec['command'])
+        with open(step_file, 'w') as f:
+            f.write(template)
+        subprocess.call([sys.executable, step_file])
+        nsteps += 1
+
+        entry = rxn.qc.index.get(name)
+        if entry is None or entry['id'] == last_id:
+            logging.error('Step {} of {} did not write to the database'.format(step, name))
+            write_row(rxn, geom, 'error')
+            return -1
+        last_id = entry['id']
+        geom = entry['geom']
+        step += 1
+
+    if nsteps == 0:
+        # no step was needed, start the final step from the initial geometry
+        write_row(rxn, geom, 'normal')
+    return 0
+
+
+if __name__ == "__main__":
+    run_chain(sys.argv[1])
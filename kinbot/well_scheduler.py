@@ -0,0 +1,95 @@
+import os
+import logging
+
+from kinbot import kb
+from kinbot.parameters import Parameters
+from kinbot.queue_status import QueueStatus
+
+
+class WellRun:
+    """
+    KinBot run of a well in its own directory, advanced by a WellScheduler.
+
+    Like the Popen object of a kinbot run in a separate process,
+    poll() returns None while the run is going on, and the return
+    code once it is finished.
+    """
+
+    def __init__(self, chemid, scheduler):
+        self.chemid = chemid
+        self.scheduler = scheduler
+        self.directory = os.path.abspath(chemid)
+        self.returncode = None
+        # generator of the run, created at the first step
+        self.run = None
+        # the log of the well goes to its own kinbot.log
+        self.handler = logging.FileHandler(os.path.join(self.directory, 'kinbot.log'))
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        """
+        Stop the run, it is not advanced any more.
+        """
+        if self.returncode is None:
+            self.returncode = -1
+            self.handler.close()
+
+    def advance(self):
+        """
+        Continue the run in the directory of the well
+        until it waits for calculations again.
+        """
+        cwd = os.getcwd()
+        root = logging.getLogger()
+        handlers = root.handlers
+        root.handlers = [self.handler]
+        os.chdir(self.directory)
+        try:
+            if self.run is None:
+                par = Parameters(self.chemid + '.json')
+                self.run = kb.run(par, queue_status=self.scheduler.queue_status)
+            next(self.run)
+        except StopIteration:
+            self.returncode = 0
+        except (Exception, SystemExit):
+            logging.exception('KinBot run of {} failed'.format(self.chemid))
+            self.returncode = 1
+        finally:
+            os.chdir(cwd)
+            root.handlers = handlers
+        if self.returncode is not None:
+            self.handler.close()
+
+
+class WellScheduler:
+    """
+    Runs the kinbot runs of the wells of a pes search in one process.
+
+    The runs are advanced in turns and share a single QueueStatus,
+    so the queue is polled once for all wells, and the job limit of
+    the queue applies to the jobs of all wells together.
+    """
+
+    def __init__(self, par):
+        self.queue_status = QueueStatus(par)
+        # runs that are not finished
+        self.runs = []
+
+    def submit(self, chemid):
+        """
+        Start the kinbot run of a well, it is done in the next steps.
+        """
+        run = WellRun(chemid, self)
+        self.runs.append(run)
+        return run
+
+    def step(self):
+        """
+        Advance each unfinished run until it waits for calculations.
+        """
+        for run in self.runs:
+            if run.returncode is None:
+                run.advance()
+        self.runs = [run for run in self.runs if run.returncode is None]
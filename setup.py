@@ -47,6 +47,7 @@ setup(
         'ase_nwchem_ts_end.tpl.py',
         'ase_nwchem_ts_search.tpl.py',
         'ase_nwchem_ts_search_ase_constraints.tpl.py',
+        'ts_chain.tpl.py',
         'mess_atom.tpl',
         'mess_bimol.tpl',
         'mess_dummy.tpl',
@@ -67,11 +68,14 @@ setup(
         'slurm_molpro.tpl',
         'slurm_mess.tpl',
         'slurm_mesmer.tpl',
-        'slurm_python.tpl']},
+        'slurm_python.tpl',
+        'local.tpl',
+        'local_python.tpl']},
     include_package_data=True,
     entry_points={'console_scripts':[
         'kinbot = kinbot.kb:main',
         'pes = kinbot.pes:main',
+        'mech = kinbot.mech:main',
         ]},
     install_requires=['ase','numpy','networkx'],
     
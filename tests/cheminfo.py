@@ -147,6 +147,43 @@ class TestCheminfo(unittest.TestCase):
         warn = 'Inchi generation from geometry failed.'
         self.assertEqual(inchi, inchi_expected, warn)
 
+    def testInchiCache(self):
+        """
+        Test that the inchi of a structure is only created once,
+        also when it is read from an xyz file
+        """
+        atom = ['C', 'H', 'H', 'H']
+        geom = np.array([[0., 0., 0.], [1.09, 0., 0.], [-0.54, 0.94, 0.], [-0.54, -0.94, 0.]])
+        converted = []
+
+        def convert(xyz):
+            converted.append(xyz)
+            return 'InChI=1S/CH3/h1H3'
+
+        create_inchi_from_xyz = cheminfo.create_inchi_from_xyz
+        cheminfo.create_inchi_from_xyz = convert
+        cheminfo.inchi_cache.clear()
+        try:
+            inchi = cheminfo.create_inchi_from_geom(atom, geom, '150390000000000000002')
+            self.assertEqual(inchi, cheminfo.create_inchi_from_geom(atom, geom.copy(), '150390000000000000002'))
+            self.assertEqual(1, len(converted))
+
+            # the xyz file written by the postprocessing
+            with open('150390000000000000002.xyz', 'w') as f:
+                f.write('4\n\n' + '\n'.join('{} {:.6f} {:.6f} {:.6f}'.format(at, *geom[i]) for i, at in enumerate(atom)))
+            try:
+                self.assertEqual(inchi, cheminfo.create_inchi('', '150390000000000000002', '150390000000000000002.xyz'))
+            finally:
+                os.remove('150390000000000000002.xyz')
+            self.assertEqual(1, len(converted))
+
+            # another geometry is converted again
+            cheminfo.create_inchi_from_geom(atom, geom + [0., 0., 0.3], '150390000000000000002')
+            self.assertEqual(2, len(converted))
+        finally:
+            cheminfo.create_inchi_from_xyz = create_inchi_from_xyz
+            cheminfo.inchi_cache.clear()
+
     def testInchiFromSmi(self):
         """
         Test the inchi creation from a smiles
@@ -0,0 +1,144 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the steps of the homolytic scissions
+and the waiting for the jobs of a KinBot run
+"""
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from kinbot import constants
+from kinbot.kb import wait_for
+from kinbot.homolytic_scissions import HomolyticScissions
+from kinbot.parameters import Parameters
+from kinbot.stationary_pt import StationaryPoint
+
+
+class FakeQc:
+    """
+    Quantum chemistry object whose jobs are finished by the test.
+    """
+
+    def __init__(self):
+        self.status = {}
+        self.geoms = {}
+        self.submitted = []
+
+    def qc_opt(self, species, geom, high_level=0, mp2=0):
+        job = str(species.chemid) + '_well'
+        self.submitted.append(job)
+        self.status.setdefault(job, 'running')
+        self.geoms[job] = geom
+
+    def get_qc_result(self, job):
+        return SimpleNamespace(status=self.status.get(job, 0), geom=self.geoms.get(job), energy=-39.8, zpe=0.03)
+
+    def check_qc(self, job):
+        return self.status.get(job, 0)
+
+    def read_qc_hess(self, job, natom):
+        return np.eye(3 * natom) * 0.5
+
+
+class TestHomolyticScissions(unittest.TestCase):
+    def setUp(self):
+        self.par = Parameters()
+        self.par.par['single_point_qc'] = 'none'
+        self.qc = FakeQc()
+        geom = np.array([[0., 0., 0.765], [0., 0., -0.765],
+                         [1.018, 0., 1.155], [-0.509, 0.882, 1.155], [-0.509, -0.882, 1.155],
+                         [-1.018, 0., -1.155], [0.509, 0.882, -1.155], [0.509, -0.882, -1.155]])
+        self.well = StationaryPoint('well', 0, 1, atom=['C', 'C', 'H', 'H', 'H', 'H', 'H', 'H'], geom=geom)
+        self.well.characterize()
+        self.well.energy = -79.8
+        self.scissions = HomolyticScissions(self.well, self.par, self.qc)
+        self.scissions.find_homolytic_scissions()
+        # the scission of the C-C bond, into two methyl radicals
+        self.index = [hs.bond for hs in self.scissions.hss].index([0, 1])
+        self.hs = self.scissions.hss[self.index]
+        self.job = str(self.hs.products[0].chemid) + '_well'
+
+    def testAdvance(self):
+        """
+        Test the steps of a scission, from the optimization
+        of the products to the end
+        """
+        self.assertIs(self.hs.products[0], self.hs.products[1])
+        self.assertEqual((0, ()), self.scissions.state(self.index))
+
+        self.scissions.advance(self.index)
+        self.assertEqual([self.job, self.job], self.qc.submitted)
+        self.assertEqual((1, ()), self.scissions.state(self.index))
+
+        # nothing changes while the job is running
+        self.scissions.advance(self.index)
+        self.assertEqual((1, ()), self.scissions.state(self.index))
+
+        self.qc.status[self.job] = 'normal'
+        self.scissions.advance(self.index)
+        # the energy of the products is 0.2 hartree above the well
+        self.assertEqual(-999, self.hs.status)
+        self.assertEqual(2, len(self.hs.prod_opt))
+        self.assertIs(self.hs.prod_opt[0], self.hs.prod_opt[1])
+        self.assertEqual((-999, ((-1, 1, 1, 1, 0), (-1, 1, 1, 1, 0))), self.scissions.state(self.index))
+
+    def testBarrier(self):
+        """
+        Test that a scission below the barrier threshold is done
+        """
+        self.par.par['barrier_threshold'] = 0.2 * constants.AUtoKCAL + 1.
+        self.qc.status[self.job] = 'normal'
+        self.scissions.advance(self.index)
+        self.assertEqual(-1, self.hs.status)
+
+    def testFailure(self):
+        """
+        Test that a scission fails with the optimization of a product
+        """
+        self.scissions.advance(self.index)
+        self.qc.status[self.job] = 'error'
+        self.scissions.advance(self.index)
+        self.assertEqual((-999, ()), self.scissions.state(self.index))
+
+
+class TestWaitFor(unittest.TestCase):
+    def testWait(self):
+        """
+        Test that the run yields as long as the job is not done
+        """
+        qc = FakeQc()
+        qc.status['job'] = 'running'
+        steps = wait_for(qc, 'job')
+        next(steps)
+        qc.status['job'] = 'finalizing'
+        next(steps)
+        qc.status['job'] = 'normal'
+        self.assertEqual([], list(steps))
+
+        # a job that is done is not waited for
+        self.assertEqual([], list(wait_for(qc, 'job')))
+        qc.status['job'] = 'error'
+        self.assertEqual([], list(wait_for(qc, 'job')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the bookkeeping of the jobs the reactions wait on
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ase import Atoms
+
+from kinbot.parameters import Parameters
+from kinbot.qc import QuantumChemistry
+from kinbot.job_tracker import JobTracker
+
+
+class TestJobTracker(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        par = Parameters()
+        par.par['queuing'] = 'slurm'
+        par.par['username'] = ''
+        self.qc = QuantumChemistry(par)
+        self.tracker = JobTracker(self.qc)
+        self.qc.tracker = self.tracker
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def finish(self, job):
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+        self.qc.db.write(mol, name=job, data={'status': 'normal'})
+        with open(job + '.log', 'a') as f:
+            f.write('done\n')
+        self.qc.listings = {}
+
+    def testWake(self):
+        """
+        Test that a waiter is only dirty when one of its jobs changed
+        """
+        self.tracker.start(0)
+        self.qc.check_qc('job_a')
+        self.tracker.stop()
+        self.tracker.start(1)
+        self.qc.check_qc('job_b')
+        self.tracker.stop()
+        self.assertEqual(set(), self.tracker.poll())
+
+        self.finish('job_b')
+        self.assertEqual({1}, self.tracker.poll())
+
+        # the waiter saw the new status, it is not dirty anymore
+        self.tracker.start(1)
+        self.qc.check_qc('job_b')
+        self.tracker.stop()
+        self.assertEqual(set(), self.tracker.poll())
+
+        # the job finished again with the same status
+        self.finish('job_b')
+        self.assertEqual({1}, self.tracker.poll())
+
+    def testChanged(self):
+        """
+        Test that a waiter that made progress or waits on nothing stays dirty
+        """
+        self.tracker.start(0)
+        self.qc.check_qc('job_a')
+        self.tracker.stop(changed=1)
+        self.tracker.start(1)
+        self.tracker.stop()
+        self.assertEqual({0, 1}, self.tracker.poll())
+        self.tracker.remove(0)
+        self.tracker.remove(1)
+        self.assertEqual(set(), self.tracker.poll())
+        self.assertEqual({}, self.tracker.waiters)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the lease table of the distributed pes searches
+"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from kinbot.lease_table import LeaseTable
+
+
+def work(fname, owner, queue):
+    """
+    pes worker that runs the wells until all of them are done,
+    the first well adds new wells as kinbot runs do
+    """
+    lease = LeaseTable(fname, owner=owner)
+    while not lease.all_done():
+        job = lease.claim()
+        if job is None:
+            time.sleep(0.01)
+            continue
+        if job == '0':
+            lease.add([str(i) for i in range(1, 50)])
+        time.sleep(0.001)
+        lease.finish(job)
+        queue.put((owner, job))
+    lease.close()
+
+
+class TestLeaseTable(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.dir, 'pes_leases.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testWorkers(self):
+        """
+        Test that several worker processes run each well once
+        """
+        lease = LeaseTable(self.fname, owner='main')
+        lease.add(['0'])
+        queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=work, args=(self.fname, 'w{}'.format(i), queue))
+                   for i in range(4)]
+        for w in workers:
+            w.start()
+        runs = [queue.get(timeout=60) for i in range(50)]
+        for w in workers:
+            w.join(60)
+        self.assertEqual(sorted(str(i) for i in range(50)), sorted(job for owner, job in runs))
+        self.assertTrue(lease.all_done())
+        self.assertEqual(50, len(lease.done()))
+
+    def testExpiry(self):
+        """
+        Test that an expired lease is taken by another worker
+        and that the first worker notices it at the heartbeat
+        """
+        first = LeaseTable(self.fname, owner='first', lease_time=0.2)
+        second = LeaseTable(self.fname, owner='second', lease_time=0.2)
+        first.add(['10', '20'])
+        self.assertEqual('10', first.claim())
+        self.assertEqual([], first.heartbeat(['10'], force=1))
+        self.assertEqual('20', second.claim())
+        self.assertIsNone(second.claim())
+        time.sleep(0.3)
+        self.assertEqual([], second.heartbeat(['20'], force=1))
+        self.assertEqual('10', second.claim())
+        self.assertEqual(['10'], first.heartbeat(['10'], force=1))
+        # the first worker does not own the well any more
+        self.assertEqual(0, first.finish('10'))
+        self.assertFalse(first.all_done())
+        self.assertEqual(1, second.finish('10'))
+        self.assertEqual(1, second.finish('20'))
+        self.assertTrue(first.all_done())
+
+    def testAllDoneAdds(self):
+        """
+        Test that the wells read at the check are added before checking
+        """
+        lease = LeaseTable(self.fname, owner='main')
+        lease.add(['10'])
+        self.assertEqual('10', lease.claim())
+        lease.finish('10')
+        self.assertFalse(lease.all_done(lambda: ['10', '20']))
+        self.assertEqual('20', lease.claim())
+
+    def testRun(self):
+        """
+        Test that the workers only see the search of a running main process,
+        and not the wells left by a previous search
+        """
+        worker = LeaseTable(self.fname, owner='worker')
+        old = LeaseTable(self.fname, owner='old', lease_time=0.2)
+        old.start_run()
+        old.add(['10'])
+        old.claim()
+        old.finish('10')
+        self.assertEqual(old.run_id, worker.current_run())
+        # the main process of the previous search stopped
+        time.sleep(0.3)
+        self.assertIsNone(worker.current_run())
+
+        main = LeaseTable(self.fname, owner='main', lease_time=0.2)
+        main.start_run()
+        self.assertNotEqual(old.run_id, main.run_id)
+        self.assertEqual(main.run_id, worker.current_run())
+        self.assertEqual([], worker.done())
+        self.assertTrue(worker.all_done())
+        time.sleep(0.3)
+        self.assertIsNone(worker.current_run())
+        self.assertEqual(1, main.run_heartbeat(force=1))
+        self.assertEqual(main.run_id, worker.current_run())
+        # the renewal of a run that was started again does nothing
+        old.run_heartbeat(force=1)
+        self.assertEqual(main.run_id, worker.current_run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the local process pool used for queuing = local
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+from kinbot import constants
+from kinbot.parameters import Parameters
+from kinbot.local_queue import LocalQueue
+from kinbot.qc import QuantumChemistry
+
+
+# job script that writes a result to the database the same way as the ase templates
+stub_job = """
+from ase import Atoms
+from ase.db import connect
+mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+db = connect('kinbot.db')
+db.write(mol, name='{name}', data={{'energy': -1., 'status': 'normal'}})
+with open('{name}.log', 'a') as f:
+    f.write('done\\n')
+"""
+
+
+class TestLocalQueue(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        os.makedirs('perm')
+        self.par = Parameters()
+        self.par.par['queuing'] = 'local'
+        self.par.par['local_cores'] = 2
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def testPoolSize(self):
+        """
+        Test that no more than local_cores / ppn jobs run at the same time
+        """
+        queue = LocalQueue(self.par)
+        self.assertEqual(2, queue.max_jobs)
+        pids = []
+        for i in range(4):
+            script = 'job{}.sh'.format(i)
+            with open(script, 'w') as f:
+                f.write('sleep 0.2\necho {} > out{}\n'.format(i, i))
+            pids.append(queue.submit(script))
+        jobs = queue.poll()
+        self.assertEqual(['R', 'R', 'PD', 'PD'], [jobs[pid] for pid in pids])
+        queue.wait()
+        self.assertEqual({}, queue.poll())
+        for i in range(4):
+            self.assertTrue(os.path.exists('out{}'.format(i)))
+
+    def testSubmit(self):
+        """
+        Test a full submission through QuantumChemistry with a stub job
+        """
+        qc = QuantumChemistry(self.par)
+        job = 'stub'
+        with open(job + '.py', 'w') as f:
+            f.write(stub_job.format(name=job))
+        self.assertEqual(1, qc.submit_qc(job))
+        self.assertEqual('running', qc.check_qc(job))
+        # the job is not submitted again while it runs
+        self.assertEqual(0, qc.submit_qc(job))
+
+        qc.queue_status.local.wait()
+        status = qc.check_qc(job)
+        for i in range(20):
+            if status == 'normal':
+                break
+            time.sleep(0.1)
+            status = qc.check_qc(job)
+        self.assertEqual('normal', status)
+        self.assertAlmostEqual(-constants.EVtoHARTREE, qc.get_qc_energy(job)[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
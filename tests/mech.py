@@ -0,0 +1,91 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the selection of the species of a mechanism
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from kinbot import cheminfo
+from kinbot import mech
+from kinbot.parameters import Parameters
+from kinbot.read_mech import read_mech, read_multiplicities
+
+
+class TestMech(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.mech_file = os.path.join(self.dir, 'mech.dat')
+        self.smi_file = os.path.join(self.dir, 'smi.txt')
+        with open(self.mech_file, 'w') as f:
+            f.write('C5H11-1+O2<=>C5H11O2-1    1.0e13  0.0  0.0\n')
+            f.write('C5H11-1<=>C2H4+NC3H7      1.0e13  0.0  30000.0\n')
+            f.write('PC5H11<=>C5H11-1          1.0e13  0.0  30000.0 ! same species\n')
+        with open(self.smi_file, 'w') as f:
+            f.write('C5H11-1 [CH2]CCCC\n')
+            f.write('PC5H11 C([CH2])CCC\n')
+            f.write('O2 O=O 3\n')
+            f.write('C5H11O2-1 CCCCCO[O]\n')
+            f.write('C2H4 C=C\n')
+            f.write('NC3H7 [CH2]CC\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testMultiplicity(self):
+        self.assertEqual(2, cheminfo.get_multiplicity('[CH2]CC'))
+        self.assertEqual(1, cheminfo.get_multiplicity('C=C'))
+
+    def testGivenMultiplicity(self):
+        """
+        Test that the multiplicities of the smiles file and
+        the known triplets are used before the smiles
+        """
+        mults = read_multiplicities(self.smi_file)
+        self.assertEqual({'O=O': 3}, mults)
+        self.assertEqual(3, mech.get_multiplicity('O=O', mults))
+        self.assertEqual(3, mech.get_multiplicity('O=O', {}))
+        self.assertEqual(1, mech.get_multiplicity('C=C', {'C=C': 1}))
+        self.assertEqual(3, mech.get_multiplicity('C=C', {'C=C': 3}))
+        self.assertEqual(2, mech.get_multiplicity('[CH2]CC', mults))
+
+    def testSeeds(self):
+        """
+        Test that the species are unique, in the carbon range
+        and the most expensive come first
+        """
+        par = Parameters()
+        par.par['mech_min_carbon'] = 3
+        rxns = read_mech(self.mech_file, self.smi_file)
+        try:
+            seeds = mech.get_seeds(rxns, par, read_multiplicities(self.smi_file))
+        except AttributeError as e:
+            # the 3D structures are made with the OBBond.GetBO of openbabel 2
+            if 'GetBO' not in str(e):
+                raise
+            self.skipTest('openbabel 2 is needed to generate the 3D structures')
+        self.assertEqual(['CCCCCO[O]', '[CH2]CCCC', '[CH2]CC'], [st_pt.smiles for st_pt in seeds])
+        self.assertEqual([2, 2, 2], [st_pt.mult for st_pt in seeds])
+
+
+if __name__ == "__main__":
+    unittest.main()
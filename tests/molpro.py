@@ -0,0 +1,112 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the reading of the molpro energies
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from kinbot import molpro
+
+
+class TestMolpro(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.dir, 'job.out')
+        molpro.energy_index.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        molpro.energy_index.clear()
+
+    def write(self, lines, mode='w'):
+        with open(self.fname, mode) as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def testReadEnergy(self):
+        """
+        Test that the last energy is found across the blocks
+        """
+        block_size = molpro.block_size
+        molpro.block_size = 16
+        try:
+            self.write(['SETTING MYENA          =      -100.5 AU',
+                        'x' * 40,
+                        'SETTING MYENA          =      -100.25 AU',
+                        'SETTING OTHER          =      -1.0 AU',
+                        'y' * 40])
+            self.assertEqual(-100.25, molpro.read_energy(self.fname, 'MYENA'))
+            self.assertIsNone(molpro.read_energy(self.fname, 'MISSING'))
+        finally:
+            molpro.block_size = block_size
+
+    def testIndex(self):
+        """
+        Test that the energies are cached in the sidecar file
+        and read again when the output changed
+        """
+        self.write(['running'])
+        self.assertIsNone(molpro.get_output_energy(self.fname, 'MYENA'))
+        self.write(['SETTING MYENA          =      -100.5 AU'], mode='a')
+        self.assertEqual(-100.5, molpro.get_output_energy(self.fname, 'MYENA'))
+
+        # a new process only reads the sidecar file
+        molpro.energy_index.clear()
+        read_energy = molpro.read_energy
+        molpro.read_energy = None
+        try:
+            self.assertEqual(-100.5, molpro.get_output_energy(self.fname, 'MYENA'))
+        finally:
+            molpro.read_energy = read_energy
+        self.assertIsNone(molpro.get_output_energy(os.path.join(self.dir, 'none.out'), 'MYENA'))
+
+    def testCompact(self):
+        """
+        Test that only the found energies are written, and that the
+        records of the changed outputs are removed when the file is read
+        """
+        index_file = os.path.join(self.dir, molpro.energy_index_file)
+        self.write(['running'])
+        self.assertIsNone(molpro.get_output_energy(self.fname, 'MYENA'))
+        self.assertFalse(os.path.exists(index_file))
+        for i in range(3):
+            self.write(['SETTING MYENA          =      -10{}.5 AU'.format(i)], mode='a')
+            self.assertEqual(-100.5 - i, molpro.get_output_energy(self.fname, 'MYENA'))
+        with open(index_file) as f:
+            self.assertEqual(3, len(f.readlines()))
+
+        # the directory is the same, also if given by a relative path
+        molpro.energy_index.clear()
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        try:
+            self.assertEqual(-102.5, molpro.get_output_energy('job.out', 'MYENA'))
+            self.assertEqual([os.path.abspath(self.dir)], list(molpro.energy_index))
+        finally:
+            os.chdir(cwd)
+        with open(index_file) as f:
+            self.assertEqual(1, len(f.readlines()))
+        self.assertEqual(-102.5, molpro.get_output_energy(self.fname, 'MYENA'))
+
+
+if __name__ == "__main__":
+    unittest.main()
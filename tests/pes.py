@@ -0,0 +1,339 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the energy and summary loaders of the pes postprocessing
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+import networkx as nx
+from ase import Atoms
+from ase.db import connect
+
+from kinbot import constants
+from kinbot import pes
+from kinbot.parameters import Parameters
+
+
+class TestEnergies(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = connect(os.path.join(self.dir, 'kinbot.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, energy, zpe):
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+        self.db.write(mol, name=name, data={'energy': energy, 'zpe': zpe, 'status': 'normal'})
+
+    def testLoad(self):
+        """
+        Test that the last row of each job is used and that
+        the database is read again after it changed
+        """
+        self.write('10_well', -1., 0.1)
+        self.write('10_well', -2., 0.2)
+        self.write('ts_1', -1.5, 0.15)
+        self.assertAlmostEqual(-2. * constants.EVtoHARTREE, pes.get_energy(self.dir, '10', 0, 0))
+        self.assertEqual(0.2, pes.get_zpe(self.dir, '10', 0, 0))
+        self.assertEqual(0.15, pes.get_zpe(self.dir, 'ts_1', 1, 0))
+
+        self.write('10_well_high', -3., 0.3)
+        self.assertEqual(0.3, pes.get_zpe(self.dir, '10', 0, 1))
+        self.assertEqual(3, len(pes.energy_cache[self.dir][1]))
+
+    def testRecentWrite(self):
+        """
+        Test that the cache is not trusted if the database was changed
+        around the last read, as its modification time may not have changed
+        """
+        self.write('10_well', -1., 0.1)
+        db_file = os.path.join(self.dir, 'kinbot.db')
+        st = os.stat(db_file)
+        # the last write was long ago, but in the same tick as the last read,
+        # and it did not change the size nor the modification time
+        os.utime(db_file, (st.st_atime, st.st_mtime - 100.))
+        st = os.stat(db_file)
+        pes.energy_cache[self.dir] = ((st.st_mtime, st.st_size), {}, st.st_mtime + 1.)
+        self.assertEqual(1, len(pes.load_energies(self.dir)))
+
+        # the database was not touched since the last read
+        self.assertGreater(pes.energy_cache[self.dir][2] - st.st_mtime, 2.)
+        pes.energy_cache[self.dir] = ((st.st_mtime, st.st_size), {}, st.st_mtime + 10.)
+        self.assertEqual(0, len(pes.load_energies(self.dir)))
+
+
+class TestUpdate(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        os.makedirs('10')
+        db = connect('10/kinbot.db')
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+        db.write(mol, name='10_well', data={'energy': -1., 'zpe': 0.1, 'status': 'normal'})
+        with open('10/summary_10.out', 'w') as f:
+            f.write('')
+        self.par = Parameters()
+        self.par.par['queuing'] = 'pbs'
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def testMissingJob(self):
+        """
+        Test that a job missing from the database of a well
+        does not stop the update of the pes inputs
+        """
+        with self.assertRaises(pes.MissingJobError):
+            pes.get_energy('10', '20', 0, 0)
+        pes.update_postprocess(self.par, ['20', '10'], 'all', [])
+
+    def testRealErrors(self):
+        """
+        Test that the update only hides the missing data, and does
+        not write the L3 batch file
+        """
+        with self.assertRaises(SystemExit):
+            pes.update_postprocess(self.par, ['10'], 'unknown', [])
+        self.assertFalse(os.path.exists('batch_L3_pbs.sub'))
+
+
+class TestStatus(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.path = os.environ['PATH']
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def wait(self, job, process):
+        end = time.time() + 10.
+        while pes.check_status(job, process) and time.time() < end:
+            time.sleep(0.05)
+
+    def testRunning(self):
+        """
+        Test that a run is followed until its process finishes
+        """
+        self.assertEqual(0, pes.check_status('10', 0))
+        process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(0.5)'])
+        self.assertEqual(1, pes.check_status('10', process))
+        self.wait('10', process)
+        self.assertEqual(0, process.returncode)
+        self.assertEqual(0, pes.check_status('10', process))
+
+    def testFailure(self):
+        """
+        Test that a run that failed is reported and is not running
+        """
+        process = subprocess.Popen([sys.executable, '-c', 'import sys; sys.exit(3)'])
+        with self.assertLogs(level='WARNING') as logs:
+            self.wait('10', process)
+        self.assertIn('exited with code 3', logs.output[0])
+        self.assertEqual(3, process.returncode)
+
+    def testSubmit(self):
+        """
+        Test that the kinbot run is started in the directory of the well
+        """
+        os.makedirs('bin')
+        with open('bin/kinbot', 'w') as f:
+            f.write('#!/bin/sh\necho $1 `basename $PWD`\nsleep 0.5\n')
+        os.chmod('bin/kinbot', 0o755)
+        os.environ['PATH'] = os.path.join(self.dir, 'bin') + os.pathsep + self.path
+        os.makedirs('10')
+        with open('10/kinbot_monitor.out', 'w') as f:
+            f.write('')
+        par = Parameters()
+        process = pes.submit_job('10', par)
+        self.assertFalse(os.path.exists('10/kinbot_monitor.out'))
+        self.assertEqual(1, pes.check_status('10', process))
+        self.wait('10', process)
+        self.assertEqual(0, process.returncode)
+        with open('10/kinbot.out') as f:
+            self.assertEqual('10.json 10\n', f.read())
+
+
+class TestSummary(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        os.makedirs('10/molpro/sub')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def testReadSummary(self):
+        """
+        Test that the summary is parsed again only after it changed
+        """
+        self.assertIsNone(pes.read_summary('10'))
+        with open('10/summary_10.out', 'w') as f:
+            f.write('SUCCESS\t-10.0\tts_1\t20\n')
+        self.assertEqual([['SUCCESS', '-10.0', 'ts_1', '20']], pes.read_summary('10'))
+        summary = pes.read_summary('10')
+        self.assertIs(summary, pes.read_summary('10'))
+        with open('10/summary_10.out', 'a') as f:
+            f.write('FAILED\t-10.0\tts_2\n')
+            f.write('HOMOLYTIC_SCISSION\t30.0\ths_1\t1\t2\n')
+        self.assertEqual(2, len(pes.read_summary('10')))
+
+    def testCopy(self):
+        """
+        Test that only the new and changed files are copied
+        """
+        with open('10/molpro/a.inp', 'w') as f:
+            f.write('a')
+        with open('10/molpro/sub/b.inp', 'w') as f:
+            f.write('b')
+        pes.copy_from_kinbot('10', 'molpro')
+        self.assertTrue(os.path.exists('molpro/sub/b.inp'))
+
+        # a file changed here is not overwritten by an unchanged one
+        with open('molpro/a.inp', 'w') as f:
+            f.write('x')
+        os.utime('molpro/a.inp', (0, os.stat('10/molpro/a.inp').st_mtime))
+        with open('10/molpro/sub/b.inp', 'w') as f:
+            f.write('bb')
+        pes.copy_from_kinbot('10', 'molpro')
+        with open('molpro/a.inp') as f:
+            self.assertEqual('x', f.read())
+        with open('molpro/sub/b.inp') as f:
+            self.assertEqual('bb', f.read())
+
+
+class TestNetwork(unittest.TestCase):
+    def testReactions(self):
+        """
+        Test that the reactions are unique in both directions
+        """
+        reactions = {}
+        wells = {}
+        products = {}
+        parent = {}
+        pes.add_species('1', ['2'], wells, products, parent)
+        reactions[pes.reaction_key('1', ['2'])] = ['1', 'ts_a', ['2'], 10.]
+        pes.add_species('1', ['4', '3'], wells, products, parent)
+        reactions[pes.reaction_key('1', ['4', '3'])] = ['1', 'ts_b', ['4', '3'], 20.]
+        pes.add_species('2', ['1'], wells, products, parent)
+
+        self.assertEqual(('1', ('2',)), pes.find_reaction(reactions, '2', ['1']))
+        self.assertEqual(('1', ('3', '4')), pes.find_reaction(reactions, '1', ['3', '4']))
+        self.assertIsNone(pes.find_reaction(reactions, '2', ['3', '4']))
+        self.assertEqual(['1', '2'], list(wells))
+        self.assertEqual(['3_4'], list(products))
+        self.assertEqual('1', parent['2'])
+
+    def testPathways(self):
+        """
+        Test the pathways on the sparse connectivity
+        """
+        wells = ['1', '2', '5']
+        products = ['3_4']
+        reactions = [['1', 'ts_a', ['2'], 10.],
+                     ['2', 'ts_b', ['4', '3'], 20.],
+                     ['1', 'ts_c', ['5'], 30.],
+                     ['5', 'ts_d', ['2'], 5.]]
+        conn, bars = pes.get_connectivity(wells, products, reactions)
+        self.assertEqual({1, 2}, conn[0])
+        self.assertEqual(20., bars[(3, 1)])
+        paths = pes.get_all_pathways(wells, products, reactions, ['1', '3_4'], 10)
+        names = [[rxn[1] for rxn in path] for path in paths]
+        self.assertEqual([['ts_a', 'ts_b'], ['ts_c', 'ts_d', 'ts_b']], names)
+
+    def testBottleneck(self):
+        """
+        Test that the pathways are ranked by their highest barrier,
+        and that bimolecular products are not intermediates
+        """
+        wells = ['1', '2', '5', '6']
+        products = ['3_4']
+        reactions = [['1', 'ts_a', ['2'], 40.],
+                     ['2', 'ts_b', ['6'], 10.],
+                     ['1', 'ts_c', ['5'], 20.],
+                     ['5', 'ts_d', ['2'], 30.],
+                     ['5', 'ts_e', ['3', '4'], 0.],
+                     ['6', 'ts_f', ['3', '4'], -10.]]
+        G = pes.get_pathway_graph(wells, products, reactions)
+        # from well 1 to well 6
+        barrier, path = pes.get_lowest_path(G, 0, 3, len(wells))
+        self.assertEqual(30., barrier)
+        self.assertEqual([0, 2, 1, 3], path)
+
+        paths = pes.get_best_paths(G, 0, 3, len(wells), 10)
+        self.assertEqual([30., 40.], [b for b, p in paths])
+        self.assertEqual([0, 1, 3], paths[1][1])
+
+        paths = pes.get_all_pathways(wells, products, reactions, ['1', '3_4'], 2)
+        names = [[rxn[1] for rxn in path] for path in paths]
+        self.assertEqual([['ts_c', 'ts_e'], ['ts_c', 'ts_d', 'ts_b', 'ts_f']], names)
+
+    def testFewestSteps(self):
+        """
+        Test that of the paths with the same highest barrier
+        the one with the fewest steps is chosen
+        """
+        G = nx.Graph()
+        for i, j, barrier in [(0, 1, 10.), (1, 2, 1.), (2, 4, 25.), (0, 2, 20.), (1, 4, 30.)]:
+            G.add_edge(i, j, weight=barrier)
+        barrier, path = pes.get_lowest_path(G, 0, 4, 5)
+        self.assertEqual(25., barrier)
+        self.assertEqual([0, 2, 4], path)
+
+        # without the direct step the longer path is taken
+        barrier, path = pes.get_lowest_path(G, 0, 4, 5, removed_edges={(0, 2)})
+        self.assertEqual(25., barrier)
+        self.assertEqual([0, 1, 2, 4], path)
+
+    def testBoltzmann(self):
+        """
+        Test that the branching filter is done for each temperature
+        """
+        reactions = [['1', 'ts_a', ['2'], 10.],
+                     ['1', 'ts_b', ['5'], 14.],
+                     ['2', 'ts_c', ['6'], 0.],
+                     ['5', 'ts_d', ['3', '4'], 20.],
+                     ['1', 'barrierless', ['7', '8'], 12.],
+                     ['2', 'barrierless', ['7', '9'], 1.]]
+        networks = pes.filter_boltzmann('1', reactions, [300., 2000.])
+        wells, rxns = networks[0]
+        self.assertEqual(['1', '2', '6'], wells)
+        self.assertEqual(['ts_a', 'ts_c', 'barrierless', 'barrierless'], [rxn[1] for rxn in rxns])
+        wells, rxns = networks[1]
+        self.assertEqual(['1', '2', '5', '6'], wells)
+        self.assertEqual(6, len(rxns))
+
+
+if __name__ == "__main__":
+    unittest.main()
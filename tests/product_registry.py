@@ -0,0 +1,59 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the registry of the products of a well
+"""
+import unittest
+
+import numpy as np
+
+from kinbot.parameters import Parameters
+from kinbot.product_registry import ProductRegistry
+from kinbot.stationary_pt import StationaryPoint
+
+
+class TestProductRegistry(unittest.TestCase):
+    def methyl(self, name, mult=2, shift=0.):
+        geom = np.array([[0., 0., 0.], [1.09, 0., 0.], [-0.54, 0.94, 0.], [-0.54, -0.94, 0.]]) + shift
+        st_pt = StationaryPoint(name, 0, mult, atom=['C', 'H', 'H', 'H'], geom=geom)
+        st_pt.characterize()
+        return st_pt
+
+    def testAdd(self):
+        """
+        Test that the products are unique by chemid and multiplicity
+        """
+        registry = ProductRegistry(Parameters(), None)
+        first = self.methyl('first')
+        self.assertIsNone(registry.get(first))
+        self.assertIs(first, registry.add(first))
+
+        # same product from another reaction, in another orientation
+        second = self.methyl('second', shift=1.)
+        self.assertIs(first, registry.get(second))
+        self.assertIs(first, registry.add(second))
+
+        quartet = self.methyl('quartet', mult=4)
+        self.assertIs(quartet, registry.add(quartet))
+        self.assertEqual(2, len(registry.species))
+
+
+if __name__ == "__main__":
+    unittest.main()
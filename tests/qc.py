@@ -0,0 +1,134 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the status checks of the qc jobs
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ase import Atoms
+
+from kinbot.parameters import Parameters
+from kinbot.qc import QuantumChemistry
+
+
+class TestQC(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        par = Parameters()
+        par.par['queuing'] = 'slurm'
+        par.par['username'] = ''
+        self.qc = QuantumChemistry(par)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def write(self, job, data):
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+        self.qc.db.write(mol, name=job, data=data)
+
+    def testFinalizing(self):
+        """
+        Test that a job in the database without a log file is reported
+        as finalizing, and as finished once the log file is there
+        """
+        data = {'energy': -1., 'frequencies': [4000.], 'zpe': 0.01, 'status': 'normal'}
+        self.assertEqual(0, self.qc.check_qc('job'))
+        self.write('job', data)
+        self.assertEqual('finalizing', self.qc.check_qc('job'))
+        self.assertEqual(1, self.qc.get_qc_energy('job')[0])
+
+        with open('job.log', 'w') as f:
+            f.write('done\n')
+        self.qc.listings = {}
+        self.assertEqual('normal', self.qc.check_qc('job'))
+        result = self.qc.get_qc_result('job')
+        self.assertEqual([4000.], result.freq)
+        self.assertEqual(0.01, result.zpe)
+
+    def testRemoveLog(self):
+        """
+        Test that a job can be restarted right away after deleting its log file
+        """
+        self.write('job', {'status': 'normal'})
+        with open('job.log', 'w') as f:
+            f.write('done\n')
+        self.assertEqual('normal', self.qc.check_qc('job'))
+        self.qc.remove_log('job')
+        self.assertFalse(os.path.exists('job.log'))
+        self.assertEqual(0, self.qc.check_qc('job'))
+
+        # a new entry of the job is finalizing again
+        self.write('job', {'status': 'normal'})
+        self.assertEqual('finalizing', self.qc.check_qc('job'))
+
+    def testPending(self):
+        """
+        Test that the jobs above the limit wait in the pending queue
+        and are submitted in the order of their priority
+        """
+        submitted = []
+
+        def submit_job(job):
+            submitted.append(job)
+            self.qc.job_ids[job] = str(len(submitted))
+            self.qc.queue_status.add(str(len(submitted)))
+            return 1
+
+        self.qc.submit_job = submit_job
+        self.qc.queue_job_limit = 1
+        self.assertEqual(1, self.qc.submit_qc('conf/well_0'))
+        self.assertEqual(1, self.qc.submit_qc('hir/well_hir_1_00'))
+        self.assertEqual(1, self.qc.submit_qc('well_IRC_F'))
+        self.assertEqual(1, self.qc.submit_qc('well_12', kind='ts_end'))
+        self.assertEqual(['conf/well_0'], submitted)
+        self.assertEqual('running', self.qc.check_qc('well_12'))
+        self.assertEqual(0, self.qc.submit_qc('well_12', kind='ts_end'))
+
+        # free the slot
+        self.qc.queue_status.submitted = {}
+        self.qc.check_qc('conf/well_0')
+        self.assertEqual(['conf/well_0', 'well_IRC_F'], submitted)
+        self.qc.queue_status.submitted = {}
+        self.qc.check_qc('conf/well_0')
+        self.qc.queue_status.submitted = {}
+        self.qc.check_qc('conf/well_0')
+        self.assertEqual(['conf/well_0', 'well_IRC_F', 'well_12', 'hir/well_hir_1_00'], submitted)
+
+    def testJobKind(self):
+        """
+        Test the kinds guessed from the job names
+        """
+        self.assertEqual('well', self.qc.job_kind('10000000000000000001_well'))
+        self.assertEqual('well', self.qc.job_kind('10000000000000000001_well_high'))
+        self.assertEqual('ts_search', self.qc.job_kind('intra_H_migration_1_2'))
+        self.assertEqual('ts_end', self.qc.job_kind('intra_H_migration_1_2_high'))
+        self.assertEqual('irc', self.qc.job_kind('intra_H_migration_1_2_IRC_F'))
+        self.assertEqual('hir', self.qc.job_kind('hir/intra_H_migration_1_2_hir_1_00'))
+        self.assertEqual('conf', self.qc.job_kind('conf/intra_H_migration_1_2_0'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the cache of qc calculations
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from ase import Atoms
+from ase.db import connect
+
+from kinbot import qc_cache
+from kinbot import frequencies
+from kinbot.stationary_pt import StationaryPoint
+
+
+class TestQCCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.atom = ['O', 'H', 'H']
+        self.geom = np.array([[0., 0., 0.119], [0., 0.763, -0.477], [0., -0.763, -0.477]])
+        self.kwargs = {'method': 'b3lyp', 'basis': '6-31G', 'label': 'a', 'chk': 'a', 'multiplicity': 1}
+        # rotation around z by 90 degrees and a translation
+        self.rot = np.array([[0., -1., 0.], [1., 0., 0.], [0., 0., 1.]])
+        self.shift = np.array([1., 2., 3.])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def key(self, geom, kwargs):
+        return qc_cache.make_key('gauss', 'opt_well', kwargs, self.atom, geom, 0, 1)
+
+    def testKey(self):
+        """
+        Test that the key does not depend on the orientation of the
+        molecule and the name of the job, but depends on the method
+        """
+        key = self.key(self.geom, self.kwargs)
+        moved = np.dot(self.geom, self.rot.T) + self.shift
+        kwargs = dict(self.kwargs, label='b', chk='b')
+        self.assertEqual(key.hash, self.key(moved, kwargs).hash)
+
+        kwargs = dict(self.kwargs, method='mp2')
+        self.assertNotEqual(key.hash, self.key(self.geom, kwargs).hash)
+        stretched = np.array(self.geom)
+        stretched[1][1] += 0.1
+        self.assertNotEqual(key.hash, self.key(stretched, self.kwargs).hash)
+
+    def testStoreMaterialize(self):
+        """
+        Test that a cached result is written to the database in the
+        orientation of the job that was run, together with the output file
+        """
+        cache = qc_cache.QCCache(os.path.join(self.dir, 'cache'))
+        db = connect(os.path.join(self.dir, 'kinbot.db'))
+        log = os.path.join(self.dir, 'a.log')
+        with open(log, 'w') as f:
+            f.write('Normal termination\n')
+        # the optimization slightly changes the geometry
+        result = np.array(self.geom)
+        result[1][1] += 0.01
+        db.write(Atoms(symbols=self.atom, positions=result), name='a',
+                 data={'energy': -2000., 'status': 'normal'})
+        key = self.key(self.geom, self.kwargs)
+        self.assertEqual(1, cache.store(key, db.get(name='a'), {'.log': log}))
+        self.assertEqual(0, cache.store(key, db.get(name='a'), {'.log': log}))
+
+        moved = np.dot(self.geom, self.rot.T) + self.shift
+        key = self.key(moved, self.kwargs)
+        new_log = os.path.join(self.dir, 'b.log')
+        self.assertEqual(1, cache.materialize(key, 'b', db, {'.log': new_log}))
+        row = db.get(name='b')
+        self.assertEqual('normal', row.data['status'])
+        self.assertEqual(-2000., row.data['energy'])
+        self.assertTrue(np.allclose(result, row.positions))
+        self.assertTrue(os.path.exists(new_log))
+
+        stretched = np.array(self.geom)
+        stretched[1][1] += 0.1
+        key = self.key(stretched, self.kwargs)
+        self.assertEqual(0, cache.materialize(key, 'c', db, {}))
+
+    def hessian(self, geom):
+        """
+        Hessian of springs between all pairs of atoms at their equilibrium length.
+        """
+        natom = len(geom)
+        hess = np.zeros((3 * natom, 3 * natom))
+        for i in range(natom):
+            for j in range(i + 1, natom):
+                u = geom[i] - geom[j]
+                u /= np.linalg.norm(u)
+                k = 0.5 * np.outer(u, u)
+                hess[3*i:3*i+3, 3*i:3*i+3] += k
+                hess[3*j:3*j+3, 3*j:3*j+3] += k
+                hess[3*i:3*i+3, 3*j:3*j+3] -= k
+                hess[3*j:3*j+3, 3*i:3*i+3] -= k
+        return hess
+
+    def testFrequencies(self):
+        """
+        Test that the projected frequencies from the geometry and the
+        Hessian of a cache hit are the same as those of a fresh run
+        """
+        cache = qc_cache.QCCache(os.path.join(self.dir, 'cache'))
+        db = connect(os.path.join(self.dir, 'kinbot.db'))
+        species = StationaryPoint('water', 0, 1, natom=3, atom=self.atom, geom=self.geom)
+        species.dihed = []
+
+        # fresh run
+        result = np.array(self.geom)
+        result[1][1] += 0.01
+        hess = self.hessian(result)
+        fchk = os.path.join(self.dir, 'a.fchk')
+        np.savetxt(fchk, hess)
+        db.write(Atoms(symbols=self.atom, positions=result), name='a', data={'status': 'normal'})
+        key = self.key(self.geom, self.kwargs)
+        cache.store(key, db.get(name='a'), {'.fchk': fchk})
+        freq, reduced_freqs = frequencies.get_frequencies(species, np.array(hess), result)
+
+        # cache hit from a rotated input
+        moved = np.dot(self.geom, self.rot.T) + self.shift
+        new_fchk = os.path.join(self.dir, 'b.fchk')
+        self.assertEqual(1, cache.materialize(self.key(moved, self.kwargs), 'b', db, {'.fchk': new_fchk}))
+        row = db.get(name='b')
+        cached_freq, cached_reduced_freqs = frequencies.get_frequencies(species, np.loadtxt(new_fchk), row.positions)
+        self.assertEqual(3, len(reduced_freqs))
+        self.assertTrue(np.allclose(freq, cached_freq, atol=1e-3))
+        self.assertTrue(np.allclose(reduced_freqs, cached_reduced_freqs, atol=1e-3))
+
+
+if __name__ == "__main__":
+    unittest.main()
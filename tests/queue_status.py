@@ -0,0 +1,133 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the parsing of the queuing system outputs
+and the bookkeeping of the shared queue snapshot
+"""
+import unittest
+
+from kinbot.parameters import Parameters
+from kinbot.queue_status import QueueStatus
+import kinbot.queue_status as queue_status
+
+
+class SnapshotQueue(QueueStatus):
+    """
+    Queue status that returns a preset snapshot instead of calling the scheduler
+    """
+    def __init__(self, par, snapshot, user_jobs=()):
+        QueueStatus.__init__(self, par)
+        self.snapshot = snapshot
+        self.user_snapshot = list(user_jobs)
+        self.n_query = 0
+        self.n_user_query = 0
+
+    def query(self):
+        self.n_query += 1
+        return dict(self.snapshot)
+
+    def query_user(self):
+        self.n_user_query += 1
+        return list(self.user_snapshot)
+
+
+class TestQueueStatus(unittest.TestCase):
+    def setUp(self):
+        self.par = Parameters()
+
+    def testParseSqueue(self):
+        """
+        Test the parsing of squeue -h -o "%i %t"
+        """
+        out = '  1234 R\n1235 PD\n1236_1 CG\n\n'
+        exp = {'1234': 'R', '1235': 'PD', '1236_1': 'CG'}
+        self.assertEqual(exp, queue_status.parse_squeue(out))
+
+    def testParseQuery(self):
+        """
+        Test that unknown job ids mean that the jobs left the queue,
+        and that other errors are failed queries
+        """
+        err = 'slurm_load_jobs error: Invalid job id specified\n'
+        self.assertEqual({}, queue_status.parse_query('slurm', 1, '', err))
+        err = 'qstat: Unknown Job Id 1234.server\n'
+        self.assertEqual({}, queue_status.parse_query('pbs', 153, '', err))
+        err = 'qstat: 1234.server Job has finished, use -x or -H to obtain historical job information\n'
+        self.assertEqual({}, queue_status.parse_query('pbs', 35, '', err))
+        err = 'squeue: error: Unable to contact slurm controller\n'
+        self.assertIsNone(queue_status.parse_query('slurm', 1, '', err))
+        self.assertEqual({'1': 'R'}, queue_status.parse_query('slurm', 0, '1 R\n', ''))
+
+    def testParseQselect(self):
+        """
+        Test the parsing of qselect
+        """
+        self.assertEqual(['1234', '1235'], queue_status.parse_qselect('1234.server\n1235.server\n'))
+
+    def testUserCount(self):
+        """
+        Test that the job limit counts the jobs of all processes of the user,
+        together with the fresh submissions of this process
+        """
+        self.par.par['queue_poll_interval'] = 1000
+        qs = SnapshotQueue(self.par, {'1': 'R'}, user_jobs=['1', '7', '8'])
+        qs.add('1')
+        self.assertEqual(3, qs.n_jobs())
+        qs.add('2')
+        self.assertEqual(4, qs.n_jobs())
+        self.assertEqual(1, qs.n_user_query)
+
+    def testParseQstat(self):
+        """
+        Test the parsing of qstat, with the header lines
+        """
+        out = 'Job ID                    Name             User            Time Use S Queue\n'
+        out += '------------------------- ---------------- --------------- -------- - -----\n'
+        out += '1234.server               job_a            jzador          00:01:02 R medium\n'
+        out += '1235.server               job_b            jzador                 0 Q medium\n'
+        exp = {'1234': 'R', '1235': 'Q'}
+        self.assertEqual(exp, queue_status.parse_qstat(out))
+
+    def testSnapshot(self):
+        """
+        Test that the scheduler is queried only once per interval,
+        and that freshly submitted jobs count as running until
+        a newer snapshot is taken
+        """
+        self.par.par['queue_poll_interval'] = 1000
+        qs = SnapshotQueue(self.par, {'1': 'R'})
+        self.assertTrue(qs.is_running('1'))
+        self.assertFalse(qs.is_running('2'))
+        self.assertEqual(1, qs.n_query)
+
+        qs.add('2')
+        self.assertTrue(qs.is_running('2'))
+        self.assertEqual(2, qs.n_jobs())
+        self.assertEqual(1, qs.n_query)
+
+        # new snapshot taken after the submission, job 2 already finished
+        qs.last_query -= 2000
+        qs.submitted['2'] -= 1
+        self.assertFalse(qs.is_running('2'))
+        self.assertEqual(2, qs.n_query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,341 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the checkpoint of the reaction searches
+"""
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+from ase import Atoms
+
+from kinbot.job_tracker import JobTracker
+from kinbot.optimize import Optimize
+from kinbot.parameters import Parameters
+from kinbot.qc import QuantumChemistry
+from kinbot.reaction_generator import ReactionGenerator, checkpoint_file
+from kinbot.stationary_pt import StationaryPoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.par = Parameters()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def species(self, ts_done, step):
+        objs = [SimpleNamespace(instance_name='rxn_{}'.format(i), products=[], ts_opt=None,
+                                prod_opt=[], chain_start=-1) for i in range(len(ts_done))]
+        return SimpleNamespace(reac_inst=list(range(len(ts_done))), reac_obj=objs,
+                               reac_ts_done=ts_done, reac_step=step,
+                               reac_scan_energy=[[] for i in ts_done])
+
+    def testRestore(self):
+        """
+        Test that the state of the reactions is restored by name
+        """
+        species = self.species([0, 0, -999, 2, 1], [3, 4, 2, 6, 6])
+        species.reac_scan_energy[0] = [-1., -0.9]
+        species.reac_obj[1].chain_start = 1
+        rg = ReactionGenerator(species, self.par, None)
+        rg.write_checkpoint()
+        self.assertFalse(os.path.exists(checkpoint_file + '.tmp'))
+
+        # the order of the reactions changed after the restart
+        new = self.species([0, 0, 0, 0, 0], [0, 0, 0, 0, 0])
+        for i, obj in enumerate(new.reac_obj):
+            obj.instance_name = 'rxn_{}'.format(4 - i)
+        rg = ReactionGenerator(new, self.par, None)
+        self.assertEqual(5, rg.read_checkpoint())
+        self.assertEqual([1, 1, -999, 0, 0], new.reac_ts_done)
+        self.assertEqual([6, 6, 0, 4, 3], new.reac_step)
+        self.assertEqual([-1., -0.9], new.reac_scan_energy[4])
+        self.assertEqual(1, new.reac_obj[3].chain_start)
+
+    def testProducts(self):
+        """
+        Test that the products and the optimizations are restored,
+        and that finished reactions stay finished
+        """
+        self.par.par['single_point_qc'] = 'none'
+
+        def ethane(cc):
+            z = cc / 2.
+            return np.array([[0., 0., z], [0., 0., -z],
+                             [1.018, 0., z + 0.39], [-0.509, 0.882, z + 0.39], [-0.509, -0.882, z + 0.39],
+                             [-1.018, 0., -z - 0.39], [0.509, 0.882, -z - 0.39], [0.509, -0.882, -z - 0.39]])
+
+        def result(job):
+            return SimpleNamespace(status='normal', geom=ethane(3.), energy=-79.6, zpe=0.07)
+
+        hess = lambda job, natom: np.eye(3 * natom) * 0.5
+        qc = SimpleNamespace(job_ids={}, get_qc_result=result, read_qc_hess=hess)
+        well = StationaryPoint('well', 0, 1, atom=['C', 'C', 'H', 'H', 'H', 'H', 'H', 'H'], geom=ethane(1.53))
+        well.characterize()
+
+        def species(ts_done):
+            objs = [SimpleNamespace(instance_name='rxn_{}'.format(i), products=[], ts_opt=None,
+                                    prod_opt=[], chain_start=-1) for i in range(len(ts_done))]
+            well.reac_inst = list(range(len(ts_done)))
+            well.reac_obj = objs
+            well.reac_ts_done = ts_done
+            well.reac_step = [10 for i in ts_done]
+            well.reac_scan_energy = [[] for i in ts_done]
+            return well
+
+        rg = ReactionGenerator(species([-1, 5]), self.par, qc)
+        rg.products_waiting_status = [[1, 1], [1, 1]]
+        methyl = StationaryPoint('prod_1', 0, 2, atom=['C', 'H', 'H', 'H'],
+                                 geom=np.array([[0., 0., 0.], [1.08, 0., 0.], [-0.54, 0.935, 0.], [-0.54, -0.935, 0.]]))
+        methyl.characterize()
+        for index, obj in enumerate(well.reac_obj):
+            obj.products = [methyl, methyl]
+            obj.product_bonds = np.array(well.bond)
+            obj.product_bonds[0][1] = obj.product_bonds[1][0] = 0
+            obj.ts = rg.make_ts(index)
+            obj.ts_opt = Optimize(obj.ts, self.par, qc)
+            obj.ts_opt.do_optimization()
+            obj.prod_opt = [rg.registry.optimize(methyl), rg.registry.optimize(methyl)]
+        # the high level optimization of the second ts failed
+        well.reac_obj[1].ts_opt.shigh = -999
+        rg.write_checkpoint()
+        freqs = list(well.reac_obj[0].ts.reduced_freqs)
+
+        new = species([0, 0])
+        rg = ReactionGenerator(new, self.par, qc)
+        rg.products_waiting_status = [[], []]
+        self.assertEqual(2, rg.read_checkpoint())
+        self.assertEqual([-1, 5], new.reac_ts_done)
+        obj = new.reac_obj[0]
+        self.assertEqual([methyl.chemid, methyl.chemid], [prod.chemid for prod in obj.products])
+        self.assertIs(obj.prod_opt[0], obj.prod_opt[1])
+        self.assertIs(obj.prod_opt[0], new.reac_obj[1].prod_opt[0])
+        self.assertEqual([-1, 1, 1, 1, 0], obj.ts_opt.status())
+        self.assertEqual([-1, 1, 1, 1, 0], obj.prod_opt[0].status())
+        np.testing.assert_allclose(freqs, obj.ts.reduced_freqs)
+        self.assertEqual(-999, new.reac_obj[1].ts_opt.shigh)
+        self.assertEqual([1, 1], rg.products_waiting_status[1])
+
+    def testJobIds(self):
+        """
+        Test that the ids of the submitted jobs are restored,
+        so that the running step of a ts search is waited for
+        """
+        self.par.par['queuing'] = 'slurm'
+        species = self.species([0], [3])
+        qc = SimpleNamespace(job_ids={'rxn_0': '123'}, queue_status=SimpleNamespace(add=None))
+        rg = ReactionGenerator(species, self.par, qc)
+        rg.write_checkpoint()
+
+        added = []
+        qc = SimpleNamespace(job_ids={}, queue_status=SimpleNamespace(add=added.append))
+        rg = ReactionGenerator(self.species([0], [0]), self.par, qc)
+        self.assertEqual(1, rg.read_checkpoint())
+        self.assertEqual({'rxn_0': '123'}, qc.job_ids)
+        self.assertEqual(['123'], added)
+
+    def testBarrierThreshold(self):
+        """
+        Test that failed reactions are checked again
+        when the barrier threshold changed
+        """
+        rg = ReactionGenerator(self.species([-999, 0], [0, 3]), self.par, None)
+        rg.write_checkpoint()
+        new = self.species([0, 0], [0, 0])
+        rg = ReactionGenerator(new, self.par, None)
+        self.assertEqual(2, rg.read_checkpoint())
+        self.assertEqual([-999, 0], new.reac_ts_done)
+
+        self.par.par['barrier_threshold'] += 10.
+        new = self.species([0, 0], [0, 0])
+        rg = ReactionGenerator(new, self.par, None)
+        self.assertEqual(1, rg.read_checkpoint())
+        self.assertEqual([0, 0], new.reac_ts_done)
+        self.assertEqual([0, 3], new.reac_step)
+
+    def testBrokenFile(self):
+        """
+        Test that a broken checkpoint file is ignored
+        """
+        with open(checkpoint_file, 'w') as f:
+            f.write('{"rxn_0": {"ts_')
+        species = self.species([0], [0])
+        rg = ReactionGenerator(species, self.par, None)
+        self.assertEqual(0, rg.read_checkpoint())
+        self.assertEqual([0], species.reac_ts_done)
+
+
+class Scissions:
+    """
+    Homolytic scissions that wait on no job, the first one finishes
+    after a given time, the second one makes progress in every step.
+    """
+
+    def __init__(self, duration):
+        self.hss = [SimpleNamespace(status=0), SimpleNamespace(status=0)]
+        self.end = time.time() + duration
+        self.calls = [0, 0]
+
+    def state(self, index):
+        return self.hss[index].status
+
+    def advance(self, index):
+        self.calls[index] += 1
+        if index == 0 and time.time() > self.end:
+            self.hss[index].status = -1
+        if index == 1:
+            self.hss[index].status = -1 if self.hss[index].status == 5 else self.hss[index].status + 1
+
+
+class JobScission:
+    """
+    Homolytic scissions that finish when their job is done,
+    the job of scission i is jobs[i].
+    """
+
+    def __init__(self, qc, jobs=('job',)):
+        self.qc = qc
+        self.jobs = jobs
+        self.hss = [SimpleNamespace(status=0) for job in jobs]
+        self.calls = [0 for job in jobs]
+
+    def state(self, index):
+        return self.hss[index].status
+
+    def advance(self, index):
+        self.calls[index] += 1
+        if self.qc.check_qc(self.jobs[index]) == 'normal':
+            self.hss[index].status = -1
+
+
+def finish_job(qc, job):
+    """
+    Write the results and the log file of a job, as the qc templates do.
+    """
+    qc.db.write(Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]]),
+                name=job, data={'status': 'normal'})
+    with open(job + '.log', 'w') as f:
+        f.write('done\n')
+    qc.listings = {}
+
+
+class TestSteps(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.par = Parameters()
+        self.par.par['queuing'] = 'slurm'
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def testSkipUnchanged(self):
+        """
+        Test that in a pass only the reactions whose jobs changed are advanced
+        """
+        qc = QuantumChemistry(self.par)
+        species = SimpleNamespace(reac_inst=[], reac_obj=[], reac_ts_done=[], reac_step=[])
+        scissions = JobScission(qc, jobs=['job_a', 'job_b', 'job_c'])
+        rg = ReactionGenerator(species, self.par, qc, scissions=scissions)
+        rg.tracker = JobTracker(qc)
+        qc.tracker = rg.tracker
+        steps = rg.run_steps()
+
+        # the first pass visits all the reactions
+        next(steps)
+        self.assertEqual([1, 1, 1], scissions.calls)
+        # none of the jobs changed
+        next(steps)
+        self.assertEqual([1, 1, 1], scissions.calls)
+        finish_job(qc, 'job_b')
+        next(steps)
+        self.assertEqual([1, 2, 1], scissions.calls)
+        self.assertEqual([0, -1, 0], [hs.status for hs in scissions.hss])
+        finish_job(qc, 'job_a')
+        finish_job(qc, 'job_c')
+        self.assertEqual(1, len(list(steps)))
+        self.assertEqual([2, 2, 2], scissions.calls)
+
+
+class TestAsync(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.par = Parameters()
+        self.par.par['queue_poll_interval'] = 0.05
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def testNoBusyWait(self):
+        """
+        Test that a reaction that does not change and waits on no job
+        is only advanced by the watcher, while a reaction that makes
+        progress continues right away
+        """
+        species = SimpleNamespace(reac_inst=[], reac_obj=[], reac_ts_done=[], reac_step=[])
+        scissions = Scissions(0.3)
+        rg = ReactionGenerator(species, self.par, None, scissions=scissions)
+        rg.tracker = JobTracker(None)
+        asyncio.run(rg.run_async())
+        self.assertEqual([-1, -1], [hs.status for hs in scissions.hss])
+        self.assertEqual(6, scissions.calls[1])
+        self.assertLess(scissions.calls[0], 20)
+
+    def testWakeOnResult(self):
+        """
+        Test that a finished job is noticed from the change of the
+        database and the directory, without waiting for the queue poll
+        """
+        self.par.par['queue_poll_interval'] = 1000
+        self.par.par['queuing'] = 'slurm'
+        qc = QuantumChemistry(self.par)
+        species = SimpleNamespace(reac_inst=[], reac_obj=[], reac_ts_done=[], reac_step=[])
+        scissions = JobScission(qc)
+        rg = ReactionGenerator(species, self.par, qc, scissions=scissions)
+        rg.tracker = JobTracker(qc)
+        qc.tracker = rg.tracker
+
+        async def run():
+            asyncio.get_event_loop().call_later(0.2, finish_job, qc, 'job')
+            await rg.run_async()
+
+        start = time.time()
+        asyncio.run(run())
+        self.assertEqual(-1, scissions.hss[0].status)
+        self.assertLess(time.time() - start, 5.)
+
+
+if __name__ == "__main__":
+    unittest.main()
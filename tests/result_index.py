@@ -0,0 +1,96 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the incremental index over the ase database
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ase import Atoms
+from ase.db import connect
+
+from kinbot.result_index import ResultIndex
+
+
+class TestResultIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = connect(os.path.join(self.dir, 'kinbot.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, z, data):
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., z]])
+        self.db.write(mol, name=name, data=data)
+
+    def testIncremental(self):
+        """
+        Test that the latest values are kept for each name,
+        and that the index is only extended with the new rows
+        """
+        index = ResultIndex(self.db)
+        self.assertIsNone(index.get('job'))
+
+        self.write('job', 0.7, {'energy': -1., 'frequencies': [4000.], 'zpe': 0.01, 'status': 'normal'})
+        self.write('other', 0.8, {'energy': -2., 'status': 'normal'})
+        entry = index.get('job')
+        self.assertEqual('normal', entry['status'])
+        self.assertEqual(-1., entry['energy'])
+        self.assertAlmostEqual(0.7, entry['geom'][1][2])
+        self.assertIsNone(entry['prev_geom'])
+
+        # a later row without energy and frequencies keeps the earlier values
+        self.write('job', 0.75, {'zpe': 0.02, 'status': 'error'})
+        entry = index.get('job')
+        self.assertEqual('error', entry['status'])
+        self.assertEqual(-1., entry['energy'])
+        self.assertEqual([4000.], entry['frequencies'])
+        self.assertEqual(0.02, entry['zpe'])
+        self.assertAlmostEqual(0.75, entry['geom'][1][2])
+        self.assertAlmostEqual(0.7, entry['prev_geom'][1][2])
+        self.assertEqual(3, index.last_id)
+
+        self.assertEqual(0, index.refresh())
+
+    def testCoarseMtime(self):
+        """
+        Test that a write in the same tick of the modification time as
+        the last refresh is read, and that the file is not read again
+        once the last refresh was well after the modification time
+        """
+        index = ResultIndex(self.db)
+        self.write('job', 0.7, {'status': 'normal'})
+        self.assertEqual(1, index.refresh())
+        self.write('job', 0.75, {'status': 'error'})
+        st = os.stat(self.db.filename)
+        # the write did not change the stat of the file
+        index.stat = (st.st_mtime, st.st_size)
+        index.stat_time = st.st_mtime + 3.
+        self.assertEqual(0, index.refresh())
+        index.stat_time = st.st_mtime + 0.5
+        self.assertEqual(1, index.refresh())
+        self.assertEqual('error', index.get('job', refresh=0)['status'])
+
+
+if __name__ == "__main__":
+    unittest.main()
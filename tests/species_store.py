@@ -0,0 +1,110 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the species store shared by the wells of a pes search
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ase import Atoms
+
+from kinbot import filecopying
+from kinbot.parameters import Parameters
+from kinbot.qc import QuantumChemistry
+
+
+class TestSpeciesStore(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        for well in ['10', '20']:
+            os.makedirs(os.path.join(self.dir, well, 'hir'))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def get_qc(self, well):
+        os.chdir(os.path.join(self.dir, well))
+        par = Parameters()
+        par.par['username'] = ''
+        return QuantumChemistry(par)
+
+    def testStore(self):
+        """
+        Test that a species is calculated once and loaded by the other wells
+        """
+        qc = self.get_qc('10')
+        self.assertEqual(0, filecopying.copy_from_database_folder(10, 10, qc))
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+        qc.db.write(mol, name='10_well', data={'energy': -1., 'status': 'normal'})
+        qc.db.write(mol, name='hir/10_hir_0_00', data={'energy': -0.9, 'status': 'normal'})
+        qc.db.write(mol, name='100_well', data={'energy': -2., 'status': 'normal'})
+        for fname in ['10_well.log', 'hir/10_hir_0_00.log', '100_well.log', '10_well.chk']:
+            with open(fname, 'w') as f:
+                f.write(fname)
+        qc.index.refresh()
+
+        # the other well waits until the species is done
+        qc20 = self.get_qc('20')
+        self.assertEqual(1, filecopying.copy_from_database_folder(20, 10, qc20))
+        os.chdir(os.path.join(self.dir, '10'))
+        filecopying.copy_to_database_folder(10, 10, qc)
+
+        qc20 = self.get_qc('20')
+        self.assertEqual(0, filecopying.copy_from_database_folder(20, 10, qc20))
+        self.assertTrue(os.path.exists('10_well.log'))
+        self.assertFalse(os.path.exists('100_well.log'))
+        self.assertFalse(os.path.exists('10_well.chk'))
+        # the files are linked to the store, not copied
+        self.assertEqual(2, os.stat('10_well.log').st_nlink)
+        with open('hir/10_hir_0_00.log') as f:
+            self.assertEqual('hir/10_hir_0_00.log', f.read())
+        self.assertEqual(-1., qc20.index.get('10_well')['energy'])
+        self.assertIsNone(qc20.index.get('100_well'))
+
+    def testProduct(self):
+        """
+        Test that a product stored by the well that found it
+        is loaded by the kinbot run of the product
+        """
+        chemid = 150390060000000000002
+        qc = self.get_qc('10')
+        mol = Atoms('H2', positions=[[0., 0., 0.], [0., 0., 0.7]])
+        qc.db.write(mol, name='{}_well'.format(chemid), data={'energy': -1., 'status': 'normal'})
+        with open('{}_well.log'.format(chemid), 'w') as f:
+            f.write('product')
+        qc.index.refresh()
+        filecopying.copy_to_database_folder(10, chemid, qc)
+
+        qc20 = self.get_qc('20')
+        self.assertEqual(0, filecopying.copy_from_database_folder(chemid, chemid, qc20))
+        self.assertTrue(os.path.exists('{}_well.log'.format(chemid)))
+        self.assertEqual(-1., qc20.index.get('{}_well'.format(chemid))['energy'])
+        blobs = []
+        for root, dirs, files in os.walk(os.path.join(self.dir, 'species_store', 'blobs')):
+            blobs.extend(files)
+        self.assertEqual(1, len(blobs))
+
+
+if __name__ == "__main__":
+    unittest.main()
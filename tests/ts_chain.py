@@ -0,0 +1,172 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the job that carries out the steps of a ts search in one job
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from ase import Atoms
+
+from kinbot import reac_family
+from kinbot import ts_chain
+from kinbot.parameters import Parameters
+from kinbot.reac_General import GeneralReac
+
+
+class ChainReac(GeneralReac):
+    """
+    Reaction with three constrained steps, step 1 is skipped.
+    """
+    max_step = 3
+    scan = 0
+    skip = 0
+
+    def __init__(self, species, qc, par, instance, instance_name):
+        GeneralReac.__init__(self, species, qc, par, instance, instance_name)
+        # step and geometry of each call of get_constraints
+        self.calls = []
+
+    def get_constraints(self, step, geom):
+        self.calls.append((step, np.array(geom)))
+        if step == 1:
+            step = 2
+        return step, [[1, 2]], [], []
+
+
+class TestTsChain(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        par = Parameters()
+        par.par['queuing'] = 'slurm'
+        par.par['username'] = ''
+        self.spec = {
+            'module': ChainReac.__module__,
+            'class': ChainReac.__name__,
+            'instance': [0, 1],
+            'instance_name': 'rxn',
+            'step': 0,
+            'command': 'cmd',
+            'par': par.par,
+            'species': {
+                'name': 'well',
+                'charge': 0,
+                'mult': 1,
+                'chemid': 20000000000000000001,
+                'natom': 2,
+                'atom': ['H', 'H'],
+                'geom': np.array([[0., 0., 0.], [0., 0., 0.7]]),
+                'bond': np.array([[0, 1], [1, 0]]),
+                'cycle_chain': [],
+                },
+            }
+        with open('rxn_chain.pkl', 'wb') as f:
+            pickle.dump(self.spec, f)
+        # steps run by the chain, each one stretches the bond by 0.1
+        self.steps = []
+        self.fail_step = 0
+        self.call = ts_chain.subprocess.call
+        self.step_template = reac_family.step_template
+        reac_family.step_template = self.template
+        ts_chain.subprocess.call = self.run_step
+
+    def tearDown(self):
+        ts_chain.subprocess.call = self.call
+        reac_family.step_template = self.step_template
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def template(self, rxn, step, geom, fix, change, release, command):
+        self.rxn = rxn
+        return '{} {}'.format(step, command)
+
+    def run_step(self, args):
+        step = int(open(args[1]).read().split()[0])
+        self.steps.append(step)
+        if step == 2 and self.fail_step:
+            return 1
+        geom = np.array(self.rxn.species.geom)
+        geom[1][2] += 0.1 * len(self.steps)
+        mol = Atoms(symbols=['H', 'H'], positions=geom)
+        self.rxn.qc.db.write(mol, name='rxn', data={'status': 'normal'})
+        return 0
+
+    def testRebuildReaction(self):
+        """
+        Test that the reaction is rebuilt from the pickled description
+        """
+        with open('rxn_chain.pkl', 'rb') as f:
+            spec = pickle.load(f)
+        rxn = ts_chain.rebuild_reaction(spec)
+        self.assertIsInstance(rxn, ChainReac)
+        self.assertEqual('rxn', rxn.instance_name)
+        self.assertEqual([0, 1], rxn.instance)
+        self.assertEqual(['H', 'H'], list(rxn.species.atom))
+        self.assertEqual(20000000000000000001, rxn.species.chemid)
+        self.assertTrue(np.allclose(self.spec['species']['geom'], rxn.species.geom))
+        self.assertEqual('', rxn.par.par['username'])
+
+    def testSteps(self):
+        """
+        Test that the steps are run in order from the geometry of the
+        previous step, and that the replay uses the same geometries
+        """
+        self.assertEqual(0, ts_chain.run_chain('rxn_chain.pkl'))
+        # step 1 is skipped by the reaction
+        self.assertEqual([0, 2], self.steps)
+        chain = self.rxn.calls
+        self.assertEqual([0, 1, 3], [call[0] for call in chain])
+        self.assertAlmostEqual(0.7, chain[0][1][1][2])
+        self.assertAlmostEqual(0.8, chain[1][1][1][2])
+        self.assertAlmostEqual(0.9, chain[2][1][1][2])
+
+        entry = self.rxn.qc.index.get('rxn')
+        self.assertAlmostEqual(0.9, entry['geom'][1][2])
+
+        # the replay in KinBot after the chain job
+        rxn = ts_chain.rebuild_reaction(self.spec)
+        step, fix, change, release = reac_family.chain_constraints(rxn, 0, entry['geom'])
+        self.assertEqual(3, step)
+        self.assertEqual([0, 1, 3], [call[0] for call in rxn.calls])
+        for (_, g1), (_, g2) in zip(chain, rxn.calls):
+            self.assertTrue(np.allclose(g1, g2))
+
+    def testError(self):
+        """
+        Test that a step that does not write to the database
+        ends the chain with an error row
+        """
+        self.fail_step = 1
+        self.assertEqual(-1, ts_chain.run_chain('rxn_chain.pkl'))
+        self.assertEqual([0, 2], self.steps)
+        self.assertEqual('error', self.rxn.qc.check_qc('rxn'))
+        entry = self.rxn.qc.index.get('rxn')
+        # the error row has the geometry of the failed step
+        self.assertAlmostEqual(0.8, entry['geom'][1][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
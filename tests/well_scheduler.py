@@ -0,0 +1,123 @@
+###################################################
+##                                               ##
+## This file is part of the KinBot code v2.0     ##
+##                                               ##
+## The contents are covered by the terms of the  ##
+## BSD 3-clause license included in the LICENSE  ##
+## file, found at the root.                      ##
+##                                               ##
+## Copyright 2018 National Technology &          ##
+## Engineering Solutions of Sandia, LLC (NTESS). ##
+## Under the terms of Contract DE-NA0003525 with ##
+## NTESS, the U.S. Government retains certain    ##
+## rights to this software.                      ##
+##                                               ##
+## Authors:                                      ##
+##   Judit Zador                                 ##
+##   Ruben Van de Vijver                         ##
+##                                               ##
+###################################################
+"""
+This class tests the scheduler of the kinbot runs of a pes search in one process
+"""
+import os
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+
+from kinbot import kb
+from kinbot.mess import MESS
+from kinbot.parameters import Parameters
+from kinbot.queue_status import QueueStatus
+from kinbot.well_scheduler import WellScheduler
+
+
+class TestWellScheduler(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        for chemid in ['10', '20']:
+            os.mkdir(chemid)
+            with open(os.path.join(chemid, chemid + '.json'), 'w') as f:
+                json.dump({'title': chemid}, f)
+        self.run = kb.run
+        # the level of the pes log
+        self.level = logging.getLogger().level
+        logging.getLogger().setLevel(logging.INFO)
+
+    def tearDown(self):
+        kb.run = self.run
+        logging.getLogger().setLevel(self.level)
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def testSteps(self):
+        """
+        Test that the wells are advanced in turns in their own directory
+        """
+        visits = []
+
+        def run(par, queue_status=None):
+            self.assertIs(scheduler.queue_status, queue_status)
+            for i in range(int(par.par['title']) // 10):
+                visits.append(os.path.basename(os.getcwd()))
+                logging.info('step {}'.format(i))
+                yield
+            if par.par['title'] == '20':
+                raise ValueError('failed')
+
+        kb.run = run
+        scheduler = WellScheduler(Parameters())
+        runs = [scheduler.submit('10'), scheduler.submit('20')]
+        while len(scheduler.runs) > 0:
+            self.assertEqual(self.dir, os.getcwd())
+            scheduler.step()
+        self.assertEqual(['10', '20', '20'], visits)
+        self.assertEqual([0, 1], [r.poll() for r in runs])
+        with open(os.path.join('20', 'kinbot.log')) as f:
+            log = f.read()
+        self.assertIn('step 1', log)
+        self.assertIn('ValueError', log)
+
+    def testMess(self):
+        """
+        Test that waiting for the master equation job yields
+        instead of blocking the other wells
+        """
+        mess = MESS(Parameters(), None)
+        polls = []
+        mess.submit = lambda: '1'
+        mess.is_running = lambda pid: polls.append(pid) or len(polls) < 3
+        steps = mess.run_steps()
+        next(steps)
+        self.assertEqual(['1'], polls)
+        self.assertEqual(1, len(list(steps)))
+        self.assertEqual(['1', '1', '1'], polls)
+
+    def testMessQueueStatus(self):
+        """
+        Test that the master equation job is followed in the
+        snapshots of the queue shared by the wells
+        """
+        par = Parameters()
+        par.par['queuing'] = 'slurm'
+        par.par['queue_poll_interval'] = 0.
+        queue_status = QueueStatus(par)
+        snapshots = [{'1': 'R'}, {}]
+        queue_status.query = lambda: snapshots.pop(0)
+        mess = MESS(par, None)
+        mess.submit = lambda: '1'
+        # the scheduler is not asked about the job directly
+        mess.is_running = None
+        steps = mess.run_steps(queue_status)
+        next(steps)
+        self.assertIn('1', queue_status.job_ids)
+        self.assertEqual([{}], snapshots)
+        self.assertEqual([], list(steps))
+        self.assertEqual([], snapshots)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1 @@
+python {python_file} {arguments}
@@ -0,0 +1,9 @@
+"""
+Template to run the constrained steps of a ts search in a single job
+KinBot needs to pass to the template:
+1. The name of the file with the description of the reaction
+"""
+
+from kinbot.ts_chain import run_chain
+
+run_chain('{spec_file}')